@@ -0,0 +1,118 @@
+# Benchmark: concurrent logins with bcrypt inline on the event loop vs on the bounded password hasher pool
+#   inline    - AuthService.login_user called from an async handler (the old /auth/login)
+#   offloaded - AuthService.login_user_async (bcrypt on PasswordHasher's thread pool)
+#   overload  - offloaded with a queue limit below the number of concurrent logins: the excess fail fast
+#
+# While the logins run, a "cheap request" (an async handler that does no real work) is issued every 10 ms;
+# its latency is what every other endpoint sees while logins are in progress.
+#
+# Run from the repository root:
+#   python -m backend.benchmarks.bench_concurrent_login
+#   python -m backend.benchmarks.bench_concurrent_login --logins 32 --rounds 12 --workers 4
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import bcrypt
+
+from backend.services.auth_service import AuthService
+from backend.services.password_service import PasswordHasher, PasswordHasherBusy
+
+# How often the cheap request is issued while logins are running
+PROBE_INTERVAL = 0.01
+
+
+def make_service(data_dir: Path, users: int, rounds: int, hasher: PasswordHasher) -> AuthService:
+    # AuthService over a temporary users.json whose passwords are hashed at the given bcrypt cost
+    service = AuthService()
+    service.repository.data_dir = data_dir
+    service.password_hasher = hasher
+    password_hash = bcrypt.hashpw(b"Password1", bcrypt.gensalt(rounds)).decode()
+    service._repo_save([
+        {"user_id": f"user-{i}", "name": f"User {i}", "email": f"user{i}@example.com",
+         "password_hash": password_hash, "user_token": f"{i:028d}", "role": "customer"}
+        for i in range(users)
+    ])
+    return service
+
+
+async def run_scenario(service: AuthService, logins: int, offloaded: bool) -> dict:
+    latencies = []
+    done = asyncio.Event()
+
+    async def cheap_request():
+        return "ok"
+
+    async def probe():
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            scheduled = loop.time()
+            await asyncio.sleep(PROBE_INTERVAL)
+            # Time from when the sleep should have ended to when the request completed
+            await cheap_request()
+            latencies.append(loop.time() - scheduled - PROBE_INTERVAL)
+
+    async def login(i: int):
+        # Yield once first, like a real request arriving after the probe is running
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        try:
+            if offloaded:
+                user = await service.login_user_async(f"user{i}@example.com", "Password1")
+            else:
+                user = service.login_user(f"user{i}@example.com", "Password1")
+            assert user is not None
+            return "ok", time.perf_counter() - started
+        except PasswordHasherBusy:
+            return "busy", time.perf_counter() - started
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login(i) for i in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    ok = [seconds for outcome, seconds in results if outcome == "ok"]
+    busy = [seconds for outcome, seconds in results if outcome == "busy"]
+    return {
+        "elapsed": elapsed,
+        "ok": len(ok),
+        "busy": len(busy),
+        "busy_ms": max(busy) * 1000 if busy else 0.0,
+        "probe_p50_ms": statistics.median(latencies) * 1000 if latencies else elapsed * 1000,
+        "probe_max_ms": max(latencies) * 1000 if latencies else elapsed * 1000,
+        "probes": len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent logins: bcrypt inline vs bounded executor")
+    parser.add_argument("--logins", type=int, default=16, help="Concurrent login requests")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor (12 is bcrypt.gensalt()'s default)")
+    parser.add_argument("--workers", type=int, default=4, help="Password hasher threads")
+    parser.add_argument("--overload-pending", type=int, default=4, help="Queue limit for the overload scenario")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("inline", PasswordHasher(max_workers=args.workers), False),
+        ("offloaded", PasswordHasher(max_workers=args.workers, max_pending=args.logins), True),
+        ("overload", PasswordHasher(max_workers=args.workers, max_pending=args.overload_pending), True),
+    ]
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, {args.workers} hasher threads")
+    print(f"{'scenario':>10} {'total (s)':>10} {'ok':>4} {'503':>4} {'503 after (ms)':>15} "
+          f"{'cheap p50 (ms)':>15} {'cheap max (ms)':>15} {'probes':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, hasher, offloaded in scenarios:
+            service = make_service(Path(tmp), args.logins, args.rounds, hasher)
+            result = asyncio.run(run_scenario(service, args.logins, offloaded))
+            print(f"{name:>10} {result['elapsed']:>10.2f} {result['ok']:>4} {result['busy']:>4} {result['busy_ms']:>15.1f} "
+                  f"{result['probe_p50_ms']:>15.1f} {result['probe_max_ms']:>15.1f} {result['probes']:>7}")
+
+
+if __name__ == "__main__":
+    main()
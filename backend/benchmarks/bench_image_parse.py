@@ -0,0 +1,121 @@
+# Benchmark: finding the product image in a product page
+#   before    - BeautifulSoup + html.parser over the whole page (the old fetch_image_url)
+#   strainer  - BeautifulSoup + lxml, only building <img>/<div> elements (ImageScraperService._extract_image_url)
+#   streaming - lxml pull parser fed the page in download-sized chunks, stopping at the landingImage
+#               (LandingImageFinder, falling back to the strainer parse when there is no landingImage)
+#
+# Run from the repository root:
+#   python -m backend.benchmarks.bench_image_parse
+#   python -m backend.benchmarks.bench_image_parse --pages saved_pages/ --repeat 10
+#
+# --pages takes a directory of saved product pages (*.html). Without it, Amazon-sized fixture pages are
+# generated: one with the landingImage about a third of the way in, one with only the fallback container.
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from backend.services.img_scraper_service import ImageScraperService, LandingImageFinder
+
+# Size of the pieces the streaming parser is fed (roughly what one network read returns)
+CHUNK_SIZE = 16 * 1024
+
+
+def make_fixture_page(seed: int, with_landing_image: bool = True) -> str:
+    # Synthetic page shaped like an Amazon product page: big inline scripts/styles up front,
+    # navigation, the image block, then reviews and recommendation carousels (~1.5 MB in total)
+    rng = random.Random(seed)
+    words = ["charging", "cable", "braided", "fast", "durable", "review", "quality", "price", "delivery", "product"]
+
+    def text(count: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(count))
+
+    parts = ["<!DOCTYPE html><html><head><title>Product</title>"]
+    for i in range(30):
+        parts.append(f"<script>var state{i} = {{data: \"{text(1200)}\", html: '<img id=\"landingImage\" src=\"fake.jpg\">'}};</script>")
+    parts.append(f"<style>{'.c' * 20000}{{color: red}}</style></head><body>")
+    for i in range(300):
+        parts.append(f"<div class=\"nav-item\"><a href=\"/cat/{i}\">{text(5)}</a><img src=\"/icons/{i}.png\"></div>")
+    parts.append("<div id=\"dp-container\"><div id=\"main-image-container\"><div id=\"imgTagWrapperId\">")
+    image_id = "landingImage" if with_landing_image else "imgBlkFront"
+    parts.append(f"<img id=\"{image_id}\" src=\"https://m.media-amazon.com/images/I/{seed}LfixturePage._SX300_.jpg?v=1\" "
+                 f"data-a-dynamic-image=\"{{}}\" alt=\"{text(10)}\">")
+    parts.append("</div></div></div>")
+    for i in range(1500):
+        parts.append(f"<div class=\"review\"><div class=\"profile\"><img src=\"/avatars/{i}.jpg\"></div>"
+                     f"<span class=\"rating\">{rng.randint(1, 5)}</span><p>{text(60)}</p></div>")
+    for i in range(200):
+        parts.append(f"<div class=\"carousel-card\"><img src=\"https://m.media-amazon.com/images/I/{i}.jpg\"><span>{text(8)}</span></div>")
+    for i in range(10):
+        parts.append(f"<script>window.metrics{i} = \"{text(1500)}\";</script>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def parse_before(scraper: ImageScraperService, html: str):
+    # The old approach: full html.parser tree, then the same lookups
+    soup = BeautifulSoup(html, "html.parser")
+    landing_img = soup.find("img", {"id": "landingImage"})
+    if landing_img and (landing_img.get("src") or landing_img.get("data-src")):
+        return scraper._clean_image_url(landing_img.get("src") or landing_img.get("data-src"))
+    container = soup.find("div", {"id": "main-image-container"})
+    img_tag = container.find("img") if container else None
+    if img_tag and (img_tag.get("src") or img_tag.get("data-src")):
+        return scraper._clean_image_url(img_tag.get("src") or img_tag.get("data-src"))
+    return None
+
+
+def parse_strainer(scraper: ImageScraperService, html: str):
+    return scraper._extract_image_url(html)
+
+
+def parse_streaming(scraper: ImageScraperService, html: str):
+    # Returns (image_url, characters consumed)
+    finder = LandingImageFinder()
+    for start in range(0, len(html), CHUNK_SIZE):
+        if finder.feed(html[start:start + CHUNK_SIZE]):
+            return scraper._clean_image_url(finder.image_url), start + CHUNK_SIZE
+    return scraper._extract_image_url(html), len(html)
+
+
+def best_time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product image extraction: html.parser vs lxml strainer vs streaming early exit")
+    parser.add_argument("--pages", type=Path, help="Directory of saved product pages (*.html)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = {path.name: path.read_text(encoding="utf-8", errors="replace") for path in sorted(args.pages.glob("*.html"))}
+    else:
+        pages = {"fixture-landing": make_fixture_page(1), "fixture-fallback": make_fixture_page(2, with_landing_image=False)}
+
+    scraper = ImageScraperService()
+    print(f"{'page':>20} {'size (KB)':>10} {'before (ms)':>12} {'strainer (ms)':>14} {'streaming (ms)':>15} "
+          f"{'read (KB)':>10} {'speedup':>8}")
+    for name, html in pages.items():
+        expected = parse_before(scraper, html)
+        assert parse_strainer(scraper, html) == expected, name
+        streamed, consumed = parse_streaming(scraper, html)
+        assert streamed == expected, name
+
+        before = best_time(lambda: parse_before(scraper, html), args.repeat)
+        strainer = best_time(lambda: parse_strainer(scraper, html), args.repeat)
+        streaming = best_time(lambda: parse_streaming(scraper, html), args.repeat)
+        print(f"{name[:20]:>20} {len(html) / 1024:>10.0f} {before * 1000:>12.1f} {strainer * 1000:>14.1f} "
+              f"{streaming * 1000:>15.1f} {consumed / 1024:>10.0f} {before / streaming:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Benchmark: vectorised NumPy range filters vs a list comprehension over Product objects
+#
+# Run from the repository root:
+#   python -m backend.benchmarks.bench_product_filters
+#   python -m backend.benchmarks.bench_product_filters --sizes 100000 1000000 --repeat 5
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from backend.models.product_model import Product
+from backend.services.product_columns_service import ProductColumns
+
+# The filter combination being timed: price range + minimum rating + minimum discount
+FILTERS = {"min_price": 500.0, "max_price": 5000.0, "min_rating": 4.0, "min_discount": 30.0}
+
+
+def make_products(count: int, seed: int = 310) -> list:
+    # Synthetic catalog; model_construct skips validation so building 1M products stays quick
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        actual_price = round(rng.uniform(100, 100000), 2)
+        discount = round(rng.uniform(0, 90), 1)
+        products.append(Product.model_construct(
+            product_id=f"B{i:09d}",
+            product_name="Benchmark Product",
+            category="Benchmark|Products",
+            discounted_price=round(actual_price * (1 - discount / 100), 2),
+            actual_price=actual_price,
+            discount_percentage=discount,
+            rating=round(rng.uniform(1, 5), 1),
+            rating_count=rng.randint(0, 100000),
+            about_product="Benchmark product",
+            img_link="https://example.com/img.jpg",
+            product_link="https://example.com/product",
+        ))
+    return products
+
+
+def list_comprehension_filter(products: list) -> list:
+    # The straightforward Python-loop version of the same filter
+    return [
+        p for p in products
+        if FILTERS["min_price"] <= p.discounted_price <= FILTERS["max_price"]
+        and p.rating >= FILTERS["min_rating"]
+        and p.discount_percentage >= FILTERS["min_discount"]
+    ]
+
+
+def numpy_filter(products: list, columns: ProductColumns) -> list:
+    # Same filter as one combined boolean mask, then gather the matching products
+    positions = np.flatnonzero(columns.mask(**FILTERS))
+    return [products[position] for position in positions.tolist()]
+
+
+def best_time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy range filters vs list comprehension")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'products':>10} {'matches':>8} {'list comp (ms)':>15} {'numpy (ms)':>11} "
+          f"{'mask only (ms)':>15} {'columns build (ms)':>19} {'speedup':>8}")
+    for size in args.sizes:
+        products = make_products(size)
+
+        start = time.perf_counter()
+        columns = ProductColumns(products)
+        build_time = time.perf_counter() - start
+
+        expected = list_comprehension_filter(products)
+        assert numpy_filter(products, columns) == expected
+
+        loop_time = best_time(lambda: list_comprehension_filter(products), args.repeat)
+        numpy_time = best_time(lambda: numpy_filter(products, columns), args.repeat)
+        mask_time = best_time(lambda: columns.mask(**FILTERS), args.repeat)
+        print(f"{size:>10} {len(expected):>8} {loop_time * 1000:>15.1f} {numpy_time * 1000:>11.1f} "
+              f"{mask_time * 1000:>15.1f} {build_time * 1000:>19.1f} {loop_time / numpy_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
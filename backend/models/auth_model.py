@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 
 
 class RegisterRequest(BaseModel):
@@ -15,6 +15,11 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class BulkImportRequest(BaseModel):
+    """Request model for an admin bulk user import."""
+    users: List[RegisterRequest]
+
+
 class UserResponse(BaseModel):
     """Safe user representation returned by auth endpoints."""
     user_id: str
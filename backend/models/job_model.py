@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+
+# JobProgress: How far a background job has got
+class JobProgress(BaseModel):
+    done: int = 0                       # Units of work finished so far
+    total: Optional[int] = None         # Total units of work (None until the job knows)
+
+
+# Job: A long-running admin operation executed on the background worker pool
+class Job(BaseModel):
+    job_id: str                         # Unique UUID for this job
+    kind: str                           # What the job does (e.g. "fetch_images")
+    status: str = "queued"              # queued | running | succeeded | failed | cancelled
+    progress: JobProgress = JobProgress()
+    partial_result: Dict[str, Any] = {} # Intermediate results reported while running
+    result: Optional[Any] = None        # Final result once the job has finished
+    error: Optional[str] = None         # Error message if the job failed
+    cancel_requested: bool = False      # True once cancellation was asked for
+    created_at: str                     # ISO format timestamp
+    started_at: Optional[str] = None    # ISO format timestamp when a worker picked it up
+    finished_at: Optional[str] = None   # ISO format timestamp when it succeeded/failed/was cancelled
+
+
+# JobAccepted: What gets returned (with 202) when a job is submitted
+class JobAccepted(BaseModel):
+    job_id: str                         # Poll GET /admin/jobs/{job_id} for progress
+    status: str                         # Status at submission time (normally "queued")
+    status_url: str                     # Path of the progress endpoint for this job
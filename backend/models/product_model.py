@@ -1,7 +1,7 @@
 """Product models for request/response"""
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class Product(BaseModel):
@@ -45,3 +45,27 @@ class UpdateProductRequest(BaseModel):
     product_link: Optional[str] = None
     rating: Optional[float] = None
     rating_count: Optional[int] = None
+
+
+class BulkProductOperation(BaseModel):
+    """One row of a bulk product request (POST /products/bulk)"""
+    op: str                                       # "upsert" or "delete"
+    product_id: Optional[str] = None              # required for delete; upsert creates the product if it doesn't exist
+    product: Optional[UpdateProductRequest] = None  # fields to set (all create fields required when creating)
+
+
+class ProductBatchRequest(BaseModel):
+    """Body of POST /products/batch"""
+    product_ids: List[str]                        # ids to look up (duplicates are returned once)
+
+
+class ProductFilters(BaseModel):
+    """Range filters for product listings (all optional, combined with AND)"""
+    min_price: Optional[float] = None      # discounted_price >= min_price
+    max_price: Optional[float] = None      # discounted_price <= max_price
+    min_rating: Optional[float] = None
+    min_discount: Optional[float] = None   # discount_percentage >= min_discount
+    min_rating_count: Optional[int] = None
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in self.model_dump().values())
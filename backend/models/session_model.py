@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+# Session: A login session (the bearer token itself is only given to the client, never stored)
+class Session(BaseModel):
+    user_id: str            # UUID of the logged in user
+    created_at: float       # Unix time the session was created
+    expires_at: float       # Unix time the session expires (moves forward while it is used)
@@ -4,7 +4,7 @@ import json
 import os
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List, Any
+from typing import List, Any, Optional
 
 
 class BaseRepository(ABC):
@@ -48,5 +48,14 @@ class BaseRepository(ABC):
         # Write data to file with pretty formatting
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
-
-
+    
+    # Return a cheap fingerprint of the repository's JSON file (None if it doesn't exist)
+    # The fingerprint changes whenever the file is rewritten, so services can use it
+    # to decide when their in-memory caches/indexes are stale without re-parsing the file
+    def get_version(self) -> Optional[tuple]:
+        file_path = self.data_dir / self.get_filename()
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        return (self.get_filename(), stat.st_mtime_ns, stat.st_size, stat.st_ino)
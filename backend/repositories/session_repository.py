@@ -0,0 +1,43 @@
+# Session Repository: Data access for sessions.json
+
+from backend.repositories.base_repository import BaseRepository
+import json
+from typing import Dict, Any
+
+
+class SessionRepository(BaseRepository):
+    """Repository for persisted login sessions. Handles all data access to sessions.json.
+    
+    Uses a dict keyed by the SHA-256 of the session token (the tokens themselves are never written):
+    {"<token hash>": {"user_id": "...", "created_at": 1700000000.0, "expires_at": 1700001800.0}, ...}
+    """
+    
+    def get_filename(self) -> str:
+        return "sessions.json"
+    
+    # Override get_all to return a dict instead of the default list
+    def get_all(self) -> Dict[str, Any]:
+        file_path = self.data_dir / self.get_filename()
+        
+        # Return empty dict if file doesn't exist
+        if not file_path.exists():
+            return {}
+        
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                # Ensure we return a dict
+                if isinstance(data, dict):
+                    return data
+                else:
+                    return {}
+        except (json.JSONDecodeError, IOError):
+            return {}
+    
+    # Override save_all to accept dict
+    def save_all(self, data: Dict[str, Any]) -> None:
+        file_path = self.data_dir / self.get_filename()
+        
+        # Write data to file with pretty formatting
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
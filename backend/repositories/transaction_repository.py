@@ -1,6 +1,9 @@
 from .base_repository import BaseRepository
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Tuple
+
+# How much of transactions.json iter_transactions reads at a time
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class TransactionRepository(BaseRepository):
@@ -35,3 +38,85 @@ class TransactionRepository(BaseRepository):
         file_path = self.data_dir / self.get_filename()
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+    
+    def iter_transactions(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (user_id, transaction) pairs one at a time, in file order.
+        The file is read in chunks and each transaction is decoded on its own, so memory use
+        stays at one chunk + one transaction however big the history gets.
+        Like get_all, a missing or malformed file yields nothing (or stops where it breaks)."""
+        file_path = self.data_dir / self.get_filename()
+        if not file_path.exists():
+            return
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                yield from _iter_user_lists(_JsonStream(f))
+        except (ValueError, IOError):
+            return
+
+
+class _JsonStream:
+    # Minimal pull reader over a text file: peek/skip single characters and decode whole values
+    
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+    
+    def _fill(self) -> bool:
+        # Append the next chunk (dropping what's already consumed); False at end of file
+        chunk = self.f.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        # Next non-whitespace character ("" at end of file)
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+    
+    def take(self, expected: str) -> str:
+        # Consume the next character, which must be one of `expected`
+        char = self.peek()
+        if not char or char not in expected:
+            raise ValueError(f"Expected one of {expected!r} in transactions file, got {char!r}")
+        self.pos += 1
+        return char
+    
+    def value(self) -> Any:
+        # Decode the next JSON string/object, reading more chunks until it is complete
+        self.peek()
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+
+def _iter_user_lists(stream: _JsonStream) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    # Walk {"user_id": [transaction, ...], ...} yielding one transaction at a time
+    stream.take("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        user_id = stream.value()
+        stream.take(":")
+        stream.take("[")
+        if stream.peek() == "]":
+            stream.take("]")
+        else:
+            while True:
+                yield user_id, stream.value()
+                if stream.take(",]") == "]":
+                    break
+        if stream.take(",}") == "}":
+            return
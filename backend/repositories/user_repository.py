@@ -1,8 +1,14 @@
 # User Repository: Data access for users.json
 
 import os
+import threading
+from typing import Any, Dict, List, Optional
 from backend.repositories.base_repository import BaseRepository
 
+# Writes made through any UserRepository in this process, per file path (see get_version)
+_write_counts: Dict[str, int] = {}
+_write_counts_lock = threading.Lock()
+
 
 class UserRepository(BaseRepository):
     # Repository for user data
@@ -17,3 +23,19 @@ class UserRepository(BaseRepository):
         
         # Default to users.json
         return "users.json"
+
+    def save_all(self, data: List[Any]) -> None:
+        super().save_all(data)
+        path = str(self.data_dir / self.get_filename())
+        with _write_counts_lock:
+            _write_counts[path] = _write_counts.get(path, 0) + 1
+    
+    # Override get_version: the user indexes must never serve a stale token, but mtime has coarse
+    # granularity on many filesystems, so two same-sized rewrites (e.g. a token swapped for another
+    # 28-character token) in quick succession can share a stat() result. The fingerprint therefore also
+    # counts the writes made through every UserRepository in this process; it stays a single stat().
+    def get_version(self) -> Optional[tuple]:
+        version = super().get_version()
+        if version is None:
+            return None
+        return version + (_write_counts.get(str(self.data_dir / self.get_filename()), 0),)
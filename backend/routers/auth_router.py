@@ -1,19 +1,52 @@
 # Auth Router: API endpoints for authentication operations
-from fastapi import APIRouter, HTTPException,Depends
-from backend.services.auth_service import AuthService,get_current_user_dep, admin_required_dep
+import math
+from fastapi import APIRouter, HTTPException,Depends, Query, Request
+from backend.services.auth_service import AuthService,get_current_user_dep, admin_required_dep, get_bearer_token_dep, normalize_email
+from backend.services.password_service import PasswordHasherBusy
+from backend.services.rate_limit_service import default_login_ip_limiter, default_login_email_limiter
 from backend.models.auth_model import RegisterRequest, LoginRequest
 from typing import Optional
-from backend.models.auth_model import RegisterRequest, LoginRequest, UserResponse
+from backend.models.auth_model import RegisterRequest, LoginRequest, UserResponse, BulkImportRequest
+from backend.models.job_model import JobAccepted
+from backend.services.job_service import default_job_service
 from backend.models.user_model import User
 from pydantic import BaseModel
 from fastapi import Body
+from datetime import datetime, timezone
 
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+# Largest bulk import accepted in one request
+MAX_IMPORT_USERS = 100_000
+
+# Page size of GET /auth/users when a cursor is given without an explicit limit
+DEFAULT_USERS_PAGE_SIZE = 50
+MAX_USERS_PAGE_SIZE = 200
+
 # Create auth service (it creates its own repository internally)
 auth_service = AuthService()
 
+# Helper for when the password hashing pool is saturated: fail fast and tell the client when to retry
+def _busy_response() -> HTTPException:
+    return HTTPException(status_code=503, detail="Server busy, please retry shortly", headers={"Retry-After": "1"})
+
+# Login attempts are throttled per client IP and per email, so repeated failures can't tie up the bcrypt pool
+login_ip_limiter = default_login_ip_limiter
+login_email_limiter = default_login_email_limiter
+
+# Helper: take a login attempt from the IP and email buckets; raises 429 (before any password check) if either is empty
+def _throttle_login(client_ip: str, email: str) -> None:
+    retry_after = login_ip_limiter.acquire(client_ip)
+    if not retry_after:
+        retry_after = login_email_limiter.acquire(normalize_email(email))
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please retry later",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
 
 """Auth router endpoints"""
 
@@ -22,31 +55,37 @@ auth_service = AuthService()
 async def register_user(request: RegisterRequest):
     """Register a new user with name, email, and password"""
     try:
-        # Call auth_service's method to register a new user
-        new_user = auth_service.register_user(
+        # Call auth_service's method to register a new user (password hashing runs off the event loop)
+        new_user = await auth_service.register_user_async(
             name=request.name,
             email=request.email,
             password=request.password
         )
-        # Return success message with user details
+        # Sign the new user in with an expiring session, as /auth/login does
+        session_token, session = auth_service.create_session(new_user)
+        # Return success message with user details and token
         return {
             "message": "User registered successfully",
             "user": {
                 "user_id": new_user.user_id,
                 "name": new_user.name,
                 "email": new_user.email,
-                "user_token": new_user.user_token,
                 "role": new_user.role
-            }
+            },
+            "session_token": session_token,
+            "expires_at": datetime.fromtimestamp(session.expires_at, timezone.utc).isoformat()
         }
+    except PasswordHasherBusy:
+        raise _busy_response()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 # Endpoint to login a user. url would be /auth/login
 @router.post("/login")
-async def login_user(request: LoginRequest):
+async def login_user(request: LoginRequest, http_request: Request):
     """Login user with email and password"""
+    _throttle_login(http_request.client.host if http_request.client else "unknown", request.email)
     try:
         # First check if email exists
         user_by_email = auth_service.get_user_by_email(request.email)
@@ -55,8 +94,8 @@ async def login_user(request: LoginRequest):
                 status_code=401, 
                 detail={"X-Error-Details": "email not found"}
             )      
-        # Call auth_service's method to login user
-        user = auth_service.login_user(
+        # Call auth_service's method to login user (password check runs off the event loop)
+        user = await auth_service.login_user_async(
             email=request.email,
             password=request.password
         )
@@ -67,6 +106,8 @@ async def login_user(request: LoginRequest):
                 status_code=401, 
                 detail={"X-Error-Details": "invalid password"}
             )
+        # Start an expiring session; the client should send session_token as its Bearer token
+        session_token, session = auth_service.create_session(user)
         # Return success message with user details and token
         return {
             "message": "Login successful",
@@ -74,14 +115,26 @@ async def login_user(request: LoginRequest):
                 "user_id": user.user_id,
                 "name": user.name,
                 "email": user.email,
-                "user_token": user.user_token,
                 "role": user.role
-            }
+            },
+            "session_token": session_token,
+            "expires_at": datetime.fromtimestamp(session.expires_at, timezone.utc).isoformat()
         }
+    except PasswordHasherBusy:
+        raise _busy_response()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# Endpoint to logout. url would be /auth/logout (send the session token as the Bearer token)
+@router.post("/logout")
+async def logout_user(token: str = Depends(get_bearer_token_dep)):
+    """End the current login session. The session token stops working immediately."""
+    if not auth_service.end_session(token):
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    return {"message": "Logged out"}
+
+
 # Endpoint to get user by ID. url would be like /auth/users/550e8400-e29b-41d4-a716-446655440000
 @router.get("/users/{user_id}")
 async def get_user_by_id(user_id: str):
@@ -134,20 +187,76 @@ async def read_current_user(current_user: User = Depends(get_current_user_dep)):
     }
 
 
+# Pass ?limit=N (and then ?cursor=<next_cursor>) to get the users one page at a time as {"items": [...], "next_cursor": ...}
+# Pass ?role=admin|customer to only list that role, ?q=<prefix> to search by email or name prefix
 @router.get("/users")
-async def get_all_users(current_user: User = Depends(admin_required_dep)):
-    """Admin-only: Get list of all users"""
-    users = auth_service._load_all_users()
-    return [
-        {
+async def get_all_users(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_USERS_PAGE_SIZE, description="Page size (enables pagination)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    role: Optional[str] = Query(None, description="Only users with this role (admin or customer)"),
+    q: Optional[str] = Query(None, description="Email or name prefix (case-insensitive)"),
+    current_user: User = Depends(admin_required_dep)
+):
+    """Admin-only: Get list of all users (paginated/filtered when limit, cursor, role or q is given)"""
+    def to_dict(u: User) -> dict:
+        return {
             "user_id": u.user_id,
             "name": u.name,
             "email": u.email,
             "user_token": u.user_token,
             "role": u.role
         }
-        for u in users
-    ]
+
+    if limit is None and cursor is None and role is None and q is None:
+        users = auth_service._load_all_users()
+        return [to_dict(u) for u in users]
+
+    paginate = limit is not None or cursor is not None
+    try:
+        users, next_cursor = auth_service.get_users_page(
+            limit=(limit or DEFAULT_USERS_PAGE_SIZE) if paginate else None,
+            cursor=cursor,
+            role=role,
+            query=q
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not paginate:
+        return [to_dict(u) for u in users]
+    return {"items": [to_dict(u) for u in users], "next_cursor": next_cursor}
+
+
+# Background job body for POST /auth/users/import
+def _import_users_job(context, entries: list) -> dict:
+    return auth_service.import_users(
+        entries,
+        progress=lambda done, total: context.report(done, total),
+        should_stop=lambda: context.cancelled
+    )
+
+
+@router.post("/users/import", status_code=202, response_model=JobAccepted)
+async def import_users(request: BulkImportRequest, current_user: User = Depends(admin_required_dep)):
+    """
+    Admin-only: Create many customer accounts at once, as a background job.
+
+    Body: { "users": [{ name, email, password }, ...] }
+
+    Passwords are hashed across a pool of worker processes and all new users are saved in one
+    write. Entries whose email already exists (or repeats within the batch) or whose password
+    fails the registration rules are skipped.
+
+    Poll GET /admin/jobs/{job_id} for progress (passwords hashed / to hash) and the result:
+    - total, imported, skipped: Counts
+    - errors: Skipped entries with the reason
+    - hash_seconds, total_seconds, users_per_second: Throughput of the import
+    POST /admin/jobs/{job_id}/cancel stops it; users hashed so far are still imported.
+    """
+    if len(request.users) > MAX_IMPORT_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IMPORT_USERS} users per import")
+    entries = [entry.model_dump() for entry in request.users]
+    job = default_job_service.submit("import_users", _import_users_job, entries)
+    return JobAccepted(job_id=job.job_id, status=job.status, status_url=f"/admin/jobs/{job.job_id}")
 
 
 @router.get("/admin-only")
@@ -0,0 +1,58 @@
+"""Job Router: Progress and cancellation of background admin jobs (Admin-only)"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from backend.models.job_model import Job
+from backend.models.user_model import User
+from backend.services.auth_service import admin_required_dep
+from backend.services.job_service import default_job_service
+
+# Create router with prefix /admin/jobs and tag "jobs"
+router = APIRouter(prefix="/admin/jobs", tags=["jobs"])
+
+# Jobs are submitted by the routers that own the operation (e.g. POST /products/fetch-images-all)
+job_service = default_job_service
+
+
+@router.get("/", response_model=List[Job])
+async def list_jobs(
+    status: Optional[str] = Query(None, description="Only jobs with this status (queued, running, succeeded, failed, cancelled)"),
+    current_user: User = Depends(admin_required_dep)
+):
+    """
+    Admin-only: List known jobs, newest first.
+    Finished jobs are kept in memory for a while (the oldest are dropped first).
+    """
+    return job_service.list_jobs(status)
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job_id: str, current_user: User = Depends(admin_required_dep)):
+    """
+    Admin-only: Status of one job.
+
+    Returns:
+    - status: queued | running | succeeded | failed | cancelled
+    - progress: { done, total }
+    - partial_result: Intermediate results reported while the job runs
+    - result: Final result once finished (for a cancelled job, whatever it had done)
+    - error: Error message if the job failed
+    """
+    try:
+        return job_service.get(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel_job(job_id: str, current_user: User = Depends(admin_required_dep)):
+    """
+    Admin-only: Cancel a job.
+    A queued job is cancelled at once; a running job stops at its next checkpoint
+    (poll GET /admin/jobs/{job_id} until status is "cancelled"). Finished jobs are unchanged.
+    """
+    try:
+        return job_service.cancel(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
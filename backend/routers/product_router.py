@@ -1,45 +1,250 @@
 # Product Router: API endpoints for product operations
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from backend.services.product_service import ProductService
-from backend.models.product_model import Product, CreateProductRequest, UpdateProductRequest
+from backend.models.product_model import Product, ProductFilters, CreateProductRequest, UpdateProductRequest, BulkProductOperation, ProductBatchRequest
 from backend.services.auth_service import admin_required_dep
-from typing import Optional
+from backend.services.similarity_service import DEFAULT_NEIGHBOURS, SimilarityIndexNotReady
+from backend.services.co_purchase_service import DEFAULT_BOUGHT_TOGETHER
+from backend.services.job_service import default_job_service
+from backend.models.job_model import JobAccepted
+import asyncio
+from typing import Callable, List, Optional
 
 # Create router with /products prefix and "products" tag
 router = APIRouter(prefix="/products", tags=["products"])
 
 # Create product service (it creates its own repository internally)
 product_service = ProductService()
+# Build the "similar products" index in the background from the start (it then follows catalog changes)
+product_service.schedule_similarity_refresh()
+
+
+# Largest number of rows accepted by POST /products/bulk in one request
+MAX_BULK_OPERATIONS = 10000
+
+# Largest number of ids accepted by POST /products/batch in one request
+MAX_BATCH_IDS = 1000
+
+# Page size used when a cursor is given without an explicit limit
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+FIELDS_DESCRIPTION = "Comma-separated product fields to return (or 'card' for the product grid fields)"
 
 
 """Product router endpoints"""
 
+# Helper to turn ?fields= into a field tuple (400 on unknown fields)
+def _parse_fields(fields: Optional[str]):
+    try:
+        return product_service.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Helper to check an If-None-Match header against our ETag (any listed concrete tag matches)
+# "*" is handled separately: it only matches once we know the representation exists
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+# Helper for the catalog read endpoints: conditional GET + pre-encoded JSON body
+# - If the client's If-None-Match matches the current ETag we answer 304 straight away
+#   (the ETag only needs the catalog version, so the catalog isn't loaded at all)
+# - Otherwise the encoded body comes from ProductService's cache, and build() only runs on a cache miss
+# - If-None-Match: * gets a 304 only after build() succeeded, so errors (404/400) are still reported
+# - variant_tag identifies any other state the body depends on (it becomes part of the cache key and ETag)
+def _json_response(request: Request, build: Callable[[], bytes], variant_tag: str = "") -> Response:
+    variant = f"{request.url.path}?{request.url.query}{variant_tag}"
+    headers = {"Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+
+    etag = product_service.get_catalog_etag(variant)
+    if _etag_matches(if_none_match, etag):
+        headers["ETag"] = etag
+        return Response(status_code=304, headers=headers)
+
+    body, headers["ETag"] = product_service.get_encoded_response(variant, build)
+    if if_none_match and "*" in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Helper for the paginated variants of the listing/search endpoints
+def _get_page(limit: Optional[int], cursor: Optional[str], sort: Optional[str], fields: Optional[tuple],
+              keyword: Optional[str] = None, fuzzy: bool = False, category: Optional[str] = None,
+              filters: Optional[ProductFilters] = None) -> bytes:
+    try:
+        items, next_cursor = product_service.get_products_page(
+            limit=limit or DEFAULT_PAGE_SIZE,
+            cursor=cursor,
+            sort_by=sort,
+            keyword=keyword,
+            fuzzy=fuzzy,
+            category=category,
+            filters=filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return product_service.encode_products_page(items, next_cursor, fields)
+
 # Endpoint to get ALL products. url would be /products      this is the defualt endpoint for this router, it shows all list of all the products
+# Pass ?limit=N (and then ?cursor=<next_cursor>) to get the catalog one page at a time as {"items": [...], "next_cursor": ...}
+# Pass ?category=Electronics|HomeAudio to only get products in that category or any of its sub-categories
+# Pass ?min_price=&max_price=&min_rating=&min_discount=&min_rating_count= to filter by ranges (all combined with AND)
 @router.get("/")
-async def get_all_products(sort: Optional[str] = None):
-    # call product_service's method to get all products
-    products = product_service.get_all_products()
-    # Return all products
+async def get_all_products(
+    request: Request,
+    sort: Optional[str] = None,
+    category: Optional[str] = Query(None, description="Category path, e.g. Electronics|HomeAudio (includes sub-categories)"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum discounted price"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum discounted price"),
+    min_rating: Optional[float] = Query(None, ge=0, le=5, description="Minimum rating"),
+    min_discount: Optional[float] = Query(None, ge=0, le=100, description="Minimum discount percentage"),
+    min_rating_count: Optional[int] = Query(None, ge=0, description="Minimum number of ratings"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (enables pagination)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    def build() -> bytes:
+        field_tuple = _parse_fields(fields)
+        filters = ProductFilters(
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            min_discount=min_discount,
+            min_rating_count=min_rating_count
+        )
+        if limit is not None or cursor is not None:
+            return _get_page(limit, cursor, sort, field_tuple, category=category, filters=filters)
+
+        # call product_service's method to get all products (or only those matching the category/range filters)
+        if category is not None or not filters.is_empty():
+            products = product_service.get_filtered_products(category=category, filters=filters)
+        else:
+            products = product_service.get_all_products()
+
+        # Only sort if explicitly requested (don't apply default sorting)
+        if sort:
+            products = product_service.sort_products(products, sort)
 
-    # Only sort if explicitly requested (don't apply default sorting)
-    if sort:
-        products = product_service.sort_products(products, sort)
+        # Only send the requested fields (e.g. ?fields=card skips the long descriptions)
+        return product_service.encode_products(products, field_tuple)
 
-    return products
+    return _json_response(request, build)
 
 # Endpoint to search products by keyword in name or category.  url would be like /products/search/laptop to search for "laptop"
+# Add ?fuzzy=true for typo-tolerant search, e.g. /products/search/chargr cabel?fuzzy=true finds "Charger Cable"
 @router.get("/search/{keyword}")
-async def search_products(keyword: str, sort: Optional[str] = None):
-    # call product_service's method to search products by keyword
-    products = product_service.get_product_by_keyword(keyword)
+async def search_products(
+    request: Request,
+    keyword: str,
+    sort: Optional[str] = None,
+    fuzzy: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (enables pagination)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    def build() -> bytes:
+        field_tuple = _parse_fields(fields)
+        if limit is not None or cursor is not None:
+            return _get_page(limit, cursor, sort, field_tuple, keyword=keyword, fuzzy=fuzzy)
+
+        # call product_service's method to search products by keyword
+        products = product_service.get_product_by_keyword(keyword, fuzzy=fuzzy)
+
+        # Only sort if explicitly requested (don't default to popularity for search)
+        if sort:
+            products = product_service.sort_products(products, sort)
+
+        # return the list (empty if no matches - for frontend to handle "no results" case)
+        return product_service.encode_products(products, field_tuple)
 
-    # Only sort if explicitly requested (don't default to popularity for search)
-    if sort:
-        products = product_service.sort_products(products, sort)
+    return _json_response(request, build)
+
+# Endpoint to get the best products for one ranking. url would be like /products/top?by=rating&k=20
+# by: rating (best rated), discount (biggest discount) or rating_count (most reviewed)
+# This route must come before /{product_id} to avoid route conflicts
+@router.get("/top")
+async def get_top_products(
+    request: Request,
+    by: str = Query("rating", description="rating, discount or rating_count"),
+    k: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="How many products to return"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    def build() -> bytes:
+        field_tuple = _parse_fields(fields)
+        try:
+            products = product_service.get_top_products(by=by, k=k)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return product_service.encode_products(products, field_tuple)
+
+    return _json_response(request, build)
+
+# Endpoint to get the category tree with product counts per category. url would be /products/categories
+# ?path=Electronics returns just that subtree, ?depth=1 only goes one level down
+# This route must come before /{product_id} to avoid route conflicts
+@router.get("/categories")
+async def get_category_tree(
+    request: Request,
+    path: Optional[str] = Query(None, description="Category path to start from (whole tree if omitted)"),
+    depth: Optional[int] = Query(None, ge=0, description="How many levels of sub-categories to include")
+):
+    def build() -> bytes:
+        try:
+            return product_service.encode_json(product_service.get_category_tree(path=path, depth=depth))
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
 
-    # return the list (empty if no matches - for frontend to handle "no results" case)
-    return products
+    return _json_response(request, build)
+
+# Endpoint to get products similar to a product. url would be like /products/B07JW9H4J1/similar?k=5
+# Answered from precomputed neighbour lists (TF-IDF over name, category and description), 503 until they are first built
+# This route must come before /{product_id} to avoid route conflicts
+@router.get("/{product_id}/similar")
+async def get_similar_products(
+    request: Request,
+    product_id: str,
+    k: int = Query(10, ge=1, le=DEFAULT_NEIGHBOURS, description="How many similar products to return"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    def build() -> bytes:
+        field_tuple = _parse_fields(fields)
+        try:
+            products = product_service.get_similar_products(product_id, k=k)
+        except SimilarityIndexNotReady:
+            raise HTTPException(status_code=503, detail="Similar products are still being computed, please retry shortly",
+                                headers={"Retry-After": "1"})
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return product_service.encode_products(products, field_tuple)
+
+    # The neighbour lists are refreshed in the background, so they are versioned separately from the catalog
+    return _json_response(request, build, variant_tag=f"#similarity={product_service.get_similarity_version()!r}")
+
+# Endpoint to get products frequently bought together with a product. url would be like /products/B07JW9H4J1/bought-together?k=5
+# Answered from the in-memory co-purchase index. Not ETag-cached: it changes with every checkout, not with the catalog
+# This route must come before /{product_id} to avoid route conflicts
+@router.get("/{product_id}/bought-together")
+async def get_bought_together(
+    product_id: str,
+    k: int = Query(10, ge=1, le=DEFAULT_BOUGHT_TOGETHER, description="How many products to return"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    field_tuple = _parse_fields(fields)
+    try:
+        products = product_service.get_bought_together(product_id, k=k)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=product_service.encode_products(products, field_tuple), media_type="application/json")
 
 # ADMIN ONLY: Fetch and update product image from Amazon
 # This route must come before /{product_id} to avoid route conflicts
@@ -72,15 +277,24 @@ async def fetch_product_image(
 # Endpoint to get product by ID.  url would be like /products/B07JW9H4J1 for product with ID B07JW9H4J1
 # Note: This must come after more specific routes like /search/{keyword} and /{id}/fetch-image
 @router.get("/{product_id}")
-async def get_product_by_id(product_id: str):
-    # call product_service's method to find the product by id
-    product = product_service.get_product_by_id(product_id)
-    
-    # if not found, return 404 error
-    if product is None:
-        raise HTTPException(status_code=404, detail="Product not found")
-    # Return the product
-    return product
+async def get_product_by_id(
+    request: Request,
+    product_id: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    def build() -> bytes:
+        field_tuple = _parse_fields(fields)
+
+        # call product_service's method to find the product by id
+        product = product_service.get_product_by_id(product_id)
+
+        # if not found, return 404 error
+        if product is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        # Return the product (only the requested fields if ?fields= was given)
+        return product_service.encode_product(product, field_tuple)
+
+    return _json_response(request, build)
 
 
 # ADMIN ONLY: Create a new product
@@ -120,6 +334,41 @@ async def create_product(
         raise HTTPException(status_code=500, detail=f"Failed to create product: {str(e)}")
 
 
+# Endpoint to get many products by id in one request (cart, wishlist and order pages). body: {"product_ids": [...]}
+# Returns {"products": [...], "missing": [...]}: found products in request order, and the ids that don't exist
+@router.post("/batch")
+async def get_products_batch(
+    request: ProductBatchRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    if len(request.product_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} product ids per request")
+    field_tuple = _parse_fields(fields)
+    return Response(content=product_service.encode_products_batch(request.product_ids, field_tuple),
+                    media_type="application/json")
+
+
+# ADMIN ONLY: Create, update and delete many products in one request
+@router.post("/bulk")
+async def bulk_products(
+    operations: List[BulkProductOperation],
+    current_user: dict = Depends(admin_required_dep)
+):
+    """
+    ADMIN ONLY: Apply an array of upsert/delete operations to the catalog
+    - Each row is {"op": "upsert" | "delete", "product_id": ..., "product": {...fields}}
+    - upsert updates an existing product, or creates it if product_id is unknown/missing
+    - All rows are validated and applied in memory, then products.json is written once
+    - Invalid rows don't stop the others; each row gets its own result
+    """
+    if len(operations) > MAX_BULK_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_OPERATIONS} operations per request")
+    try:
+        return product_service.bulk_apply(operations)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to apply bulk operations: {str(e)}")
+
+
 # ADMIN ONLY: Update an existing product
 @router.put("/{product_id}", response_model=Product)
 async def update_product(
@@ -186,26 +435,43 @@ async def delete_product(
 
 
 # ADMIN ONLY: Fetch images for all products
-@router.post("/fetch-images-all")
+def _fetch_images_job(context, **fetch_options) -> dict:
+    # Background job body: runs the concurrent fetch on its own event loop in the worker thread
+    def progress(done: int, total: int, failed: int):
+        context.report(done, total, failed=failed)
+
+    return asyncio.run(product_service.fetch_all_images_async(
+        progress=progress, should_stop=lambda: context.cancelled, **fetch_options
+    ))
+
+
+@router.post("/fetch-images-all", status_code=202, response_model=JobAccepted)
 async def fetch_all_product_images(
+    max_age: Optional[float] = Query(None, ge=0, description="Seconds a cached image URL stays fresh (0 revalidates every page)"),
     current_user: dict = Depends(admin_required_dep)
 ):
     """
-    ADMIN ONLY: Fetch images for all products in products.json.
+    ADMIN ONLY: Fetch images for all products in products.json, as a background job.
     
-    This endpoint:
-    - Iterates through all products
-    - Fetches images from Amazon for each product
-    - Updates products.json with new image URLs
+    Returns 202 with the job id straight away. The job:
+    - Skips products whose image was resolved recently (image cache), revalidates older ones
+      with conditional requests
+    - Fetches the other product pages concurrently (bounded, rate limited per host, with retries)
+    - Extracts the main image from each page
+    - Updates products.json with all new image URLs in one write
+    
+    Poll GET /admin/jobs/{job_id} for progress (done/total pages, failed so far) and the result,
+    or POST /admin/jobs/{job_id}/cancel to stop it (images resolved so far are still saved).
     
-    Returns statistics about the operation:
+    The job result holds statistics about the operation:
     - total: Total number of products
     - updated: Number of products successfully updated
-    - failed: Number of products that failed
+    - unchanged: Number of products whose image was already up to date
+    - cache_hits: Number of products answered from the image cache
+    - not_modified: Number of product pages that hadn't changed (HTTP 304)
+    - failed: Number of products that failed (including ones skipped by cancellation)
     - errors: List of failed products with error details
     """
-    try:
-        result = product_service.fetch_all_images()
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch images: {str(e)}")
\ No newline at end of file
+    options = {"max_age": max_age} if max_age is not None else {}
+    job = default_job_service.submit("fetch_images", _fetch_images_job, **options)
+    return JobAccepted(job_id=job.job_id, status=job.status, status_url=f"/admin/jobs/{job.job_id}")
\ No newline at end of file
@@ -1,14 +1,165 @@
+import base64
+import bisect
+import json
+import os
 import uuid
-import bcrypt
 import secrets
 import string
-from typing import List, Optional, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Any, Tuple
 
 from fastapi import Depends, HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from backend.repositories.user_repository import UserRepository
 from backend.models.user_model import User
+from backend.models.session_model import Session
+from backend.services.password_service import PasswordHasher, default_password_hasher
+from backend.services.session_service import SessionStore, default_session_store, token_key
+
+
+def normalize_email(email: str) -> str:
+    # The form emails are stored and compared in
+    return email.strip().lower()
+
+
+class _UserIndexes(NamedTuple):
+    # One parsed snapshot of users.json and its lookup indexes (swapped in as a whole)
+    users: List[User]               # every user, in file order
+    by_token: Dict[str, User]       # user_token -> user
+    by_id: Dict[str, User]          # user_id -> user
+    by_email: Dict[str, User]       # normalized email -> user
+
+
+class _UserListing(NamedTuple):
+    # Sorted indexes behind the admin user listing, built from one _UserIndexes snapshot
+    # Keyed by role, with None for all users
+    emails: Dict[Optional[str], List[str]]                  # role -> normalized emails, sorted
+    search: Dict[Optional[str], List[Tuple[str, str]]]      # role -> (search key, email), sorted; each user
+                                                            # appears under its email and its lowercased name
+
+
+# Roles a user can have
+USER_ROLES = ("admin", "customer")
+
+# Authenticated principals kept by the auth dependencies, and for how long
+DEFAULT_PRINCIPAL_CACHE_SIZE = 1024
+DEFAULT_PRINCIPAL_TTL = 60.0
+
+# Deprecated: accept a user's permanent user_token as a Bearer credential alongside session tokens.
+# Off unless ACCEPT_PERMANENT_TOKENS=1; with it on, logout and session expiry don't end access
+ACCEPT_PERMANENT_TOKENS = os.environ.get("ACCEPT_PERMANENT_TOKENS") == "1"
+
+# How often the principal cache checks users.json for edits made outside AuthService (seconds)
+PRINCIPAL_RECHECK_INTERVAL = 1.0
+
+
+class PrincipalCache:
+    """
+    Bounded LRU cache of key -> User for the auth dependencies, with a TTL per entry.
+    AuthService keys entries by a hash of the Bearer token (see AuthService.authenticate).
+
+    Every write to users.json through AuthService drops exactly the entries whose user record
+    changed (role change, deletion, token rotation), so these take effect on the next request.
+    Edits made to users.json by anything else are noticed by a file fingerprint check done at
+    most once per recheck_interval, which clears the whole cache.
+    """
+
+    def __init__(self, repository: Optional[UserRepository] = None, max_size: int = DEFAULT_PRINCIPAL_CACHE_SIZE,
+                 ttl: float = DEFAULT_PRINCIPAL_TTL, recheck_interval: float = PRINCIPAL_RECHECK_INTERVAL):
+        self.repository = repository or UserRepository()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.recheck_interval = recheck_interval
+        # Dependencies run in the threadpool, so several requests can use the cache at once
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()  # key -> (user, expires at)
+        self._source_version = None
+        self._next_check = 0.0
+        # Bumped by every invalidation; a put() for a lookup that started before one is ignored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[User]:
+        # Cached user for a key (a copy), or None on a miss/expired entry
+        now = time.monotonic()
+        with self._lock:
+            self._check_source(now)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].model_copy()
+
+    def put(self, key: str, user: User, generation: Optional[int] = None) -> None:
+        # generation: self.generation read before the user was looked up (guards against caching a
+        # user that was changed by a write that finished in between)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (user.model_copy(), time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        # Drop one entry (e.g. its session ended); the user record didn't change, so no generation bump
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_changed(self, saved_users: List[dict], new_version) -> None:
+        """
+        Called after users.json was rewritten with saved_users: drop the entries whose user is gone
+        or whose user record differs (role change, token rotation), keep the rest, and adopt
+        new_version as the file state we're in sync with (so our own write doesn't look like an
+        outside edit and clear everything).
+        """
+        by_id: Dict[str, dict] = {}
+        for user_dict in saved_users:
+            by_id.setdefault(user_dict.get("user_id"), user_dict)
+        with self._lock:
+            for key in [key for key, (user, _) in self._entries.items() if by_id.get(user.user_id) != user.model_dump()]:
+                del self._entries[key]
+            self._source_version = new_version
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def _check_source(self, now: float) -> None:
+        # Caller holds the lock. Clear everything if users.json was changed behind our back
+        if now < self._next_check:
+            return
+        self._next_check = now + self.recheck_interval
+        version = self.repository.get_version()
+        if version != self._source_version:
+            self._entries.clear()
+            self._source_version = version
+            self.generation += 1
+
+
+# Module-level principal cache shared by every AuthService (all of them invalidate it on writes)
+default_principal_cache = PrincipalCache()
+
+
+def _principal_key(kind: str, token: str) -> str:
+    # Principal cache key: hashed like the session store's keys, and separate for sessions and
+    # permanent tokens so a revoked session can't be answered from a permanent-token entry
+    return f"{kind}:{token_key(token)}"
+
+# Serializes read-modify-write cycles on users.json across every AuthService in the process, so a
+# registration, role change or bulk import never saves over a write it didn't read
+_users_write_lock = threading.RLock()
+
 
 class AuthService:
     # Handles all authentication & user-related business logic
@@ -18,6 +169,29 @@ class AuthService:
         # UserRepository is locked to users.json
         self.repository = UserRepository()
 
+        # Resident token, user_id and email indexes, rebuilt only when users.json changes
+        # _users_version is compared against the repository's file fingerprint and our own save counter
+        self._save_count = 0
+        self._users_version = None
+        self._indexes = _UserIndexes([], {}, {}, {})
+        # (snapshot it was built from, listing indexes); built on first use by the admin listing
+        self._listing: Optional[Tuple[_UserIndexes, _UserListing]] = None
+
+        # bcrypt runs on the shared bounded pool when called through the *_async methods
+        self.password_hasher: PasswordHasher = default_password_hasher
+
+        # Bearer token -> User cache used by authenticate(); our writes invalidate it
+        self.principal_cache: PrincipalCache = default_principal_cache
+
+        # Expiring login sessions (shared by every AuthService)
+        self.session_store: SessionStore = default_session_store
+
+        # Deprecated fallback to permanent user_tokens as credentials (see ACCEPT_PERMANENT_TOKENS)
+        self.accept_permanent_tokens = ACCEPT_PERMANENT_TOKENS
+
+        # Held from reading the users a write is based on until it is saved
+        self._write_lock = _users_write_lock
+
     # Generate a cryptographically secure 28-character token
     def _generate_user_token(self) -> str:
         characters = string.ascii_letters + string.digits
@@ -31,6 +205,10 @@ class AuthService:
     # Save all users to repository
     def _repo_save(self, data: List[dict]) -> None:
         self.repository.save_all(data)
+        # Our own writes always invalidate the indexes (even if the file fingerprint looks the same)
+        self._save_count += 1
+        # ...and drop the cached principals whose user record changed
+        self.principal_cache.invalidate_changed(data, self.repository.get_version())
 
     # Load all users and convert to User objects
     def _load_all_users(self) -> List[User]:
@@ -40,32 +218,164 @@ class AuthService:
             users.append(User(**user_dict))
         return users
 
+    # Return the user indexes for the current users.json, re-parsing it only when it changed
+    # First occurrence wins, like the linear searches these indexes replace
+    def _get_user_indexes(self) -> _UserIndexes:
+        version = (self.repository.get_version(), self._save_count)
+        if version != self._users_version:
+            users = self._load_all_users()
+            indexes = _UserIndexes(users, {}, {}, {})
+            for user in users:
+                indexes.by_token.setdefault(user.user_token, user)
+                indexes.by_id.setdefault(user.user_id, user)
+                indexes.by_email.setdefault(normalize_email(user.email), user)
+            # Swapped in at once so concurrent lookups never see a half-built index
+            self._indexes, self._users_version = indexes, version
+        return self._indexes
+
+    # (snapshot, sorted listing indexes built from it) for the current users.json, rebuilt only after it changed
+    def _get_user_listing(self) -> Tuple[_UserIndexes, _UserListing]:
+        indexes = self._get_user_indexes()
+        listing = self._listing
+        if listing is None or listing[0] is not indexes:
+            emails: Dict[Optional[str], List[str]] = {None: [], **{role: [] for role in USER_ROLES}}
+            search: Dict[Optional[str], List[Tuple[str, str]]] = {None: [], **{role: [] for role in USER_ROLES}}
+            for email, user in indexes.by_email.items():
+                entries = [(email, email), (user.name.strip().lower(), email)]
+                emails[None].append(email)
+                search[None].extend(entries)
+                role = user.role.lower()
+                if role in emails:
+                    emails[role].append(email)
+                    search[role].extend(entries)
+            for keys in (*emails.values(), *search.values()):
+                keys.sort()
+            listing = (indexes, _UserListing(emails, search))
+            self._listing = listing
+        return listing
+
+    def get_users_page(self, limit: Optional[int] = None, cursor: Optional[str] = None,
+                       role: Optional[str] = None, query: Optional[str] = None) -> Tuple[List[User], Optional[str]]:
+        """
+        One page of users for the admin listing, plus the cursor for the next page (None on the last page).
+
+        Users are ordered by email; with a query, only users whose email or name starts with it
+        (case-insensitive) are returned, ordered by the matching email/name. Pages are sliced from
+        sorted in-memory indexes with a binary search, so a page costs O(log n + limit) whatever
+        the number of users. limit=None returns every match.
+        Raises ValueError for an invalid role or cursor.
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+        if role is not None:
+            role = role.lower()
+            if role not in USER_ROLES:
+                raise ValueError(f"Invalid role '{role}'. Must be 'admin' or 'customer'")
+        prefix = (query or "").strip().lower()
+
+        indexes, listing = self._get_user_listing()
+        state = self._decode_users_cursor(cursor) if cursor else None
+        if state is not None and (state.get("r"), state.get("q")) != (role, prefix):
+            raise ValueError("Cursor does not match the requested filters")
+
+        # Walk the sorted keys from the resume point, one match past the page to know if there's a next page
+        matches: List[tuple] = []
+        wanted = limit + 1 if limit is not None else None
+        if prefix:
+            keys = listing.search[role]
+            index = bisect.bisect_left(keys, (prefix,))
+            if state is not None:
+                index = max(index, bisect.bisect_right(keys, (state["k"], state["e"])))
+            while index < len(keys) and keys[index][0].startswith(prefix) and len(matches) != wanted:
+                key, email = keys[index]
+                index += 1
+                # A user matching on both email and name is listed once, under its email
+                if key != email and email.startswith(prefix):
+                    continue
+                matches.append((key, email))
+        else:
+            keys = listing.emails[role]
+            index = bisect.bisect_right(keys, state["e"]) if state is not None else 0
+            end = len(keys) if wanted is None else min(len(keys), index + wanted)
+            matches = [(email, email) for email in keys[index:end]]
+
+        next_cursor = None
+        if limit is not None and len(matches) > limit:
+            matches = matches[:limit]
+            key, email = matches[-1]
+            next_cursor = self._encode_users_cursor({"r": role, "q": prefix, "k": key, "e": email})
+
+        return [indexes.by_email[email].model_copy() for _, email in matches], next_cursor
+
+    # A users cursor is an opaque url-safe token holding the filters and the last (search key, email) returned
+    def _encode_users_cursor(self, state: dict) -> str:
+        raw = json.dumps(state, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode_users_cursor(self, cursor: str) -> dict:
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if not isinstance(state, dict) or not isinstance(state.get("k"), str) or not isinstance(state.get("e"), str):
+                raise ValueError
+            return state
+        except Exception:
+            raise ValueError("Invalid cursor")
+
     def register_user(self, name: str, email: str, password: str) -> User:
-        # load users
-        users = self._load_all_users()
-        email_normalized = email.strip().lower()
+        self._validate_registration(email, password)
+        # hash the password
+        hashed_pwd = self.password_hasher.hash(password)
+        return self._create_user(name, email, hashed_pwd)
+
+    async def register_user_async(self, name: str, email: str, password: str) -> User:
+        """
+        register_user for async endpoints: the bcrypt hash runs on the password hasher's pool
+        instead of blocking the event loop. Raises PasswordHasherBusy when the pool's queue is full.
+        """
+        self._validate_registration(email, password)
+        hashed_pwd = await self.password_hasher.hash_async(password)
+        return self._create_user(name, email, hashed_pwd)
+
+    # Checks done before spending a bcrypt hash on a registration
+    def _validate_registration(self, email: str, password: str) -> None:
+        self._validate_password(password)
+
+        # check if email exists (O(1) in the email index)
+        if normalize_email(email) in self._get_user_indexes().by_email:
+            raise ValueError("Email already exists")
 
-        # pass validation
+    # pass validation
+    def _validate_password(self, password: str) -> None:
         if len(password) < 6:
             raise ValueError("Password must be at least 6 characters long")
         if not any(c.isdigit() for c in password):
             raise ValueError("Password must include at least one digit")
 
-        # check if email exists
-        if any(u.email.lower() == email_normalized for u in users):
-            raise ValueError("Email already exists")
+    # Store a new customer with an already hashed password
+    def _create_user(self, name: str, email: str, hashed_pwd: str) -> User:
+        with self._write_lock:
+            # check the email again: another registration may have finished while the password was hashing
+            indexes = self._get_user_indexes()
+            email_normalized = normalize_email(email)
+            if email_normalized in indexes.by_email:
+                raise ValueError("Email already exists")
 
-        # hash the password
-        hashed_pwd = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+            new_user = self._new_customer(name, email_normalized, hashed_pwd, indexes.by_token)
+
+            # Add new user to the list and save to repository
+            updated_list = [u.model_dump() for u in indexes.users]
+            updated_list.append(new_user.model_dump())
+            self._repo_save(updated_list)
+
+        # Return the new user object
+        return new_user
 
-        # Generate a unique user token
-        existing_tokens = {getattr(u, "user_token", None) for u in users}
+    # Build a customer record with a fresh user_id and a user_token not in taken_tokens
+    def _new_customer(self, name: str, email_normalized: str, hashed_pwd: str, taken_tokens) -> User:
         user_token = self._generate_user_token()
-        while user_token in existing_tokens:
+        while user_token in taken_tokens:
             user_token = self._generate_user_token()
-
-        # Create the new user object
-        new_user = User(
+        return User(
             user_id=str(uuid.uuid4()),
             name=name,
             email=email_normalized,
@@ -74,48 +384,162 @@ class AuthService:
             role="customer"
         )
 
-        # Add new user to the list and save to repository
-        updated_list = [u.model_dump() for u in users]
-        updated_list.append(new_user.model_dump())
-        self._repo_save(updated_list)
+    def import_users(self, entries: List[dict], processes: Optional[int] = None,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     should_stop: Optional[Callable[[], bool]] = None) -> dict:
+        """
+        Bulk-create customers from entries of {name, email, password}.
 
-        # Return the new user object
-        return new_user
+        Entries with an invalid password, or an email that already exists (or appeared earlier in
+        the batch), are skipped. The remaining passwords are hashed across a pool of worker processes
+        and all new users are saved in a single write to users.json.
+
+        progress(done, total) is called as passwords are hashed; if should_stop() turns true, the users
+        hashed so far are still imported and the rest are reported as cancelled.
+
+        Returns counts, the skipped entries ("errors") and the throughput of the import.
+        """
+        started = time.perf_counter()
+        errors: List[dict] = []
+        accepted: List[dict] = []
+        seen = set(self._get_user_indexes().by_email)
+        for entry in entries:
+            email = normalize_email(entry["email"])
+            try:
+                self._validate_password(entry["password"])
+            except ValueError as e:
+                errors.append({"email": email, "error": str(e)})
+                continue
+            if email in seen:
+                errors.append({"email": email, "error": "Email already exists"})
+                continue
+            seen.add(email)
+            accepted.append({"name": entry["name"], "email": email, "password": entry["password"]})
+
+        hash_started = time.perf_counter()
+        hashes = self.password_hasher.hash_many([entry["password"] for entry in accepted], processes,
+                                                progress=progress, should_stop=should_stop)
+        hash_seconds = time.perf_counter() - hash_started
+        for entry in accepted[len(hashes):]:
+            errors.append({"email": entry["email"], "error": "Cancelled"})
+
+        with self._write_lock:
+            # Re-read the indexes: users may have registered while the passwords were hashing
+            indexes = self._get_user_indexes()
+            taken_tokens = set(indexes.by_token)
+            new_users: List[User] = []
+            for entry, hashed_pwd in zip(accepted, hashes):
+                if entry["email"] in indexes.by_email:
+                    errors.append({"email": entry["email"], "error": "Email already exists"})
+                    continue
+                user = self._new_customer(entry["name"], entry["email"], hashed_pwd, taken_tokens)
+                taken_tokens.add(user.user_token)
+                new_users.append(user)
+
+            if new_users:
+                self._repo_save([u.model_dump() for u in indexes.users] + [u.model_dump() for u in new_users])
+
+        total_seconds = time.perf_counter() - started
+        return {
+            "total": len(entries),
+            "imported": len(new_users),
+            "skipped": len(errors),
+            "errors": errors,
+            "hash_seconds": round(hash_seconds, 3),
+            "total_seconds": round(total_seconds, 3),
+            "users_per_second": round(len(new_users) / total_seconds, 1) if total_seconds > 0 else None,
+        }
 
     def login_user(self, email: str, password: str) -> Optional[User]:
-        users = self._load_all_users()
-        target_email = email.strip().lower()
-        for user in users:
-            if user.email.lower() == target_email:
-                if bcrypt.checkpw(password.encode(), user.password_hash.encode()):
-                    return user
-                return None
+        user = self.get_user_by_email(email)
+        if user is not None and self.password_hasher.verify(password, user.password_hash):
+            return user
         return None
 
-    def get_user_by_id(self, user_id: str) -> Optional[User]:
-        users = self._load_all_users()
-        for user in users:
-            if user.user_id == user_id:
-                return user
+    async def login_user_async(self, email: str, password: str) -> Optional[User]:
+        """
+        login_user for async endpoints: bcrypt verification runs on the password hasher's pool.
+        Raises PasswordHasherBusy when the pool's queue is full.
+        """
+        user = self.get_user_by_email(email)
+        if user is not None and await self.password_hasher.verify_async(password, user.password_hash):
+            return user
         return None
 
+    def get_user_by_id(self, user_id: str) -> Optional[User]:
+        # O(1) lookup in the resident user_id index (a copy, so callers can't alter the index)
+        user = self._get_user_indexes().by_id.get(user_id)
+        return user.model_copy() if user else None
+
     def get_user_by_email(self, email: str) -> Optional[User]:
-        users = self._load_all_users()
-        target_email = email.strip().lower()
-        for user in users:
-            if user.email.lower() == target_email:
-                return user
-        return None
+        # O(1) lookup in the resident normalized-email index (a copy, so callers can't alter the index)
+        user = self._get_user_indexes().by_email.get(normalize_email(email))
+        return user.model_copy() if user else None
 
     def get_user_by_token(self, token: str) -> Optional[User]:
         """Return a user by their user_token (or None if not found)."""
         if not token:
             return None
-        users = self._load_all_users()
-        for user in users:
-            if getattr(user, "user_token", None) == token:
-                return user
-        return None
+        # O(1) lookup in the resident token index (a copy, so callers can't alter the index)
+        user = self._get_user_indexes().by_token.get(token)
+        return user.model_copy() if user else None
+
+    def create_session(self, user: User) -> Tuple[str, Session]:
+        # Start a login session: (session token for the client, session with its expiry)
+        return self.session_store.create(user.user_id)
+
+    def get_user_by_session(self, token: str) -> Optional[User]:
+        """Return the user of a live session token (or None if unknown/expired). Using a session extends it."""
+        session = self.session_store.get(token)
+        if session is None:
+            return None
+        return self._user_of_session(token, session)
+
+    # The user a live session belongs to; a session whose user was deleted is revoked
+    def _user_of_session(self, token: str, session: Session) -> Optional[User]:
+        user = self.get_user_by_id(session.user_id)
+        if user is None:
+            self.session_store.revoke(token)
+        return user
+
+    def authenticate(self, token: str) -> Optional[User]:
+        """
+        Return the user a Bearer token authenticates (or None).
+        Session tokens always work; permanent user_tokens only while accept_permanent_tokens is on.
+
+        The session store is checked on every call (so logout and expiry apply immediately and
+        each use extends the session); the user it resolves to comes from the principal cache,
+        keyed by a hash of the token, which writes to users.json invalidate per user.
+        """
+        if not token:
+            return None
+        session = self.session_store.get(token)
+        if session is not None:
+            return self._cached_principal(_principal_key("session", token),
+                                          lambda: self._user_of_session(token, session))
+        # Unknown, expired or revoked session: its cached principal goes too
+        self.principal_cache.discard(_principal_key("session", token))
+        if not self.accept_permanent_tokens:
+            return None
+
+        # Permanent user_tokens (deprecated)
+        return self._cached_principal(_principal_key("user_token", token), lambda: self.get_user_by_token(token))
+
+    # Cached user for a principal key, looked up (and cached) on a miss
+    def _cached_principal(self, key: str, lookup: Callable[[], Optional[User]]) -> Optional[User]:
+        user = self.principal_cache.get(key)
+        if user is None:
+            # Read after get(), which may itself clear the cache (and bump the generation)
+            generation = self.principal_cache.generation
+            user = lookup()
+            if user is not None:
+                self.principal_cache.put(key, user, generation)
+        return user
+
+    def end_session(self, token: str) -> bool:
+        # Log out: revoke a session token (False if it wasn't a live session) and drop its cached principal
+        self.principal_cache.discard(_principal_key("session", token))
+        return self.session_store.revoke(token)
 
     def set_user_role(self, user_id: str, role: str) -> User:
         """
@@ -126,23 +550,24 @@ class AuthService:
         if role.lower() not in ["admin", "customer"]:
             raise ValueError(f"Invalid role '{role}'. Must be 'admin' or 'customer'")
         
-        users = self._load_all_users()
-        user_found = False
-        
-        for user in users:
-            if user.user_id == user_id:
-                user_found = True
-                # Update the role
-                user.role = role.lower()
-                break
-        
-        if not user_found:
-            raise ValueError(f"User with ID '{user_id}' not found")
-        
-        # Save updated users back to repository
-        updated_list = [u.model_dump() for u in users]
-        self._repo_save(updated_list)
-        
+        with self._write_lock:
+            users = self._load_all_users()
+            user_found = False
+
+            for user in users:
+                if user.user_id == user_id:
+                    user_found = True
+                    # Update the role
+                    user.role = role.lower()
+                    break
+
+            if not user_found:
+                raise ValueError(f"User with ID '{user_id}' not found")
+
+            # Save updated users back to repository
+            updated_list = [u.model_dump() for u in users]
+            self._repo_save(updated_list)
+
         # Return the updated user
         updated_user = self.get_user_by_id(user_id)
         return updated_user
@@ -163,16 +588,23 @@ def _extract_token(credentials: Optional[HTTPAuthorizationCredentials]) -> str:
     return credentials.credentials or ""
 
 
-def get_current_user_dep(credentials: Optional[HTTPAuthorizationCredentials] = Security(_security)) -> User:
+def get_bearer_token_dep(credentials: Optional[HTTPAuthorizationCredentials] = Security(_security)) -> str:
+    """FastAPI dependency returning the raw Bearer token. Raises 401 if missing."""
+    token = _extract_token(credentials)
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return token
+
+
+def get_current_user_dep(token: str = Depends(get_bearer_token_dep)) -> User:
     """
     FastAPI dependency to return the current authenticated user based on Bearer token.
+    The token is a session token from /auth/login or /auth/register (or, with the deprecated
+    ACCEPT_PERMANENT_TOKENS flag on, a user's permanent user_token).
     Raises 401 if missing/invalid.
     Uses default_auth_service (created above) so routers can import this dependency.
     """
-    token = _extract_token(credentials)
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    user = default_auth_service.get_user_by_token(token)
+    user = default_auth_service.authenticate(token)
     if user is None:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return user
@@ -6,31 +6,33 @@ import uuid
 from backend.models.cart_model import CartItem, CartResponse
 from backend.models.transaction_model import Transaction, TransactionItem, CheckoutResponse
 from backend.repositories.cart_repository import CartRepository
-from backend.repositories.user_repository import UserRepository
 from backend.repositories.transaction_repository import TransactionRepository
 from backend.services.product_service import ProductService
+from backend.services.co_purchase_service import CoPurchaseIndex, default_co_purchase_index
+from backend.services.auth_service import AuthService, default_auth_service
 
 
 class CartService:
     # Handles all business logic for shopping cart
     
-    def __init__(self, product_service: ProductService):
+    def __init__(self, product_service: ProductService, co_purchase_index: Optional[CoPurchaseIndex] = None,
+                 auth_service: Optional[AuthService] = None):
         # Create our own repositories internally
         self.cart_repository = CartRepository()
-        self.user_repository = UserRepository()
         self.transaction_repository = TransactionRepository()
         self.product_service = product_service
+        # Users are looked up in the resident token/user_id indexes (shared with the auth dependencies by default)
+        self.auth_service = auth_service or default_auth_service
+        # "Frequently bought together" index, updated on every checkout (shared with ProductService by default)
+        self.co_purchase_index = co_purchase_index or default_co_purchase_index
     
-    # Helper to get user_id from user_token by looking up in users.json
+    # Helper to get user_id from a Bearer token (same rules as the auth dependencies)
     def _get_user_id_from_token(self, user_token: str) -> str:
-        # Look up the user_id (UUID) from a user_token
-        users = self.user_repository.get_all()
-        
-        for user in users:
-            if user.get("user_token") == user_token:
-                return user.get("user_id")
-        
-        raise ValueError(f"Invalid user token: {user_token}")
+        # Look up the user_id (UUID) from a login session token (or a permanent user_token, if still accepted)
+        user = self.auth_service.authenticate(user_token)
+        if user is None:
+            raise ValueError(f"Invalid user token: {user_token}")
+        return user.user_id
     
     # Helper to load all carts from cart.json
     def _load_all_carts(self) -> Dict:
@@ -194,13 +196,7 @@ class CartService:
             raise ValueError("Cannot checkout: cart is empty")
         
         # Get user info for receipt
-        users = self.user_repository.get_all()
-        user_info = None
-        for user in users:
-            if user.get("user_id") == user_id:
-                user_info = user
-                break
-        
+        user_info = self.auth_service.get_user_by_id(user_id)
         if not user_info:
             raise ValueError(f"User {user_id} not found")
         
@@ -226,8 +222,8 @@ class CartService:
         transaction = Transaction(
             transaction_id=str(uuid.uuid4()),  # Generate unique UUID
             user_id=user_id,
-            customer_name=user_info.get("name", "Unknown"), # get customer name and email vv from user_repository for reciept generation
-            customer_email=user_info.get("email", "unknown@example.com"),
+            customer_name=user_info.name, # get customer name and email vv from the user index for reciept generation
+            customer_email=user_info.email,
             items=transaction_items,
             total_price=cart.total_price,  # Already calculated from cart
             timestamp=purchase_time.isoformat(),  # ISO format with timezone
@@ -237,6 +233,7 @@ class CartService:
         
         # save transaction to transactions.json
         # Load existing transactions (now a dict: {"user_id": [transactions]})
+        previous_version = self.transaction_repository.get_version()
         all_transactions = self.transaction_repository.get_all()
         if not isinstance(all_transactions, dict):
             all_transactions = {}
@@ -251,6 +248,13 @@ class CartService:
         # Save back to file
         self.transaction_repository.save_all(all_transactions)
         
+        # Count this order in the co-purchase index (instead of recounting all history on the next lookup)
+        self.co_purchase_index.record_order(
+            [item.product_id for item in transaction_items],
+            previous_version,
+            self.transaction_repository.get_version()
+        )
+        
         # clear the user's cart because they've bought the items so when they go back to cart it doesnt show all the items they just bought
         all_carts = self._load_all_carts()
         if user_id in all_carts:
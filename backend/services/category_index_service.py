@@ -0,0 +1,77 @@
+# Category Index Service: Tree index over pipe-delimited product categories
+
+from typing import Any, Dict, List, Optional
+
+# Categories look like "Computers&Accessories|Accessories&Peripherals|Cables&Accessories"
+CATEGORY_SEPARATOR = "|"
+
+
+def split_category(category: str) -> List[str]:
+    # Split a category path into its non-empty, trimmed parts
+    return [part.strip() for part in category.split(CATEGORY_SEPARATOR) if part.strip()]
+
+
+class CategoryNode:
+    """One node of the category tree with the posting list of every product in its subtree"""
+
+    __slots__ = ("name", "path", "children", "positions")
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        # Keyed by the lowercased part name
+        self.children: Dict[str, "CategoryNode"] = {}
+        # Catalog positions of products in this node or any descendant, in catalog order
+        self.positions: List[int] = []
+
+    def to_dict(self, depth: Optional[int] = None) -> Dict[str, Any]:
+        # Serialize the subtree (biggest categories first), stopping after `depth` levels if given
+        children = []
+        if depth is None or depth > 0:
+            next_depth = None if depth is None else depth - 1
+            ordered = sorted(self.children.values(), key=lambda child: (-len(child.positions), child.name))
+            children = [child.to_dict(next_depth) for child in ordered]
+        return {
+            "name": self.name,
+            "path": self.path,
+            "count": len(self.positions),
+            "children": children,
+        }
+
+
+class CategoryIndex:
+    """
+    Category tree built from every product's category path.
+    Each node keeps a precomputed posting list, so counts are len() and
+    "this category and all its descendants" is a single list lookup.
+    Paths are matched case-insensitively: parts that differ only by case are one node, named after
+    the first spelling seen.
+    """
+
+    def __init__(self, categories: List[str]):
+        self.root = CategoryNode("All", "")
+        self._nodes: Dict[str, CategoryNode] = {"": self.root}
+
+        for position, category in enumerate(categories):
+            node = self.root
+            node.positions.append(position)
+            for part in split_category(category):
+                key = part.lower()
+                child = node.children.get(key)
+                if child is None:
+                    path = f"{node.path}{CATEGORY_SEPARATOR}{part}" if node.path else part
+                    child = CategoryNode(part, path)
+                    node.children[key] = child
+                    self._nodes[path.lower()] = child
+                child.positions.append(position)
+                node = child
+
+    def find(self, path: Optional[str]) -> Optional[CategoryNode]:
+        # Return the node for a category path ("" or None is the root), or None if unknown
+        key = CATEGORY_SEPARATOR.join(split_category(path or "")).lower()
+        return self._nodes.get(key)
+
+    def positions(self, path: str) -> List[int]:
+        # Posting list for a category and all its descendants (empty for unknown categories)
+        node = self.find(path)
+        return node.positions if node is not None else []
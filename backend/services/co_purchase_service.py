@@ -0,0 +1,99 @@
+# Co-Purchase Service: "Frequently bought together" index built from transaction history
+
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.repositories.transaction_repository import TransactionRepository
+
+# How many co-purchased products are kept ready per product
+DEFAULT_BOUGHT_TOGETHER = 20
+
+
+class CoPurchaseIndex:
+    """
+    product_id -> how many orders contained it together with each other product.
+
+    The full index is built lazily in one streaming pass over transactions.json and is kept up
+    to date incrementally: CartService.checkout calls record_order for every new order.
+    If transactions.json changes any other way (e.g. edited by hand or a refund rewrites it),
+    its file fingerprint no longer matches and the next lookup rebuilds from history.
+
+    Every product's ranking (most co-purchased first, ties by product_id) is cached until an
+    order containing that product comes in, so lookups are answered from memory.
+    """
+
+    def __init__(self, transaction_repository: Optional[TransactionRepository] = None):
+        self.transaction_repository = transaction_repository or TransactionRepository()
+        # Checkouts run in the threadpool, lookups may run at the same time
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Counter] = {}
+        self._rankings: Dict[str, List[Tuple[str, int]]] = {}
+        # transactions.json fingerprint the counts reflect (None = not built yet)
+        self._version = None
+        self.rebuilds = 0
+
+    def rebuild(self) -> None:
+        # Recount everything from transaction history (one streaming pass, one transaction in memory at a time)
+        with self._lock:
+            version = self.transaction_repository.get_version()
+            counts: Dict[str, Counter] = {}
+            for _, transaction in self.transaction_repository.iter_transactions():
+                self._count_order(counts, _order_product_ids(transaction))
+            self._counts = counts
+            self._rankings = {}
+            self._version = version
+            self.rebuilds += 1
+
+    def record_order(self, product_ids: Iterable[str], previous_version, new_version) -> None:
+        """
+        Count one new order. previous_version/new_version are the transactions.json fingerprints
+        from just before and just after the order was written: the update is only applied if the
+        index was current before the write, otherwise it is left stale and rebuilt on the next lookup
+        (the rebuild will see this order in the file anyway).
+        """
+        with self._lock:
+            if self._version is None or self._version != previous_version:
+                return
+            product_ids = _unique(product_ids)
+            self._count_order(self._counts, product_ids)
+            for product_id in product_ids:
+                self._rankings.pop(product_id, None)
+            self._version = new_version
+
+    def bought_together(self, product_id: str, k: int = DEFAULT_BOUGHT_TOGETHER) -> List[Tuple[str, int]]:
+        # [(product_id, number of orders with both)] for the products most often bought with product_id
+        if self._version is None or self._version != self.transaction_repository.get_version():
+            self.rebuild()
+        with self._lock:
+            ranking = self._rankings.get(product_id)
+            if ranking is None:
+                counter = self._counts.get(product_id, Counter())
+                ranking = sorted(counter.items(), key=lambda item: (-item[1], item[0]))[:DEFAULT_BOUGHT_TOGETHER]
+                self._rankings[product_id] = ranking
+            return ranking[:k]
+
+    def _count_order(self, counts: Dict[str, Counter], product_ids: List[str]) -> None:
+        # Add one order to every pair of distinct products in it
+        for product_id in product_ids:
+            counter = counts.setdefault(product_id, Counter())
+            for other_id in product_ids:
+                if other_id != product_id:
+                    counter[other_id] += 1
+
+
+def _unique(product_ids: Iterable[str]) -> List[str]:
+    # Distinct product ids in first-seen order (quantity and repeated lines don't count twice)
+    return list(dict.fromkeys(product_id for product_id in product_ids if product_id))
+
+
+def _order_product_ids(transaction: dict) -> List[str]:
+    # Product ids of one stored transaction (tolerates malformed entries like the other readers do)
+    items = transaction.get("items") if isinstance(transaction, dict) else None
+    if not isinstance(items, list):
+        return []
+    return _unique(item.get("product_id") for item in items if isinstance(item, dict))
+
+
+# Module-level index shared by CartService (which records new orders) and ProductService (which serves lookups)
+default_co_purchase_index = CoPurchaseIndex()
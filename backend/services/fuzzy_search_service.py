@@ -0,0 +1,144 @@
+# Fuzzy Search Service: Typo-tolerant product name search backed by a character-trigram index
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Words are runs of lowercase letters/digits ("USB-C Cable" -> ["usb", "c", "cable"])
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    # Split text into lowercase alphanumeric words
+    return _WORD_PATTERN.findall(text.lower())
+
+
+def trigrams(word: str) -> Set[str]:
+    # Character trigrams of a word padded with two spaces on each side,
+    # so short words and word boundaries still produce useful grams
+    padded = f"  {word}  "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(word: str) -> int:
+    # How many edits we tolerate for a query word of this length
+    # Very short words must match exactly, otherwise everything matches everything
+    if len(word) <= 3:
+        return 0
+    if len(word) <= 5:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """
+    Optimal string alignment distance (Levenshtein + adjacent transpositions)
+    between a and b, or None if it is greater than limit.
+    Stops as soon as every cell in the current row exceeds the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if a == b:
+        return 0
+
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            # Adjacent transposition ("cabel" -> "cable") counts as a single edit
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return None
+        previous_previous, previous = previous, current
+
+    distance = previous[len(b)]
+    return distance if distance <= limit else None
+
+
+class TrigramIndex:
+    """
+    Inverted index over the words of product names.
+    - trigram -> words containing it (used to shortlist candidate words for a typo'd query word)
+    - word -> positions of the products whose name contains it
+    Only the shortlisted words are compared with the (bounded) edit distance,
+    so a lookup costs time proportional to the candidate set, not the catalog size.
+    """
+
+    def __init__(self, names: List[str]):
+        self._gram_to_words: Dict[str, Set[str]] = defaultdict(set)
+        self._word_to_positions: Dict[str, Set[int]] = defaultdict(set)
+
+        for position, name in enumerate(names):
+            for word in tokenize(name):
+                if word not in self._word_to_positions:
+                    for gram in trigrams(word):
+                        self._gram_to_words[gram].add(word)
+                self._word_to_positions[word].add(position)
+
+    def _matching_words(self, query_word: str) -> Dict[str, int]:
+        # Return {indexed word: edit distance} for every word close enough to query_word
+        limit = max_typos(query_word)
+        if limit == 0:
+            if query_word in self._word_to_positions:
+                return {query_word: 0}
+            return {}
+
+        query_grams = trigrams(query_word)
+        # q-gram lemma: one edit destroys at most 3 trigrams (4 for a transposition),
+        # so a word within `limit` edits shares at least this many trigrams with the query
+        min_shared = max(1, len(query_grams) - 4 * limit)
+
+        shared_counts: Dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for word in self._gram_to_words.get(gram, ()):
+                shared_counts[word] += 1
+
+        matches = {}
+        for word, shared in shared_counts.items():
+            if shared < min_shared:
+                continue
+            distance = bounded_edit_distance(query_word, word, limit)
+            if distance is not None:
+                matches[word] = distance
+        return matches
+
+    def search(self, query: str) -> List[int]:
+        """
+        Return positions of products whose name fuzzily contains every word of the query,
+        best matches (fewest total typos) first, ties kept in catalog order.
+        """
+        query_words = tokenize(query)
+        if not query_words:
+            return []
+
+        # position -> total distance over all query words matched so far
+        scores: Optional[Dict[int, int]] = None
+        for query_word in query_words:
+            word_scores: Dict[int, int] = {}
+            for word, distance in self._matching_words(query_word).items():
+                for position in self._word_to_positions[word]:
+                    best = word_scores.get(position)
+                    if best is None or distance < best:
+                        word_scores[position] = distance
+
+            if scores is None:
+                scores = word_scores
+            else:
+                # Every query word must match, so keep only products matched by all of them
+                scores = {
+                    position: total + word_scores[position]
+                    for position, total in scores.items()
+                    if position in word_scores
+                }
+            if not scores:
+                return []
+
+        ranked: List[Tuple[int, int]] = sorted((total, position) for position, total in scores.items())
+        return [position for _, position in ranked]
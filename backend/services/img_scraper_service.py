@@ -1,10 +1,84 @@
 # Image Scraper Service: Scrape Amazon product images
 
 import re
-from typing import Optional
+import asyncio
+import random
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
 from urllib.parse import urlparse, urljoin
 import httpx
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from backend.repositories.image_cache_repository import ImageCacheRepository
+
+try:
+    from lxml import etree
+    HTML_PARSER = "lxml"
+except ImportError:  # lxml is optional: fall back to the slower stdlib parser and skip the early exit
+    etree = None
+    HTML_PARSER = "html.parser"
+
+# Only <img> and <div> elements matter for finding the product image; the parser skips building the rest
+IMAGE_STRAINER = SoupStrainer(["img", "div"])
+
+# Defaults for bulk fetching (fetch_image_urls)
+DEFAULT_CONCURRENCY = 16        # requests in flight at once, across all hosts
+DEFAULT_HOST_RATE = 5.0         # requests started per second per host
+DEFAULT_RETRIES = 3             # extra attempts after a timeout, connection error, 429 or 5xx
+DEFAULT_BACKOFF = 0.5           # seconds; doubles on every retry (plus jitter)
+MAX_RETRY_AFTER = 30.0          # never wait longer than this for a Retry-After header
+BULK_TIMEOUT = 15.0             # per-request timeout for bulk fetches
+DEFAULT_CACHE_TTL = 7 * 24 * 3600.0  # seconds a resolved image URL is trusted without asking the server again
+
+# Statuses worth retrying (rate limited or a temporary server problem)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LandingImageFinder:
+    """
+    Looks for <img id="landingImage"> while a page is still downloading.
+    Chunks of HTML are fed to an lxml pull parser that only reports <img> start tags, so the
+    download can stop as soon as the image is found (on Amazon pages it comes well before the
+    reviews, recommendations and scripts that make up most of the page).
+    `done` becomes True once the first landingImage has been seen (with or without a usable src).
+    Without lxml it never finds anything and callers fall back to parsing the whole page.
+    """
+
+    def __init__(self):
+        self._parser = etree.HTMLPullParser(events=("start",), tag="img") if etree is not None else None
+        self.image_url: Optional[str] = None
+        self.done = False
+
+    def feed(self, html_chunk: str) -> Optional[str]:
+        # Feed the next piece of the page; returns the raw landingImage URL once known
+        if self._parser is None or self.done:
+            return self.image_url
+        self._parser.feed(html_chunk)
+        for _, element in self._parser.read_events():
+            if element.get("id") == "landingImage":
+                self.image_url = element.get("src") or element.get("data-src")
+                self.done = True
+                break
+        return self.image_url
+
+
+class HostRateLimiter:
+    """
+    Spaces out request starts per host: at most `rate` per second for each host.
+    Each call reserves the next free slot for its host and sleeps until then. There is no await
+    between reading and updating the schedule, so it is safe without a lock on one event loop.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, host: str) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 class ImageScraperService:
@@ -21,6 +95,8 @@ class ImageScraperService:
             'Upgrade-Insecure-Requests': '1',
         }
         self.timeout = 30.0  # 30 second timeout
+        # product_link -> resolved image URL + validators, used by fetch_image_urls
+        self.cache_repository = ImageCacheRepository()
 
     def fetch_image_url(self, product_link: str) -> Optional[str]:
         """
@@ -35,50 +111,19 @@ class ImageScraperService:
         try:
             # Use httpx to fetch the page
             with httpx.Client(headers=self.headers, timeout=self.timeout, follow_redirects=True) as client:
-                response = client.get(product_link)
-                response.raise_for_status()
-
-                # Parse HTML with BeautifulSoup
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                # Try to find the landingImage element
-                landing_img = soup.find('img', {'id': 'landingImage'})
-
-                if landing_img:
-                    # Get the src attribute
-                    img_url = landing_img.get('src') or landing_img.get('data-src')
-
-                    if img_url:
-                        # Clean the URL - remove query parameters that might cause issues
-                        cleaned_url = self._clean_image_url(img_url)
-                        return cleaned_url
-
-                # Fallback: Try to find other common image selectors
-                # Amazon sometimes uses different structures
-                img_selectors = [
-                    ('img', {'id': 'landingImage'}),
-                    ('img', {'id': 'main-image'}),
-                    ('div', {'id': 'main-image-container'}),
-                    ('img', {'class': re.compile(r'product-image', re.I)}),
-                ]
-
-                for selector, attrs in img_selectors:
-                    element = soup.find(selector, attrs)
-                    if element:
-                        if selector == 'img':
-                            img_url = element.get('src') or element.get('data-src')
-                        else:
-                            img_tag = element.find('img')
-                            if img_tag:
-                                img_url = img_tag.get('src') or img_tag.get('data-src')
-                            else:
-                                continue
-
-                        if img_url:
-                            cleaned_url = self._clean_image_url(img_url)
-                            return cleaned_url
-
-                return None
+                # Stream the page so we can stop downloading once the landingImage is found
+                with client.stream("GET", product_link) as response:
+                    response.raise_for_status()
+
+                    finder = LandingImageFinder()
+                    chunks = []
+                    for chunk in response.iter_text():
+                        chunks.append(chunk)
+                        if finder.feed(chunk):
+                            return self._clean_image_url(finder.image_url)
+
+                # No landingImage with a src: parse the whole page with the fallback selectors
+                return self._extract_image_url("".join(chunks))
 
         except httpx.HTTPError as e:
             # Network or HTTP errors
@@ -89,6 +134,211 @@ class ImageScraperService:
             print(f"Error fetching image from {product_link}: {e}")
             return None
 
+    def _extract_image_url(self, html: str) -> Optional[str]:
+        """
+        Find the main product image URL in a product page (None if there isn't one).
+        """
+        # Parse HTML with BeautifulSoup (lxml, keeping only the img/div elements the selectors look at)
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=IMAGE_STRAINER)
+
+        # Try to find the landingImage element
+        landing_img = soup.find('img', {'id': 'landingImage'})
+
+        if landing_img:
+            # Get the src attribute
+            img_url = landing_img.get('src') or landing_img.get('data-src')
+
+            if img_url:
+                # Clean the URL - remove query parameters that might cause issues
+                cleaned_url = self._clean_image_url(img_url)
+                return cleaned_url
+
+        # Fallback: Try to find other common image selectors
+        # Amazon sometimes uses different structures
+        img_selectors = [
+            ('img', {'id': 'landingImage'}),
+            ('img', {'id': 'main-image'}),
+            ('div', {'id': 'main-image-container'}),
+            ('img', {'class': re.compile(r'product-image', re.I)}),
+        ]
+
+        for selector, attrs in img_selectors:
+            element = soup.find(selector, attrs)
+            if element:
+                if selector == 'img':
+                    img_url = element.get('src') or element.get('data-src')
+                else:
+                    img_tag = element.find('img')
+                    if img_tag:
+                        img_url = img_tag.get('src') or img_tag.get('data-src')
+                    else:
+                        continue
+
+                if img_url:
+                    cleaned_url = self._clean_image_url(img_url)
+                    return cleaned_url
+
+        return None
+
+    async def fetch_image_urls(self, product_links: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY,
+                               host_rate: float = DEFAULT_HOST_RATE, retries: int = DEFAULT_RETRIES,
+                               backoff: float = DEFAULT_BACKOFF, max_age: float = DEFAULT_CACHE_TTL,
+                               progress: Optional[Callable[[int, int, int], None]] = None,
+                               should_stop: Optional[Callable[[], bool]] = None
+                               ) -> Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """
+        Fetch the main image URL for many product pages concurrently.
+
+        All requests share one httpx.AsyncClient (connection pooling + keep-alive), at most
+        `concurrency` are in flight, each host gets at most `host_rate` request starts per second,
+        and timeouts/connection errors/429/5xx are retried with exponential backoff and jitter
+        (honouring Retry-After). Duplicate links are fetched once.
+
+        Resolved URLs are cached in image_cache.json with their ETag/Last-Modified. Entries younger
+        than max_age seconds are answered without a request; older ones are revalidated with a
+        conditional GET, and a 304 keeps the cached URL. max_age=0 revalidates everything.
+        The cache is written once at the end.
+
+        progress(done, total, failed) is called as links are resolved (cache hits count straight away).
+        Once should_stop() returns True no new requests are started; links that weren't fetched
+        get the error "Cancelled" and everything resolved so far is still returned and cached.
+
+        Returns {product_link: (image_url, error, source)}: exactly one of image_url/error is None,
+        source is "cache", "not_modified" or "fetched" on success and None on failure.
+        """
+        links = list(dict.fromkeys(link for link in product_links if link))
+        if not links:
+            return {}
+
+        cache = self.cache_repository.get_all()
+        now = datetime.now(timezone.utc)
+        results: Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+        stale = []
+        for link in links:
+            entry = cache.get(link)
+            if entry and self._is_fresh(entry, now, max_age):
+                results[link] = (entry["image_url"], None, "cache")
+            else:
+                stale.append(link)
+        done = len(links) - len(stale)
+        failed = 0
+        if progress:
+            progress(done, len(links), failed)
+
+        if stale:
+            semaphore = asyncio.Semaphore(concurrency)
+            limiter = HostRateLimiter(host_rate)
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with httpx.AsyncClient(headers=self.headers, timeout=BULK_TIMEOUT, follow_redirects=True,
+                                         limits=limits) as client:
+                async def fetch(link: str):
+                    nonlocal done, failed
+                    async with semaphore:
+                        if should_stop and should_stop():
+                            return None, "Cancelled", None, {}
+                        outcome = await self._fetch_one(client, limiter, link, retries, backoff, cache.get(link))
+                    done += 1
+                    failed += outcome[0] is None
+                    if progress:
+                        progress(done, len(links), failed)
+                    return outcome
+
+                fetched = await asyncio.gather(*(fetch(link) for link in stale))
+
+            fetched_at = datetime.now(timezone.utc).isoformat()
+            for link, (image_url, error, source, validators) in zip(stale, fetched):
+                results[link] = (image_url, error, source)
+                if image_url is not None:
+                    cache[link] = {"image_url": image_url, "fetched_at": fetched_at, **validators}
+
+            # One write for the whole batch
+            if any(results[link][0] is not None for link in stale):
+                self.cache_repository.save_all(cache)
+
+        return {link: results[link] for link in links}
+
+    def _is_fresh(self, entry: dict, now: datetime, max_age: float) -> bool:
+        # True if a cache entry was resolved less than max_age seconds ago (unreadable entries are stale)
+        try:
+            fetched_at = datetime.fromisoformat(entry["fetched_at"])
+            return bool(entry["image_url"]) and (now - fetched_at).total_seconds() < max_age
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    async def _fetch_one(self, client: httpx.AsyncClient, limiter: HostRateLimiter, product_link: str,
+                         retries: int, backoff: float, cached: Optional[dict] = None):
+        """
+        One product page with retries, conditional if we have a cached entry for it.
+        Returns (image_url, error, source, validators) where validators holds the page's
+        etag/last_modified for the cache.
+        """
+        conditional_headers = {}
+        if cached and cached.get("image_url"):
+            if cached.get("etag"):
+                conditional_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                conditional_headers["If-Modified-Since"] = cached["last_modified"]
+
+        host = urlparse(product_link).netloc
+        error = None
+        error_delay = 0.0
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(error_delay)
+            await limiter.wait(host)
+            try:
+                async with client.stream("GET", product_link, headers=conditional_headers) as response:
+                    validators = {
+                        "etag": response.headers.get("etag"),
+                        "last_modified": response.headers.get("last-modified"),
+                    }
+                    if response.status_code == 304 and conditional_headers:
+                        # Page unchanged since we resolved it: keep the cached image (and old validators if not resent)
+                        validators = {name: value or cached.get(name) for name, value in validators.items()}
+                        return cached["image_url"], None, "not_modified", validators
+                    if response.status_code in RETRY_STATUSES:
+                        error = f"HTTP {response.status_code}"
+                        error_delay = self._retry_after(response) or backoff * (2 ** attempt) + random.uniform(0, backoff)
+                        continue
+                    if response.status_code >= 400:
+                        return None, f"HTTP {response.status_code}", None, {}
+
+                    # Read until the landingImage shows up; the rest of the page is never downloaded
+                    finder = LandingImageFinder()
+                    chunks = []
+                    async for chunk in response.aiter_text():
+                        chunks.append(chunk)
+                        if finder.feed(chunk):
+                            return self._clean_image_url(finder.image_url), None, "fetched", validators
+            except (httpx.UnsupportedProtocol, httpx.InvalidURL) as e:
+                return None, f"Invalid product link: {e}", None, {}
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                error_delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+                continue
+            except httpx.HTTPError as e:
+                # Not worth retrying (e.g. too many redirects)
+                return None, f"{type(e).__name__}: {e}", None, {}
+
+            # No early hit: full parse with the fallback selectors. That is CPU work, so keep it
+            # off the event loop so other downloads keep going
+            try:
+                image_url = await asyncio.to_thread(self._extract_image_url, "".join(chunks))
+            except Exception as e:
+                return None, f"Error parsing page: {e}", None, {}
+            if image_url is None:
+                return None, "No product image found on page", None, {}
+            return image_url, None, "fetched", validators
+
+        return None, f"{error} (after {retries + 1} attempts)", None, {}
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        # Seconds from a numeric Retry-After header (capped), None if absent or not a number
+        try:
+            return min(float(response.headers["retry-after"]), MAX_RETRY_AFTER)
+        except (KeyError, ValueError):
+            return None
+
     def _clean_image_url(self, url: str) -> str:
         """
         Clean and normalize the image URL.
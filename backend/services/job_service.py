@@ -0,0 +1,167 @@
+# Job Service: Runs long admin operations in the background and tracks their progress
+
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.models.job_model import Job, JobProgress
+
+# Jobs running at the same time (the rest wait in the queue)
+DEFAULT_WORKERS = 2
+
+# Finished jobs kept for polling; the oldest are forgotten first
+MAX_FINISHED_JOBS = 100
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised by JobContext.check_cancelled() to stop a job that was asked to cancel"""
+
+
+class JobContext:
+    """
+    Handed to a running job function: report progress/partial results and check for cancellation.
+    Safe to call from any thread (e.g. an event loop the job started itself).
+    """
+
+    def __init__(self, service: "JobService", job_id: str):
+        self._service = service
+        self.job_id = job_id
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise JobCancelled()
+
+    def report(self, done: int, total: Optional[int] = None, **partial_result) -> None:
+        # Record progress (total is kept from earlier reports if not given) and merge any partial results
+        self._service._update(self.job_id, done, total, partial_result)
+
+
+class JobService:
+    """
+    In-process background job runner on a thread pool.
+
+    submit() queues func(context, *args, **kwargs) and returns the job at once; the job's status,
+    progress and partial results can then be polled with get(). Cancelling a queued job removes it
+    from the queue, cancelling a running one sets context.cancelled - the job stops at its next check
+    (returning normally or raising JobCancelled) and whatever it returned is kept as its result.
+
+    Jobs live in memory only: they don't survive a restart, and only the last MAX_FINISHED_JOBS
+    finished jobs are kept.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_finished: int = MAX_FINISHED_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._contexts: Dict[str, JobContext] = {}
+        self._futures: Dict[str, Future] = {}
+
+    def submit(self, kind: str, func: Callable[..., Any], *args, **kwargs) -> Job:
+        job_id = str(uuid.uuid4())
+        job = Job(job_id=job_id, kind=kind, created_at=_now())
+        context = JobContext(self, job_id)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._contexts[job_id] = context
+            self._futures[job_id] = self._executor.submit(self._run, job_id, func, args, kwargs)
+            return job.model_copy(deep=True)
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise ValueError(f"Job {job_id} not found")
+            return job.model_copy(deep=True)
+
+    def list_jobs(self, status: Optional[str] = None) -> List[Job]:
+        # Newest first
+        with self._lock:
+            jobs = [job.model_copy(deep=True) for job in reversed(self._jobs.values())]
+        return [job for job in jobs if status is None or job.status == status]
+
+    def cancel(self, job_id: str) -> Job:
+        # Ask a job to stop; finished jobs are returned unchanged
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise ValueError(f"Job {job_id} not found")
+            if job.status not in FINISHED_STATUSES:
+                job.cancel_requested = True
+                self._contexts[job_id]._cancel_event.set()
+                # Still queued: the worker never starts it
+                if self._futures[job_id].cancel():
+                    self._finish(job, "cancelled")
+            return job.model_copy(deep=True)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Job:
+        # Block until the job has finished (or timeout) and return its latest state
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+        return self.get(job_id)
+
+    def _run(self, job_id: str, func: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            context = self._contexts[job_id]
+            if context.cancelled:
+                self._finish(job, "cancelled")
+                return
+            job.status = "running"
+            job.started_at = _now()
+
+        status, result, error = "succeeded", None, None
+        try:
+            result = func(context, *args, **kwargs)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            status, error = "failed", str(e) or type(e).__name__
+        if status == "succeeded" and context.cancelled:
+            status = "cancelled"
+
+        with self._lock:
+            job.result = result
+            job.error = error
+            self._finish(job, status)
+
+    def _update(self, job_id: str, done: int, total: Optional[int], partial_result: dict) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return
+            job.progress = JobProgress(done=done, total=total if total is not None else job.progress.total)
+            job.partial_result.update(partial_result)
+
+    def _finish(self, job: Job, status: str) -> None:
+        # Caller holds the lock
+        job.status = status
+        job.finished_at = _now()
+        self._contexts.pop(job.job_id, None)
+        self._futures.pop(job.job_id, None)
+        finished = [job_id for job_id, other in self._jobs.items() if other.status in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Module-level runner shared by every router that starts background jobs
+default_job_service = JobService()
@@ -0,0 +1,109 @@
+# Password Service: bcrypt hashing and verification on a bounded worker pool
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import bcrypt
+
+# bcrypt work threads (bcrypt releases the GIL while hashing, so threads run it in parallel)
+DEFAULT_HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+# Hash/verify calls allowed in flight at once (running + queued); beyond this callers get PasswordHasherBusy
+DEFAULT_MAX_PENDING = 32
+
+# Worker processes for bulk hashing (hash_many), one per core
+DEFAULT_BULK_PROCESSES = os.cpu_count() or 1
+
+# Passwords sent to a worker process at a time by hash_many
+BULK_HASH_CHUNK = 16
+
+
+def _hash_password(password: str) -> str:
+    # Module-level so hash_many's worker processes can import it
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing queue is full; the request should be retried later (HTTP 503)"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop.
+
+    A bcrypt call at the default cost takes roughly 250 ms of CPU; called inline from an async
+    endpoint it blocks every other request on the worker for that long. The async methods hand
+    the work to a small thread pool and await it, so the loop keeps serving requests.
+
+    The queue is bounded: at most max_pending calls can be running or waiting. When it is full
+    the call fails straight away with PasswordHasherBusy instead of queueing up seconds of work,
+    which an overloaded server turns into a fast 503.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_HASH_WORKERS, max_pending: int = DEFAULT_MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.max_pending = max_pending
+
+    # --- Synchronous versions (for code that doesn't run on the event loop) ---
+
+    def hash(self, password: str) -> str:
+        return _hash_password(password)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+
+    def hash_many(self, passwords: Sequence[str], processes: Optional[int] = None,
+                  progress: Optional[Callable[[int, int], None]] = None,
+                  should_stop: Optional[Callable[[], bool]] = None) -> List[str]:
+        """
+        Hash a batch of passwords (bulk imports) across a pool of worker processes.
+
+        Blocking, and not bounded by max_pending: call it from a background job, not an endpoint.
+        progress(done, total) is called as hashes complete; when should_stop() turns true the
+        remaining work is dropped and only the hashes done so far are returned (in input order).
+        """
+        hashes: List[str] = []
+        if not passwords:
+            return hashes
+        processes = max(1, min(processes or DEFAULT_BULK_PROCESSES, len(passwords)))
+        # spawn: forking a server process that has threads running can deadlock the children
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            for password_hash in executor.map(_hash_password, passwords, chunksize=BULK_HASH_CHUNK):
+                hashes.append(password_hash)
+                if progress:
+                    progress(len(hashes), len(passwords))
+                if should_stop and should_stop():
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return hashes
+
+    # --- Async versions (use these from async endpoints) ---
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(self.hash, password)
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        return await self._run(self.verify, password, password_hash)
+
+    async def _run(self, func: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many password operations in progress")
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is freed when the work is done, even if the awaiting request was cancelled meanwhile
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+# Module-level hasher shared by every AuthService, so the bound applies to the whole process
+default_password_hasher = PasswordHasher()
@@ -0,0 +1,76 @@
+# Product Columns Service: Columnar (NumPy) copy of the numeric product fields for vectorised filtering
+
+from typing import List, Optional
+
+import numpy as np
+
+from backend.models.product_model import Product
+
+
+class ProductColumns:
+    """
+    NumPy column arrays for the numeric product fields, position-aligned with the catalog
+    (row i describes catalog[i]). Range filters become boolean masks evaluated in one
+    vectorised pass instead of a Python loop over Product objects.
+    Missing rating_count values are stored as NaN, so they never pass a rating_count filter.
+    """
+
+    def __init__(self, products: List[Product]):
+        self.size = len(products)
+        self.discounted_price = np.fromiter((p.discounted_price for p in products), dtype=np.float64, count=self.size)
+        self.actual_price = np.fromiter((p.actual_price for p in products), dtype=np.float64, count=self.size)
+        self.rating = np.fromiter((p.rating for p in products), dtype=np.float64, count=self.size)
+        self.discount_percentage = np.fromiter((p.discount_percentage for p in products), dtype=np.float64, count=self.size)
+        self.rating_count = np.fromiter(
+            (np.nan if p.rating_count is None else p.rating_count for p in products), dtype=np.float64, count=self.size
+        )
+
+    def mask(self, min_price: Optional[float] = None, max_price: Optional[float] = None,
+             min_rating: Optional[float] = None, min_discount: Optional[float] = None,
+             min_rating_count: Optional[int] = None, base: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Combined boolean mask (True = product passes every given filter).
+        Prices are the discounted (selling) price. `base` is an existing mask to AND into,
+        e.g. a category mask.
+        """
+        result = np.ones(self.size, dtype=bool) if base is None else base.copy()
+        if min_price is not None:
+            result &= self.discounted_price >= min_price
+        if max_price is not None:
+            result &= self.discounted_price <= max_price
+        if min_rating is not None:
+            result &= self.rating >= min_rating
+        if min_discount is not None:
+            result &= self.discount_percentage >= min_discount
+        if min_rating_count is not None:
+            result &= self.rating_count >= min_rating_count
+        return result
+
+    def positions_mask(self, positions: List[int]) -> np.ndarray:
+        # Boolean mask with True at the given catalog positions (e.g. a category posting list)
+        result = np.zeros(self.size, dtype=bool)
+        result[np.asarray(positions, dtype=np.intp)] = True
+        return result
+
+    def top_k(self, column: str, k: int) -> List[int]:
+        """
+        Positions of the k products with the highest value in `column`, highest first.
+        Uses argpartition (O(n)) to find the k best and only sorts those k.
+        Ties are broken by catalog position, so the result is exactly the first k items of a
+        stable descending sort. NaN values (missing rating_count) rank last.
+        """
+        values = np.nan_to_num(getattr(self, column), nan=-np.inf)
+        if k <= 0 or self.size == 0:
+            return []
+        if k >= self.size:
+            candidates = np.arange(self.size)
+        else:
+            # The k-th best value; everything strictly better is in, ties fill the rest in catalog order
+            partitioned = np.argpartition(-values, k - 1)[:k]
+            threshold = values[partitioned].min()
+            better = np.flatnonzero(values > threshold)
+            ties = np.flatnonzero(values == threshold)[:k - len(better)]
+            candidates = np.concatenate((better, ties))
+        # lexsort uses the last key as primary: value descending, then position ascending
+        ordered = candidates[np.lexsort((candidates, -values[candidates]))]
+        return ordered.tolist()
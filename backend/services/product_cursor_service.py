@@ -0,0 +1,88 @@
+# Product Cursor Service: Opaque pagination cursors for product listings and resuming where a page stopped
+#
+# A cursor is an opaque url-safe token holding where the previous page stopped:
+# {"s": sort option, "o": index of the next item in the ordering, "i": last product_id, "k": last sort key}
+# Resuming is O(1) when nothing changed (the item before "o" is still "i"); otherwise the position is
+# recovered with a binary search on "k" (sorted listings) or the product_id index (natural order),
+# so the next page never requires rescanning from the start.
+
+import json
+import base64
+from typing import Dict, List, Optional, Sequence
+
+from backend.models.product_model import Product
+
+
+def encode_cursor(state: dict) -> str:
+    # Cursor state -> url-safe token (padding stripped)
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    # Token -> cursor state; raises ValueError("Invalid cursor") for anything we didn't issue
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+        if not isinstance(state, dict) or not isinstance(state.get("o"), int) or state["o"] < 0:
+            raise ValueError
+        return state
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def bisect_sorted_keys(ordered_keys: list, key, descending: bool) -> int:
+    # First index in ordered_keys whose key doesn't sort before `key`
+    low, high = 0, len(ordered_keys)
+    while low < high:
+        middle = (low + high) // 2
+        sorts_before = ordered_keys[middle] > key if descending else ordered_keys[middle] < key
+        if sorts_before:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def resume_index(ordering: Sequence[int], state: Optional[dict], products: List[Product],
+                 positions: Dict[str, int], ordered_keys: Optional[list] = None, descending: bool = False) -> int:
+    """
+    Work out where the next page starts in `ordering` (a sequence of positions in `products`).
+    ordered_keys are the sort keys along a presorted ordering (None for any other ordering);
+    positions is the catalog's product_id -> position index.
+    Raises ValueError if the cursor's sort key can't be compared with the ordering's keys.
+    """
+    if state is None:
+        return 0
+    offset = min(state["o"], len(ordering))
+    last_id = state.get("i")
+
+    # Fast path: catalog unchanged since the previous page
+    if 0 < offset and products[ordering[offset - 1]].product_id == last_id:
+        return offset
+
+    if ordered_keys is not None:
+        # Find the last item's key, then look for the item itself among products with the same key
+        try:
+            index = bisect_sorted_keys(ordered_keys, state.get("k"), descending)
+        except TypeError:
+            raise ValueError("Invalid cursor")
+        tie_start = index
+        while index < len(ordering) and ordered_keys[index] == state.get("k"):
+            if products[ordering[index]].product_id == last_id:
+                return index + 1
+            index += 1
+        # The last item is gone: restart at its key so nothing after it is skipped
+        return tie_start
+
+    if isinstance(ordering, range):
+        # Natural order: ordering index == catalog position
+        position = positions.get(last_id)
+        if position is not None:
+            return position + 1
+        return offset
+
+    for index, position in enumerate(ordering):
+        if products[position].product_id == last_id:
+            return index + 1
+    return offset
@@ -0,0 +1,126 @@
+# Product Encoding Service: ?fields= projections, pre-encoded JSON bodies and ETags for the product read endpoints
+#
+# Read endpoints send pre-encoded bytes instead of rebuilding and re-serializing models per request.
+# The ETag is derived from the catalog version + request variant, so it can be checked (and a 304
+# returned) with a single stat() of products.json, without loading the catalog.
+
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.models.product_model import Product
+
+# Fields that can be requested with ?fields= (in Product model order)
+PRODUCT_FIELDS = tuple(Product.model_fields)
+
+# Named projections for common views, usable as ?fields=card
+# "card" is everything the product grid needs (no about_product / product_link)
+FIELD_PRESETS = {
+    "card": ("product_id", "product_name", "discounted_price", "actual_price",
+             "discount_percentage", "rating", "rating_count", "img_link"),
+}
+
+# How many distinct projections we keep precomputed per catalog version
+MAX_CACHED_PROJECTIONS = 8
+
+# How many encoded listing/search responses we keep per catalog version (least recently used are dropped)
+MAX_CACHED_RESPONSES = 64
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a ?fields= value ("product_name,rating" or a preset like "card") into a field tuple.
+    product_id is always included. Returns None when no projection was requested.
+    Raises ValueError for unknown fields.
+    """
+    if fields is None or not fields.strip():
+        return None
+    requested = set()
+    for name in fields.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name in FIELD_PRESETS:
+            requested.update(FIELD_PRESETS[name])
+        elif name in PRODUCT_FIELDS:
+            requested.add(name)
+        else:
+            raise ValueError(f"Unknown field '{name}'. Valid fields: {', '.join(PRODUCT_FIELDS)}")
+    requested.add("product_id")
+    # Normalize to model order so equivalent requests share one precomputed shape
+    return tuple(name for name in PRODUCT_FIELDS if name in requested)
+
+
+def project(product: Product, fields: Tuple[str, ...]) -> Dict[str, Any]:
+    # One product reduced to the given fields
+    return {name: getattr(product, name) for name in fields}
+
+
+def encode_json(value: Any) -> bytes:
+    # Same output format as FastAPI's default JSONResponse
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(version, variant: str) -> str:
+    # Strong ETag for a response variant under a catalog version
+    digest = hashlib.blake2b(repr((version, variant)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+class ProductEncoder:
+    """
+    Projections and pre-encoded JSON for one catalog, position-aligned with it (entry i describes
+    products[i]). Projected dicts are built once per field tuple, encoded bytes per product as they
+    are requested, and whole response bodies are kept per request variant. Everything here belongs
+    to a single catalog version; a new catalog gets a new encoder.
+    """
+
+    def __init__(self, products: List[Product]):
+        self.products = products
+        # field tuple -> projected dict for every position (precomputed shapes for ?fields=)
+        self.projections: Dict[tuple, List[Dict[str, Any]]] = {}
+        # field tuple -> pre-encoded JSON bytes per position (filled as products are requested)
+        self.encoded_products: Dict[tuple, List[Optional[bytes]]] = {}
+        # request variant (path + query) -> pre-encoded JSON response body
+        self.encoded_responses: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def projection(self, fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        # Projected dicts for every position, built once per field tuple
+        projections = self.projections
+        if fields not in projections:
+            if len(projections) >= MAX_CACHED_PROJECTIONS:
+                # Drop the oldest shape (dicts keep insertion order)
+                projections.pop(next(iter(projections)))
+            projections[fields] = [project(product, fields) for product in self.products]
+        return projections[fields]
+
+    def encode_positions(self, positions: List[int], fields: Tuple[str, ...]) -> bytes:
+        # JSON array of the products at the given positions, built from the per-product byte cache
+        encoded_products = self.encoded_products
+        if fields not in encoded_products:
+            if len(encoded_products) >= MAX_CACHED_PROJECTIONS:
+                encoded_products.pop(next(iter(encoded_products)))
+            encoded_products[fields] = [None] * len(self.products)
+        encoded = encoded_products[fields]
+
+        parts = []
+        for position in positions:
+            part = encoded[position]
+            if part is None:
+                part = encoded[position] = encode_json(project(self.products[position], fields))
+            parts.append(part)
+        return b"[" + b",".join(parts) + b"]"
+
+    def response(self, variant: str, build: Callable[[], bytes]) -> bytes:
+        # Cached response body for a request variant, calling build() only on a miss
+        responses = self.encoded_responses
+        body = responses.get(variant)
+        if body is None:
+            body = build()
+            responses[variant] = body
+            if len(responses) > MAX_CACHED_RESPONSES:
+                responses.popitem(last=False)
+        else:
+            responses.move_to_end(variant)
+        return body
@@ -1,11 +1,74 @@
 # Product Service: Business logic for product operations
 
 import uuid
+import math
 import string
-import random
-from typing import List, Optional
-from backend.models.product_model import Product
+import asyncio
+import secrets
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from backend.models.product_model import Product, ProductFilters, BulkProductOperation
 from backend.repositories.product_repository import ProductRepository
+from backend.services.fuzzy_search_service import TrigramIndex
+from backend.services.category_index_service import CategoryIndex
+from backend.services.product_columns_service import ProductColumns
+from backend.services.product_encoding_service import PRODUCT_FIELDS, ProductEncoder, encode_json, make_etag, parse_fields, project
+from backend.services.product_cursor_service import encode_cursor, decode_cursor, resume_index
+from backend.services.similarity_service import SimilarityIndex, SimilarityIndexNotReady
+from backend.services.co_purchase_service import default_co_purchase_index
+from backend.services.img_scraper_service import ImageScraperService
+
+
+# Supported top-K rankings for /products/top?by=: by -> ProductColumns column (highest first)
+TOP_K_OPTIONS = {
+    "rating": "rating",
+    "discount": "discount_percentage",
+    "rating_count": "rating_count",
+}
+
+# Supported sort options: sort_by -> (sort key, descending)
+# Name keys are lowercased once per catalog version when the presorted orders are built, not per request
+SORT_OPTIONS = {
+    "name_asc": (lambda p: p.product_name.lower(), False),
+    "name_desc": (lambda p: p.product_name.lower(), True),
+    "price_asc": (lambda p: p.discounted_price, False),
+    "price_desc": (lambda p: p.discounted_price, True),
+    "rating_asc": (lambda p: p.rating, False),
+    "rating_desc": (lambda p: p.rating, True),
+    "discount_asc": (lambda p: p.discount_percentage, False),
+    "discount_desc": (lambda p: p.discount_percentage, True),
+}
+
+
+class _CatalogSnapshot:
+    """
+    One parsed products.json plus every index and cache derived from it.
+
+    A new catalog is built completely in a new snapshot and published with a single attribute
+    assignment, so a request reading the catalog while a background job saves it sees either the old
+    snapshot or the new one, never a half-built index. Derived indexes and caches are filled lazily on
+    the snapshot they were computed from, so they can't end up attached to a newer catalog.
+    """
+
+    def __init__(self, products: List[Product], version):
+        self.products = products
+        self.version = version
+        # product_id -> position in products
+        # First occurrence wins, like the old linear search in get_product_by_id
+        # The keys double as the set of ids already in use (see allocate_product_ids)
+        self.positions: Dict[str, int] = {}
+        for position, product in enumerate(products):
+            self.positions.setdefault(product.product_id, position)
+        self.trigram_index: Optional[TrigramIndex] = None
+        self.category_index: Optional[CategoryIndex] = None
+        self.columns: Optional[ProductColumns] = None
+        # (by, k) -> top-K products
+        self.top_k_cache: Dict[tuple, List[Product]] = {}
+        # sort_by -> (presorted positions, rank of each position in that order, sort keys in that order)
+        self.sort_orders: Dict[str, tuple] = {}
+        # ?fields= projections and pre-encoded JSON (products and whole responses)
+        self.encoder: Optional[ProductEncoder] = None
 
 
 class ProductService:
@@ -16,6 +79,27 @@ class ProductService:
         # ProductRepository is locked to products.json (or products_test.json in tests)
         self.repository = ProductRepository()
 
+        # In-memory catalog snapshot + derived indexes, replaced as a whole when products change
+        # Its version is compared against the repository's file fingerprint and our own save counter
+        self._save_count = 0
+        self._snapshot = _CatalogSnapshot([], None)
+        # Held across read-modify-save of products.json, so a background job's save and a request's
+        # edit can't overwrite each other (reads don't take it)
+        self._write_lock = threading.RLock()
+        # Precomputed "similar products" lists. Unlike the indexes above this survives catalog reloads
+        # and is updated incrementally (only changed products are rescored). It is refreshed on a worker
+        # thread when the catalog changes; requests are answered from the last published lists meanwhile
+        self._similarity_index = SimilarityIndex()
+        # Catalog version the index was last brought up to date with (None until the first build)
+        self._similarity_version = None
+        # One update() at a time; _similarity_lock guards the "a refresh thread is running" flag
+        self._similarity_update_lock = threading.Lock()
+        self._similarity_lock = threading.Lock()
+        self._similarity_refreshing = False
+        # "Frequently bought together" counts from transactions (shared with CartService, which updates it on checkout)
+        self.co_purchase_index = default_co_purchase_index
+        self.image_scraper = ImageScraperService()
+
     # Load all products from repository
     def _repo_load(self) -> List[dict]:
         return self.repository.get_all()
@@ -23,7 +107,139 @@ class ProductService:
     # Save all products to repository
     def _repo_save(self, data: List[dict]) -> None:
         self.repository.save_all(data)
+        # Our own writes always invalidate the cached catalog (even if the file fingerprint looks the same)
+        self._save_count += 1
+    
+    # Persist the full product list and adopt it as the cached catalog (write-through),
+    # so the next request (and the next id allocation) doesn't have to re-parse the file we just wrote
+    def _save_catalog(self, products: List[Product]) -> None:
+        with self._write_lock:
+            self._repo_save([p.model_dump() for p in products])
+            self._install_catalog(list(products), (self.repository.get_version(), self._save_count))
     
+    # Make `products` the cached catalog for `version`: build a fresh snapshot (with empty derived
+    # indexes/caches) and publish it in one assignment
+    def _install_catalog(self, products: List[Product], version) -> _CatalogSnapshot:
+        snapshot = _CatalogSnapshot(products, version)
+        self._snapshot = snapshot
+        # Once there is a similarity index, keep it following the catalog
+        if self._similarity_version is not None:
+            self.schedule_similarity_refresh()
+        return snapshot
+    
+    # Return the current snapshot, reloading it only when products changed
+    # Callers that combine the catalog with its indexes take one snapshot and use only that
+    def _get_snapshot(self) -> _CatalogSnapshot:
+        version = (self.repository.get_version(), self._save_count)
+        snapshot = self._snapshot
+        if version != snapshot.version:
+            snapshot = self._install_catalog(self._load_all_products(), version)
+        return snapshot
+    
+    # Return the cached catalog (the product list of the current snapshot)
+    def _get_catalog(self) -> List[Product]:
+        return self._get_snapshot().products
+    
+    # Return the trigram index for a snapshot (built on first use)
+    def _get_trigram_index(self, snapshot: Optional[_CatalogSnapshot] = None) -> TrigramIndex:
+        snapshot = snapshot or self._get_snapshot()
+        if snapshot.trigram_index is None:
+            snapshot.trigram_index = TrigramIndex([p.product_name for p in snapshot.products])
+        return snapshot.trigram_index
+
+    # Return the category tree index for a snapshot (built on first use)
+    def _get_category_index(self, snapshot: Optional[_CatalogSnapshot] = None) -> CategoryIndex:
+        snapshot = snapshot or self._get_snapshot()
+        if snapshot.category_index is None:
+            snapshot.category_index = CategoryIndex([p.category for p in snapshot.products])
+        return snapshot.category_index
+
+    # Return the NumPy column arrays for a snapshot (built on first use)
+    def _get_columns(self, snapshot: Optional[_CatalogSnapshot] = None) -> ProductColumns:
+        snapshot = snapshot or self._get_snapshot()
+        if snapshot.columns is None:
+            snapshot.columns = ProductColumns(snapshot.products)
+        return snapshot.columns
+
+    # Return the projection/JSON encoder for a snapshot (created on first use)
+    def _get_encoder(self, snapshot: Optional[_CatalogSnapshot] = None) -> ProductEncoder:
+        snapshot = snapshot or self._get_snapshot()
+        if snapshot.encoder is None:
+            snapshot.encoder = ProductEncoder(snapshot.products)
+        return snapshot.encoder
+
+    # Combine a category and range filters into one boolean mask over the catalog (None = no filtering)
+    def _filter_mask(self, category: Optional[str] = None, filters: Optional[ProductFilters] = None,
+                     snapshot: Optional[_CatalogSnapshot] = None) -> Optional[np.ndarray]:
+        has_ranges = filters is not None and not filters.is_empty()
+        if category is None and not has_ranges:
+            return None
+        snapshot = snapshot or self._get_snapshot()
+        columns = self._get_columns(snapshot)
+        mask = None
+        if category is not None:
+            mask = columns.positions_mask(self._get_category_index(snapshot).positions(category))
+        if has_ranges:
+            mask = columns.mask(**filters.model_dump(), base=mask)
+        return mask
+
+    # Return (order, rank, ordered_keys) for a sort option over a snapshot, computed once per snapshot
+    # order = catalog positions in sorted order, rank[position] = where that product lands in the order,
+    # ordered_keys[i] = sort key of the product at order[i] (used to binary search cursors)
+    def _get_sort_order(self, sort_by: str, snapshot: _CatalogSnapshot) -> tuple:
+        if sort_by not in snapshot.sort_orders:
+            key, descending = SORT_OPTIONS[sort_by]
+            keys = [key(p) for p in snapshot.products]
+            order = sorted(range(len(keys)), key=keys.__getitem__, reverse=descending)
+            rank = [0] * len(order)
+            for position_in_order, catalog_position in enumerate(order):
+                rank[catalog_position] = position_in_order
+            snapshot.sort_orders[sort_by] = (order, rank, [keys[position] for position in order])
+        return snapshot.sort_orders[sort_by]
+
+    # Bring the similarity index up to date with the current catalog (runs on the caller's thread)
+    def refresh_similarity_index(self) -> None:
+        with self._similarity_update_lock:
+            snapshot = self._get_snapshot()
+            if self._similarity_version != snapshot.version:
+                self._similarity_index.update(snapshot.products)
+                self._similarity_version = snapshot.version
+
+    # Start a worker thread refreshing the similarity index, unless one is already running
+    def schedule_similarity_refresh(self) -> None:
+        with self._similarity_lock:
+            if self._similarity_refreshing:
+                return
+            self._similarity_refreshing = True
+        threading.Thread(target=self._run_similarity_refresh, name="similarity-refresh", daemon=True).start()
+
+    # Worker thread body: refresh until the index matches the latest catalog (catalogs installed
+    # while a refresh is running are picked up by the same thread)
+    def _run_similarity_refresh(self) -> None:
+        done = False
+        try:
+            while not done:
+                self.refresh_similarity_index()
+                with self._similarity_lock:
+                    done = self._similarity_version == self._snapshot.version
+                    if done:
+                        self._similarity_refreshing = False
+        finally:
+            if not done:
+                with self._similarity_lock:
+                    self._similarity_refreshing = False
+
+    # Map products back to their positions in a snapshot
+    # Returns None if any product isn't the exact object held by the snapshot (e.g. built by the caller)
+    def _catalog_positions_of(self, products: List[Product], snapshot: _CatalogSnapshot) -> Optional[List[int]]:
+        positions = []
+        for product in products:
+            position = snapshot.positions.get(product.product_id)
+            if position is None or snapshot.products[position] is not product:
+                return None
+            positions.append(position)
+        return positions
+
 
     # helper method that basically loads and converts all products from the products.json to Product objects
     # so you call this at the beginning of your functions to get the full list of products, then you can filter/search as needed
@@ -47,70 +263,116 @@ class ProductService:
         """
         Generate a 10-character ASIN-like ID (uppercase letters + digits) and ensure uniqueness
         against existing_ids. Raises RuntimeError if unique id cannot be found within attempts.
+        Each candidate comes from a single random draw over all 36^10 ids, so collisions are
+        astronomically rare and the loop almost never runs twice.
         """
         alphabet = string.ascii_uppercase + string.digits
         for _ in range(max_attempts):
-            candidate = "".join(random.choice(alphabet) for _ in range(length))
+            value = secrets.randbelow(len(alphabet) ** length)
+            characters = []
+            for _ in range(length):
+                value, digit = divmod(value, len(alphabet))
+                characters.append(alphabet[digit])
+            candidate = "".join(characters)
             if candidate not in existing_ids:
                 return candidate
         raise RuntimeError("Unable to generate unique product_id after many attempts")
     
-    def create_product(self, product_name: str, category: str, discounted_price: float, 
-                      actual_price: float, discount_percentage: float, about_product: str, 
-                      img_link: str, product_link: str, rating: float = 0.0, 
-                      rating_count: Optional[int] = None) -> Product:
+    def allocate_product_ids(self, count: int = 1) -> List[str]:
         """
-        Create a new product (admin only).
-        Validates fields and assigns unique product_id.
+        Allocate `count` new unique product ids at once (e.g. for bulk imports).
+        Uniqueness is checked against the cached catalog's id index, which is kept up to date by
+        our own writes, so this doesn't parse products.json unless it was changed externally.
         """
-        products = self._load_all_products()
-        existing_ids = {p.product_id for p in products if getattr(p, "product_id", None)}
+        if count < 0:
+            raise ValueError("count must not be negative")
+        existing_ids = self._get_snapshot().positions
+        allocated: List[str] = []
+        issued = set()
+        while len(allocated) < count:
+            product_id = self._generate_productID(existing_ids)
+            if product_id not in issued:
+                issued.add(product_id)
+                allocated.append(product_id)
+        return allocated
+    
+    # Validate product fields, raising ValueError with the first problem found
+    # None means "not provided" and is skipped, unless required=True (creating a product)
+    # Shared by create_product, update_product and bulk_apply so they all report the same messages
+    def _validate_product_fields(self, fields: dict, required: bool = False) -> None:
+        def text_invalid(name: str) -> bool:
+            value = fields.get(name)
+            if value is None:
+                return required
+            return len(value.strip()) == 0
+
+        def number_given(name: str) -> bool:
+            return fields.get(name) is not None
 
-        # Validate fields (use messages that tests expect)
-        if not product_name or len(product_name.strip()) == 0:
+        if text_invalid("product_name"):
             raise ValueError("Product name cannot be empty")
-        if not category or len(category.strip()) == 0:
+        if text_invalid("category"):
             raise ValueError("category cannot be empty")
-        if discounted_price <= 0:
+        if number_given("discounted_price") and fields["discounted_price"] <= 0:
             raise ValueError("discounted_price must be greater than 0")
-        if actual_price <= 0:
+        if number_given("actual_price") and fields["actual_price"] <= 0:
             raise ValueError("actual_price must be greater than 0")
-        if discount_percentage < 0 or discount_percentage > 100:
+        if number_given("discount_percentage") and (fields["discount_percentage"] < 0 or fields["discount_percentage"] > 100):
             raise ValueError("discount percentage must be between 0 and 100")
-        if not about_product or len(about_product.strip()) == 0:
+        if text_invalid("about_product"):
             raise ValueError("description cannot be empty")
-        if not img_link or len(img_link.strip()) == 0:
+        if text_invalid("img_link"):
             raise ValueError("image link cannot be empty")
-        if not product_link or len(product_link.strip()) == 0:
+        if text_invalid("product_link"):
             raise ValueError("product link cannot be empty")
-        if rating < 0 or rating > 5:
+        if number_given("rating") and (fields["rating"] < 0 or fields["rating"] > 5):
             raise ValueError("rating must be between 0 and 5")
-         
-         
-        product_id = self._generate_productID(existing_ids)
+        if required:
+            missing = [name for name in ("discounted_price", "actual_price", "discount_percentage")
+                       if not number_given(name)]
+            if missing:
+                raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+
+    def create_product(self, product_name: str, category: str, discounted_price: float, 
+                      actual_price: float, discount_percentage: float, about_product: str, 
+                      img_link: str, product_link: str, rating: float = 0.0, 
+                      rating_count: Optional[int] = None) -> Product:
+        """
+        Create a new product (admin only).
+        Validates fields and assigns unique product_id.
+        """
+        with self._write_lock:
+            products = list(self._get_catalog())
 
-        # Generate unique product ID
+            # Validate fields (use messages that tests expect)
+            self._validate_product_fields(dict(
+                product_name=product_name, category=category, discounted_price=discounted_price,
+                actual_price=actual_price, discount_percentage=discount_percentage, about_product=about_product,
+                img_link=img_link, product_link=product_link, rating=rating
+            ), required=True)
+
+            # Generate unique product ID
+            product_id = self.allocate_product_ids(1)[0]
         
-        new_product = Product(
-            product_id=product_id,
-            product_name=product_name.strip(),
-            category=category.strip(),
-            discounted_price=discounted_price,
-            actual_price=actual_price,
-            discount_percentage=discount_percentage,
-            about_product=about_product.strip(),
-            img_link=img_link.strip(),
-            product_link=product_link.strip(),
-            rating=rating,
-            rating_count=rating_count
-        )
+            new_product = Product(
+                product_id=product_id,
+                product_name=product_name.strip(),
+                category=category.strip(),
+                discounted_price=discounted_price,
+                actual_price=actual_price,
+                discount_percentage=discount_percentage,
+                about_product=about_product.strip(),
+                img_link=img_link.strip(),
+                product_link=product_link.strip(),
+                rating=rating,
+                rating_count=rating_count
+            )
 
-        # Persist to configured products file
-        updated_list = [p.model_dump() for p in products]
-        updated_list.append(new_product.model_dump())
-        self._repo_save(updated_list)
+            # Persist to configured products file
+            products.append(new_product)
+            self._save_catalog(products)
 
-        return new_product
+            return new_product
 
     def update_product(self, product_id: str, product_name: Optional[str] = None,
                       category: Optional[str] = None, discounted_price: Optional[float] = None,
@@ -123,63 +385,50 @@ class ProductService:
         Only updates fields that are provided (not None).
         Raises ValueError if product doesn't exist or validation fails.
         """
-        products = self._load_all_products()
+        with self._write_lock:
+            products = list(self._get_catalog())
         
-        # Find the product to update
-        product_index = None
-        existing_product = None
-        for idx, product in enumerate(products):
-            if product.product_id == product_id:
-                product_index = idx
-                existing_product = product
-                break
+            # Find the product to update
+            product_index = None
+            existing_product = None
+            for idx, product in enumerate(products):
+                if product.product_id == product_id:
+                    product_index = idx
+                    existing_product = product
+                    break
         
-        if existing_product is None:
-            raise ValueError(f"Product with ID {product_id} not found")
+            if existing_product is None:
+                raise ValueError(f"Product with ID {product_id} not found")
         
-        # Validate fields if provided
-        if product_name is not None and len(product_name.strip()) == 0:
-            raise ValueError("Product name cannot be empty")
-        if category is not None and len(category.strip()) == 0:
-            raise ValueError("category cannot be empty")
-        if discounted_price is not None and discounted_price <= 0:
-            raise ValueError("discounted_price must be greater than 0")
-        if actual_price is not None and actual_price <= 0:
-            raise ValueError("actual_price must be greater than 0")
-        if discount_percentage is not None and (discount_percentage < 0 or discount_percentage > 100):
-            raise ValueError("discount percentage must be between 0 and 100")
-        if about_product is not None and len(about_product.strip()) == 0:
-            raise ValueError("description cannot be empty")
-        if img_link is not None and len(img_link.strip()) == 0:
-            raise ValueError("image link cannot be empty")
-        if product_link is not None and len(product_link.strip()) == 0:
-            raise ValueError("product link cannot be empty")
-        if rating is not None and (rating < 0 or rating > 5):
-            raise ValueError("rating must be between 0 and 5")
+            # Validate fields if provided
+            self._validate_product_fields(dict(
+                product_name=product_name, category=category, discounted_price=discounted_price,
+                actual_price=actual_price, discount_percentage=discount_percentage, about_product=about_product,
+                img_link=img_link, product_link=product_link, rating=rating
+            ))
         
-        # Update only provided fields
-        updated_product = Product(
-            product_id=existing_product.product_id,
-            product_name=product_name.strip() if product_name is not None else existing_product.product_name,
-            category=category.strip() if category is not None else existing_product.category,
-            discounted_price=discounted_price if discounted_price is not None else existing_product.discounted_price,
-            actual_price=actual_price if actual_price is not None else existing_product.actual_price,
-            discount_percentage=discount_percentage if discount_percentage is not None else existing_product.discount_percentage,
-            about_product=about_product.strip() if about_product is not None else existing_product.about_product,
-            img_link=img_link.strip() if img_link is not None else existing_product.img_link,
-            product_link=product_link.strip() if product_link is not None else existing_product.product_link,
-            rating=rating if rating is not None else existing_product.rating,
-            rating_count=rating_count if rating_count is not None else existing_product.rating_count
-        )
+            # Update only provided fields
+            updated_product = Product(
+                product_id=existing_product.product_id,
+                product_name=product_name.strip() if product_name is not None else existing_product.product_name,
+                category=category.strip() if category is not None else existing_product.category,
+                discounted_price=discounted_price if discounted_price is not None else existing_product.discounted_price,
+                actual_price=actual_price if actual_price is not None else existing_product.actual_price,
+                discount_percentage=discount_percentage if discount_percentage is not None else existing_product.discount_percentage,
+                about_product=about_product.strip() if about_product is not None else existing_product.about_product,
+                img_link=img_link.strip() if img_link is not None else existing_product.img_link,
+                product_link=product_link.strip() if product_link is not None else existing_product.product_link,
+                rating=rating if rating is not None else existing_product.rating,
+                rating_count=rating_count if rating_count is not None else existing_product.rating_count
+            )
         
-        # Replace the product in the list
-        products[product_index] = updated_product
+            # Replace the product in the list
+            products[product_index] = updated_product
         
-        # Persist changes
-        updated_list = [p.model_dump() for p in products]
-        self._repo_save(updated_list)
+            # Persist changes
+            self._save_catalog(products)
         
-        return updated_product
+            return updated_product
 
     def delete_product(self, product_id: str) -> Product:
         """
@@ -187,49 +436,145 @@ class ProductService:
         Raises ValueError if product doesn't exist.
         Returns the deleted product for confirmation.
         """
-        products = self._load_all_products()
+        with self._write_lock:
+            products = self._get_catalog()
         
-        # Find the product to delete
-        product_to_delete = None
-        remaining_products = []
+            # Find the product to delete
+            product_to_delete = None
+            remaining_products = []
         
-        for product in products:
-            if product.product_id == product_id:
-                product_to_delete = product
-            else:
-                remaining_products.append(product)
+            for product in products:
+                if product.product_id == product_id:
+                    product_to_delete = product
+                else:
+                    remaining_products.append(product)
         
-        if product_to_delete is None:
-            raise ValueError(f"Product with ID {product_id} not found")
+            if product_to_delete is None:
+                raise ValueError(f"Product with ID {product_id} not found")
         
-        # Save the updated list (without the deleted product)
-        updated_list = [p.model_dump() for p in remaining_products]
-        self._repo_save(updated_list)
+            # Save the updated list (without the deleted product)
+            self._save_catalog(remaining_products)
         
-        return product_to_delete
+            return product_to_delete
+
+    def bulk_apply(self, operations: List[BulkProductOperation]) -> dict:
+        """
+        Apply many upsert/delete operations (admin only) with a single load and a single save.
+        - upsert with an existing product_id updates the provided fields (like update_product)
+        - upsert with an unknown or missing product_id creates a product (all create fields required,
+          product_id generated if missing)
+        - delete removes the product
+        Operations run in order, so a later row sees earlier ones. Invalid rows are reported and
+        skipped; valid rows are still applied.
+
+        Returns statistics plus one result per row:
+        {"total", "created", "updated", "deleted", "failed",
+         "results": [{"index", "op", "product_id", "status", "error"?}]}
+        """
+        with self._write_lock:
+            products: List[Optional[Product]] = list(self._get_catalog())
+            # Ids for rows that create a product without one, allocated in a single batch
+            generated_ids = iter(self.allocate_product_ids(sum(
+                1 for operation in operations if operation.op == "upsert" and not operation.product_id
+            )))
+            index_by_id: Dict[str, int] = {}
+            for index, product in enumerate(products):
+                index_by_id.setdefault(product.product_id, index)
+
+            counts = {"created": 0, "updated": 0, "deleted": 0, "failed": 0}
+            results = []
+            for row, operation in enumerate(operations):
+                result = {"index": row, "op": operation.op, "product_id": operation.product_id}
+                try:
+                    if operation.op == "delete":
+                        if not operation.product_id or operation.product_id not in index_by_id:
+                            raise ValueError(f"Product with ID {operation.product_id} not found")
+                        products[index_by_id.pop(operation.product_id)] = None
+                        status = "deleted"
+                    elif operation.op == "upsert":
+                        fields = operation.product.model_dump(exclude_none=True) if operation.product else {}
+                        existing_index = index_by_id.get(operation.product_id) if operation.product_id else None
+                        if existing_index is not None:
+                            self._validate_product_fields(fields)
+                            merged = products[existing_index].model_dump()
+                            merged.update(self._strip_text_fields(fields))
+                            products[existing_index] = Product(**merged)
+                            status = "updated"
+                        else:
+                            fields.setdefault("rating", 0.0)
+                            self._validate_product_fields(fields, required=True)
+                            product_id = operation.product_id or next(generated_ids)
+                            if product_id in index_by_id:
+                                # An explicit id earlier in this batch took the pre-allocated one
+                                product_id = self._generate_productID(index_by_id.keys())
+                            products.append(Product(product_id=product_id, **self._strip_text_fields(fields)))
+                            index_by_id[product_id] = len(products) - 1
+                            result["product_id"] = product_id
+                            status = "created"
+                    else:
+                        raise ValueError(f"Invalid op '{operation.op}'. Must be 'upsert' or 'delete'")
+                    result["status"] = status
+                    counts[status] += 1
+                except ValueError as e:
+                    result["status"] = "error"
+                    result["error"] = str(e)
+                    counts["failed"] += 1
+                results.append(result)
+
+            # Persist everything at once (skip the write entirely if nothing changed)
+            if counts["created"] or counts["updated"] or counts["deleted"]:
+                self._save_catalog([p for p in products if p is not None])
+
+            return {"total": len(operations), **counts, "results": results}
+
+    # Trim whitespace from the text fields of a product field dict (like create/update do)
+    def _strip_text_fields(self, fields: dict) -> dict:
+        return {name: value.strip() if isinstance(value, str) else value for name, value in fields.items()}
 
     def get_all_products(self) -> List[Product]:
-        # Load and return all products (no filtering)
-        return self._load_all_products()
+        # Return all products (no filtering) from the cached catalog
+        # Copy the list so callers can't reorder/extend the cached snapshot
+        return list(self._get_catalog())
     
 
     def get_product_by_id(self, product_id: str) -> Optional[Product]:
-        # Load all products using helper method
-        products = self._load_all_products()
-        
-        # Search through products to find matching ID
-        for product in products:
-            if product.product_id == product_id:
-                return product  # Return the found product
+        # Look the product up in the cached catalog's product_id index
+        snapshot = self._get_snapshot()
+        position = snapshot.positions.get(product_id)
+        if position is not None:
+            return snapshot.products[position]  # Return the found product
         
         # If we get here, product wasn't found
         print(f"Product not found: {product_id}")
         return None
     
 
-    def get_product_by_keyword(self, keyword: str) -> List[Product]:
-        # Load all products using helper method
-        products = self._load_all_products()
+    def _lookup_positions(self, product_ids: List[str], snapshot: _CatalogSnapshot) -> Tuple[List[int], List[str]]:
+        # One pass over the requested ids against the product_id index: (positions in the snapshot of the
+        # products found, ids not found), both in request order with duplicates dropped
+        positions = []
+        missing = []
+        for product_id in dict.fromkeys(product_ids):
+            position = snapshot.positions.get(product_id)
+            if position is None:
+                missing.append(product_id)
+            else:
+                positions.append(position)
+        return positions, missing
+
+    def get_products_by_ids(self, product_ids: List[str]) -> Tuple[List[Product], List[str]]:
+        # Multi-get: (products found, ids not found) for many product ids at once
+        snapshot = self._get_snapshot()
+        positions, missing = self._lookup_positions(product_ids, snapshot)
+        return [snapshot.products[position] for position in positions], missing
+
+    def get_product_by_keyword(self, keyword: str, fuzzy: bool = False) -> List[Product]:
+        # Typo-tolerant mode ("chargr cabel" -> "Charger Cable") uses the trigram index instead
+        if fuzzy:
+            return self.get_product_by_keyword_fuzzy(keyword)
+
+        # Get all products from the cached catalog
+        products = self._get_catalog()
         
         # Search only in product name (case insensitive) for exact matches
         # Returns products where the keyword appears in the product name
@@ -241,6 +586,98 @@ class ProductService:
             
         return matching_products
     
+    def get_product_by_keyword_fuzzy(self, keyword: str) -> List[Product]:
+        # Every word of the keyword must match a word in the product name within a few typos
+        # Best matches (fewest typos) come first
+        snapshot = self._get_snapshot()
+        positions = self._get_trigram_index(snapshot).search(keyword)
+        return [snapshot.products[position] for position in positions]
+    
+    def get_products_by_category(self, category: str) -> List[Product]:
+        # Products in a category or any of its sub-categories (empty list for unknown categories)
+        # e.g. "Electronics" also matches "Electronics|HomeAudio|Speakers"
+        snapshot = self._get_snapshot()
+        return [snapshot.products[position] for position in self._get_category_index(snapshot).positions(category)]
+    
+    def get_filtered_products(self, category: Optional[str] = None,
+                              filters: Optional[ProductFilters] = None) -> List[Product]:
+        # Products matching a category (including sub-categories) and/or price/rating/discount ranges,
+        # in catalog order. All conditions are evaluated together as one vectorised NumPy mask.
+        snapshot = self._get_snapshot()
+        mask = self._filter_mask(category, filters, snapshot)
+        if mask is None:
+            return list(snapshot.products)
+        return [snapshot.products[position] for position in np.flatnonzero(mask).tolist()]
+    
+    def get_top_products(self, by: str, k: int = 20) -> List[Product]:
+        """
+        Return the k best products by "rating", "discount" or "rating_count" (highest first).
+        Same result as sort_products(..., "<by>_desc")[:k] without sorting the whole catalog:
+        argpartition selects the k best, only those are sorted, and the result is cached
+        per (by, k) until the catalog changes.
+        Raises ValueError for an unknown ranking.
+        """
+        if by not in TOP_K_OPTIONS:
+            raise ValueError(f"Invalid ranking '{by}'. Must be one of: {', '.join(TOP_K_OPTIONS)}")
+        snapshot = self._get_snapshot()
+        cache_key = (by, k)
+        if cache_key not in snapshot.top_k_cache:
+            positions = self._get_columns(snapshot).top_k(TOP_K_OPTIONS[by], k)
+            snapshot.top_k_cache[cache_key] = [snapshot.products[position] for position in positions]
+        return list(snapshot.top_k_cache[cache_key])
+    
+    def get_similar_products(self, product_id: str, k: int = 10) -> List[Product]:
+        """
+        Return up to k products most similar to the given one (most similar first), by cosine
+        similarity of TF-IDF vectors over name, category and description.
+        The neighbour lists are precomputed for the whole catalog, so this is a dict lookup. After a
+        catalog change they are refreshed in the background and the previous lists are served meanwhile.
+        Raises ValueError if the product doesn't exist, SimilarityIndexNotReady before the first build.
+        """
+        snapshot = self._get_snapshot()
+        if product_id not in snapshot.positions:
+            raise ValueError(f"Product with ID {product_id} not found")
+        if self._similarity_version != snapshot.version:
+            self.schedule_similarity_refresh()
+            if self._similarity_version is None:
+                raise SimilarityIndexNotReady()
+        neighbours = self._similarity_index.neighbours(product_id)[:k]
+        return [snapshot.products[snapshot.positions[other_id]] for other_id, _ in neighbours
+                if other_id in snapshot.positions]
+    
+    def get_similarity_version(self):
+        # Catalog version the served neighbour lists were built from (part of the /similar cache key)
+        return self._similarity_version
+    
+    def get_bought_together(self, product_id: str, k: int = 10) -> List[Product]:
+        """
+        Return up to k products most often bought in the same order as the given one (most first).
+        Answered from the in-memory co-purchase index; products no longer in the catalog are skipped.
+        Raises ValueError if the product doesn't exist.
+        """
+        snapshot = self._get_snapshot()
+        if product_id not in snapshot.positions:
+            raise ValueError(f"Product with ID {product_id} not found")
+        products = []
+        for other_id, _ in self.co_purchase_index.bought_together(product_id):
+            position = snapshot.positions.get(other_id)
+            if position is not None:
+                products.append(snapshot.products[position])
+                if len(products) == k:
+                    break
+        return products
+    
+    def get_category_tree(self, path: Optional[str] = None, depth: Optional[int] = None) -> dict:
+        """
+        Return the category subtree rooted at path (whole tree if None) with product counts per node:
+        {"name", "path", "count", "children": [...]}, limited to `depth` levels below the root if given.
+        Raises ValueError if the category doesn't exist.
+        """
+        node = self._get_category_index().find(path)
+        if node is None:
+            raise ValueError(f"Category '{path}' not found")
+        return node.to_dict(depth)
+    
 
     def sort_products(self, products: List[Product], sort_by: str) -> List[Product]:
         # Sort a list of products by the specified field.
@@ -254,27 +691,183 @@ class ProductService:
         # - 'discount_asc': Discount low to high
         # - 'discount_desc': Discount high to low
         # If invalid option provided, return products unsorted (natural order from JSON)
+        #
+        # Products that come from this service (get_all_products, searches) are ordered using the
+        # presorted catalog orders instead of a fresh sort:
+        # - the whole catalog is just the presorted order
+        # - a large subset is filtered out of the presorted order (O(n))
+        # - a small subset is sorted by its integer ranks (O(m log m), no key recomputation)
+        # Anything else (e.g. products built by the caller) falls back to a normal sort.
         
-        if sort_by == "name_asc":
-            return sorted(products, key=lambda p: p.product_name.lower())
-        elif sort_by == "name_desc":
-            return sorted(products, key=lambda p: p.product_name.lower(), reverse=True)
-        elif sort_by == "price_asc":
-            return sorted(products, key=lambda p: p.discounted_price)
-        elif sort_by == "price_desc":
-            return sorted(products, key=lambda p: p.discounted_price, reverse=True)
-        elif sort_by == "rating_asc":
-            return sorted(products, key=lambda p: p.rating)
-        elif sort_by == "rating_desc":
-            return sorted(products, key=lambda p: p.rating, reverse=True)
-        elif sort_by == "discount_asc":
-            return sorted(products, key=lambda p: p.discount_percentage)
-        elif sort_by == "discount_desc":
-            return sorted(products, key=lambda p: p.discount_percentage, reverse=True)
-        else:
+        if sort_by not in SORT_OPTIONS:
             # Return unsorted if invalid option (natural order from products.json)
             return products
+        
+        snapshot = self._snapshot
+        positions = self._catalog_positions_of(products, snapshot)
+        if positions is None:
+            key, descending = SORT_OPTIONS[sort_by]
+            return sorted(products, key=key, reverse=descending)
+        
+        order, rank, _ = self._get_sort_order(sort_by, snapshot)
+        catalog = snapshot.products
+        catalog_size = len(catalog)
+        subset_size = len(positions)
+        
+        if subset_size == catalog_size and len(set(positions)) == catalog_size:
+            return [catalog[position] for position in order]
+        
+        if subset_size * math.log2(subset_size + 1) > catalog_size and len(set(positions)) == subset_size:
+            wanted = set(positions)
+            return [catalog[position] for position in order if position in wanted]
+        
+        return [catalog[position] for position in sorted(positions, key=rank.__getitem__)]
     
+    # --- Sparse field projection (?fields=) ---
+    # Parsing and the per-snapshot caches live in product_encoding_service
+
+    def parse_fields(self, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+        # ?fields= value -> field tuple (None when no projection was requested); ValueError for unknown fields
+        return parse_fields(fields)
+
+    def project_products(self, products: List[Product], fields: Optional[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+        # Project products down to the requested fields before serialization
+        # Products from the catalog snapshot reuse the precomputed shape; anything else is projected on the fly
+        fields = fields or PRODUCT_FIELDS
+        snapshot = self._snapshot
+        positions = self._catalog_positions_of(products, snapshot)
+        if positions is None:
+            return [project(product, fields) for product in products]
+        projection = self._get_encoder(snapshot).projection(fields)
+        return [projection[position] for position in positions]
+
+    def project_product(self, product: Product, fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+        return self.project_products([product], fields)[0]
+
+    # --- Pre-encoded JSON responses and ETags ---
+    # See product_encoding_service; the ETag only needs the catalog version, not the catalog
+
+    def encode_json(self, value: Any) -> bytes:
+        # Same output format as FastAPI's default JSONResponse
+        return encode_json(value)
+
+    def get_catalog_etag(self, variant: str) -> str:
+        # Strong ETag for a response variant under the current catalog version (no catalog load)
+        return make_etag((self.repository.get_version(), self._save_count), variant)
+
+    def get_encoded_response(self, variant: str, build: Callable[[], bytes]) -> Tuple[bytes, str]:
+        """
+        Return (body, etag) for a response variant, calling build() only on a cache miss.
+        Cached bodies are dropped whenever the catalog changes.
+        """
+        snapshot = self._get_snapshot()
+        return self._get_encoder(snapshot).response(variant, build), make_etag(snapshot.version, variant)
+
+    def encode_products(self, products: List[Product], fields: Optional[Tuple[str, ...]] = None) -> bytes:
+        # JSON array of products (only `fields` if given), reusing each catalog product's cached bytes
+        fields = fields or PRODUCT_FIELDS
+        snapshot = self._snapshot
+        positions = self._catalog_positions_of(products, snapshot)
+        if positions is None:
+            return encode_json(self.project_products(products, fields))
+        return self._get_encoder(snapshot).encode_positions(positions, fields)
+
+    def encode_product(self, product: Product, fields: Optional[Tuple[str, ...]] = None) -> bytes:
+        # A single product's JSON object (strip the array brackets from encode_products)
+        return self.encode_products([product], fields)[1:-1]
+
+    def encode_products_page(self, products: List[Product], next_cursor: Optional[str],
+                             fields: Optional[Tuple[str, ...]] = None) -> bytes:
+        # {"items": [...], "next_cursor": ...} with the items taken from the per-product byte cache
+        return (b'{"items":' + self.encode_products(products, fields)
+                + b',"next_cursor":' + encode_json(next_cursor) + b"}")
+
+    def encode_products_batch(self, product_ids: List[str], fields: Optional[Tuple[str, ...]] = None) -> bytes:
+        # {"products": [...], "missing": [...]} for a multi-get, straight from the index lookup to cached bytes
+        snapshot = self._get_snapshot()
+        positions, missing = self._lookup_positions(product_ids, snapshot)
+        return (b'{"products":' + self._get_encoder(snapshot).encode_positions(positions, fields or PRODUCT_FIELDS)
+                + b',"missing":' + encode_json(missing) + b"}")
+
+    # --- Cursor pagination ---
+    # Cursors are opaque tokens recording where the previous page stopped (see product_cursor_service)
+
+    def get_products_page(self, limit: int, cursor: Optional[str] = None, sort_by: Optional[str] = None,
+                          keyword: Optional[str] = None, fuzzy: bool = False, category: Optional[str] = None,
+                          filters: Optional[ProductFilters] = None) -> Tuple[List[Product], Optional[str]]:
+        """
+        Return one page of products (optionally a keyword search, category and/or range filters)
+        plus the cursor for the next page.
+        Ordering is stable for every sort option: the presorted catalog order, the natural
+        products.json order when unsorted, or the fuzzy ranking for fuzzy searches.
+        next_cursor is None on the last page.
+        Raises ValueError for an invalid cursor or one issued for a different sort.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        if sort_by not in SORT_OPTIONS:
+            sort_by = None
+
+        snapshot = self._get_snapshot()
+        catalog = snapshot.products
+        state = decode_cursor(cursor) if cursor else None
+        if state is not None and state.get("s") != (sort_by or ""):
+            raise ValueError("Cursor does not match the requested sort order")
+
+        # Checks are done per catalog position while walking the ordering
+        # Category and range filters are pre-combined into a single vectorised mask
+        checks = []
+        mask = self._filter_mask(category, filters, snapshot)
+        if mask is not None:
+            checks.append(mask.tolist().__getitem__)
+
+        # Sort keys along the ordering when it is a presorted catalog order (lets cursors resume by key)
+        ordered_keys = None
+        if keyword is not None and fuzzy:
+            # Fuzzy results are already a (small) candidate list, so paginate that list directly
+            ordering = self._get_trigram_index(snapshot).search(keyword)
+            if sort_by:
+                _, rank, _ = self._get_sort_order(sort_by, snapshot)
+                ordering = sorted(ordering, key=rank.__getitem__)
+        else:
+            if sort_by:
+                ordering, _, ordered_keys = self._get_sort_order(sort_by, snapshot)
+            elif mask is not None and keyword is None:
+                # Unsorted filtered listing: the matching positions are already in catalog order
+                ordering = np.flatnonzero(mask).tolist()
+                checks = []
+            else:
+                ordering = range(len(catalog))
+            if keyword is not None:
+                keyword_lower = keyword.lower()
+                checks.append(lambda position: keyword_lower in catalog[position].product_name.lower())
+
+        # Walk the ordering from the resume point, looking one match past the page to know if there's a next page
+        page: List[Product] = []
+        index = resume_index(ordering, state, catalog, snapshot.positions, ordered_keys,
+                             descending=bool(sort_by) and SORT_OPTIONS[sort_by][1])
+        last_index = index  # ordering index just past the last returned product
+        has_more = False
+        while index < len(ordering):
+            position = ordering[index]
+            index += 1
+            if checks and not all(check(position) for check in checks):
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(catalog[position])
+            last_index = index
+
+        next_cursor = None
+        if has_more:
+            next_state = {"s": sort_by or "", "o": last_index, "i": page[-1].product_id}
+            if ordered_keys is not None:
+                next_state["k"] = ordered_keys[last_index - 1]
+            next_cursor = encode_cursor(next_state)
+
+        return page, next_cursor
+
     def fetch_and_update_image(self, product_id: str) -> Product:
         """
         Fetch the product image from Amazon and update the product.
@@ -296,38 +889,83 @@ class ProductService:
         # Image scraping functionality has been removed
         raise NotImplementedError("Image fetching functionality is not available")
     
-    def fetch_all_images(self) -> dict:
+    def fetch_all_images(self, **fetch_options) -> dict:
+        """
+        Fetch images for all products and update them (synchronous wrapper around fetch_all_images_async,
+        for callers that aren't already running an event loop).
+        """
+        return asyncio.run(self.fetch_all_images_async(**fetch_options))
+    
+    async def fetch_all_images_async(self, **fetch_options) -> dict:
         """
         Fetch images for all products and update them.
+        Product pages are fetched concurrently on one shared async HTTP client (bounded concurrency,
+        per-host rate limit, retries with backoff - see ImageScraperService.fetch_image_urls), and all
+        new img_links are written with a single save at the end.
+        Resolved image URLs are cached, so fresh entries are skipped and stale ones revalidated.
+        fetch_options are passed through to fetch_image_urls (concurrency, host_rate, retries, backoff, max_age,
+        progress, should_stop). If should_stop ends the fetch early, the images resolved so far are still
+        saved and the products that weren't fetched are reported as failed with the error "Cancelled".
+        Products with an empty product_link are not fetched and are reported with the error "Missing product link".
         
         Returns:
             Dictionary with statistics about the operation:
             - total: Total number of products
-            - updated: Number of products successfully updated
+            - updated: Number of products whose image link changed
+            - unchanged: Number of products whose image link was already current
+            - cache_hits: Number of products answered from the image cache without a request
+            - not_modified: Number of products whose page was revalidated (HTTP 304) instead of re-scraped
             - failed: Number of products that failed to update
             - errors: List of product IDs that failed
         """
-        products = self._load_all_products()
-        total = len(products)
-        updated = 0
-        failed = 0
-        errors = []
+        products = list(self._get_catalog())
+        # Products without a link have no page to fetch; they are reported as failed below
+        results = await self.image_scraper.fetch_image_urls(
+            (product.product_link for product in products if product.product_link.strip()), **fetch_options
+        )
         
-        for product in products:
-            try:
-                self.fetch_and_update_image(product.product_id)
-                updated += 1
-            except Exception as e:
-                failed += 1
-                errors.append({
-                    "product_id": product.product_id,
-                    "product_name": product.product_name,
-                    "error": str(e)
-                })
+        with self._write_lock:
+            # Apply the results to the catalog as it is *now* (it may have been edited while we were fetching)
+            catalog = list(self._get_catalog())
+            total = len(catalog)
+            updated = 0
+            unchanged = 0
+            cache_hits = 0
+            not_modified = 0
+            failed = 0
+            errors = []
+            for index, product in enumerate(catalog):
+                if not product.product_link.strip():
+                    image_url, error, source = None, "Missing product link", None
+                else:
+                    image_url, error, source = results.get(product.product_link, (None, "Product link changed during fetch", None))
+                if source == "cache":
+                    cache_hits += 1
+                elif source == "not_modified":
+                    not_modified += 1
+                if image_url is None:
+                    failed += 1
+                    errors.append({
+                        "product_id": product.product_id,
+                        "product_name": product.product_name,
+                        "error": error
+                    })
+                elif image_url == product.img_link:
+                    unchanged += 1
+                else:
+                    catalog[index] = product.model_copy(update={"img_link": image_url})
+                    updated += 1
+        
+            # One write for the whole batch
+            if updated:
+                self._save_catalog(catalog)
         
         return {
             "total": total,
             "updated": updated,
+            "unchanged": unchanged,
+            "cache_hits": cache_hits,
+            "not_modified": not_modified,
             "failed": failed,
             "errors": errors
         }
\ No newline at end of file
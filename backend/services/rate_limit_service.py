@@ -0,0 +1,73 @@
+# Rate Limit Service: In-memory token-bucket limiters keyed by client IP, email, etc.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List
+
+# Login attempts allowed per client IP: a burst of 20, then one more per second
+LOGIN_IP_BURST = 20
+LOGIN_IP_RATE = 1.0
+
+# Login attempts allowed per email: a burst of 5, then one more every 12 seconds (5 a minute)
+LOGIN_EMAIL_BURST = 5
+LOGIN_EMAIL_RATE = 1 / 12
+
+# Buckets kept per limiter; beyond this the least recently used bucket is dropped
+DEFAULT_MAX_KEYS = 10_000
+
+
+class TokenBucketLimiter:
+    """
+    One token bucket per key (an IP address, an email...).
+
+    Each bucket holds up to `burst` tokens and refills at `rate` tokens per second; an attempt
+    takes a token or, when the bucket is empty, is refused with the time until the next token.
+    Buckets are refilled lazily when their key is seen, so an idle key costs nothing.
+
+    Memory is bounded: at most max_keys buckets are kept, in LRU order. Dropping the least
+    recently used bucket only forgets a key that hasn't been seen for a while, whose bucket has
+    usually refilled anyway.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = DEFAULT_MAX_KEYS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> [tokens, time of last refill], least recently used first
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str) -> float:
+        # Take a token for key: 0.0 if allowed, otherwise the seconds to wait before retrying
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(self.burst), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+    def reset(self) -> None:
+        # Forget every bucket
+        with self._lock:
+            self._buckets.clear()
+
+
+# Module-level limiters for POST /auth/login, shared by the whole process
+default_login_ip_limiter = TokenBucketLimiter(rate=LOGIN_IP_RATE, burst=LOGIN_IP_BURST)
+default_login_email_limiter = TokenBucketLimiter(rate=LOGIN_EMAIL_RATE, burst=LOGIN_EMAIL_BURST)
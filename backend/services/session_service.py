@@ -0,0 +1,138 @@
+# Session Service: Short-lived login session tokens held in an in-memory TTL store
+
+import hashlib
+import os
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from backend.models.session_model import Session
+from backend.repositories.session_repository import SessionRepository
+
+# A session expires after this long without being used (seconds); every use pushes the expiry forward
+DEFAULT_SESSION_TTL = 30 * 60
+
+# ...but never lives longer than this in total, however often it is used
+MAX_SESSION_LIFETIME = 7 * 24 * 60 * 60
+
+# Expired sessions are evicted (and the store persisted, if enabled) at most this often
+SWEEP_INTERVAL = 60.0
+
+
+def token_key(token: str) -> str:
+    # Sessions are keyed by a hash of the token, so neither memory dumps nor sessions.json hold usable tokens
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class SessionStore:
+    """
+    token -> Session store with sliding expiry.
+
+    Validating a token is a hash + dict lookup, and revoking one is a single delete. Expired
+    sessions are dropped when they are looked up, and all of them by a sweep that runs at most
+    once per sweep_interval as the store is used.
+
+    With a repository the store survives restarts: it is loaded at start-up and written on
+    create/revoke and on sweeps (which also pick up the sliding expiry of sessions in use).
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SESSION_TTL, max_lifetime: float = MAX_SESSION_LIFETIME,
+                 sweep_interval: float = SWEEP_INTERVAL, repository: Optional[SessionRepository] = None,
+                 clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_lifetime = max_lifetime
+        self.sweep_interval = sweep_interval
+        self.repository = repository
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Session] = {}
+        # Sliding expiries changed since the last write to the repository
+        self._dirty = False
+        self._next_sweep = clock() + sweep_interval
+        if repository is not None:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, user_id: str) -> Tuple[str, Session]:
+        # New session for a user: (token for the client, session)
+        token = secrets.token_urlsafe(32)
+        now = self._clock()
+        session = Session(user_id=user_id, created_at=now, expires_at=now + self.ttl)
+        with self._lock:
+            self._sessions[token_key(token)] = session
+            self._maybe_sweep(now)
+            self._persist()
+        return token, session.model_copy()
+
+    def get(self, token: str) -> Optional[Session]:
+        # The live session for a token (a copy), extending its expiry; None if unknown or expired
+        if not token:
+            return None
+        key = token_key(token)
+        now = self._clock()
+        with self._lock:
+            self._maybe_sweep(now)
+            session = self._sessions.get(key)
+            if session is None:
+                return None
+            if session.expires_at <= now:
+                del self._sessions[key]
+                self._dirty = True
+                return None
+            session.expires_at = min(now + self.ttl, session.created_at + self.max_lifetime)
+            self._dirty = True
+            return session.model_copy()
+
+    def revoke(self, token: str) -> bool:
+        # End a session (logout); False if there was no such session
+        with self._lock:
+            if self._sessions.pop(token_key(token), None) is None:
+                return False
+            self._persist()
+            return True
+
+    def sweep(self) -> int:
+        # Evict every expired session now; returns how many were removed
+        with self._lock:
+            return self._sweep(self._clock())
+
+    def _maybe_sweep(self, now: float) -> None:
+        # Caller holds the lock
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+    def _sweep(self, now: float) -> int:
+        # Caller holds the lock
+        self._next_sweep = now + self.sweep_interval
+        expired = [key for key, session in self._sessions.items() if session.expires_at <= now]
+        for key in expired:
+            del self._sessions[key]
+        if expired or self._dirty:
+            self._persist()
+        return len(expired)
+
+    def _persist(self) -> None:
+        # Caller holds the lock
+        self._dirty = False
+        if self.repository is not None:
+            self.repository.save_all({key: session.model_dump() for key, session in self._sessions.items()})
+
+    def _load(self) -> None:
+        # Restore the sessions that haven't expired (malformed entries are skipped)
+        now = self._clock()
+        for key, data in self.repository.get_all().items():
+            try:
+                session = Session(**data)
+            except (TypeError, ValueError):
+                continue
+            if session.expires_at > now:
+                self._sessions[key] = session
+
+
+# Module-level store shared by every AuthService. Set PERSIST_SESSIONS=1 to keep sessions across restarts
+default_session_store = SessionStore(
+    repository=SessionRepository() if os.environ.get("PERSIST_SESSIONS") == "1" else None
+)
@@ -0,0 +1,259 @@
+# Similarity Service: Content-based "similar products" from TF-IDF vectors over product text
+
+import math
+from collections import Counter
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from backend.models.product_model import Product
+from backend.services.fuzzy_search_service import tokenize
+
+# Text fields that describe a product and how much each occurrence of a word counts
+# (the name says more about what a product is than its long marketing description)
+FIELD_WEIGHTS = (("product_name", 2.0), ("category", 1.0), ("about_product", 1.0))
+
+# How many neighbours are precomputed per product
+DEFAULT_NEIGHBOURS = 20
+
+# Incremental updates keep the IDF weights of unchanged products as they were; once this share
+# of the catalog has changed since the last full build, every row is recomputed instead
+FULL_REBUILD_FRACTION = 0.2
+
+# Upper bound on the cells of any temporary dense array used while scoring (16M float32 = 64 MB)
+MAX_BLOCK_CELLS = 16_000_000
+
+
+class SimilarityIndexNotReady(Exception):
+    """Raised while the first similarity index is still being built; retry later (HTTP 503)"""
+
+
+def product_text(product: Product) -> Tuple[str, ...]:
+    # The text fields product_terms() reads, to tell cheaply whether they changed
+    return tuple(getattr(product, field) or "" for field, _ in FIELD_WEIGHTS)
+
+
+def product_terms(product: Product) -> Dict[str, float]:
+    # Weighted term counts over the product's text fields (single characters are dropped)
+    terms: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for word in tokenize(getattr(product, field) or ""):
+            if len(word) > 1:
+                terms[word] += weight
+    return dict(terms)
+
+
+class SimilarityIndex:
+    """
+    Top-N most similar products for every product, by cosine similarity of TF-IDF vectors.
+
+    Vectors use sublinear term frequency (1 + log tf) and smoothed IDF, normalised to unit length.
+    Only terms shared by at least two products become matrix columns (a term unique to one product
+    can't make two products similar, it only contributes to that product's norm), which keeps the
+    matrix small. Scores are computed block by block as dense matrix products, and the result is
+    a plain dict, so a lookup is O(1).
+
+    update() is incremental: each product's TF-IDF row is kept, and only the rows of changed/added
+    products (plus the few products holding a term that just became shared or stopped being shared)
+    are recomputed. Those rows, and products whose neighbour list referenced a changed or removed
+    product, are rescored against the catalog, and the new scores of changed rows are merged into
+    every other list. Unchanged rows keep the IDF weights they were computed with until the next
+    full build.
+    """
+
+    def __init__(self, size: int = DEFAULT_NEIGHBOURS):
+        self.size = size
+        self._texts: Dict[str, Tuple[str, ...]] = {}
+        self._terms: Dict[str, Dict[str, float]] = {}
+        self._document_frequency: Counter = Counter()
+        # term -> ids of the products using it (finds the rows a change of shared terms affects)
+        self._postings: Dict[str, Set[str]] = {}
+        # Matrix columns, and product_id -> (column indices, unit-length weights) of its TF-IDF row
+        self._vocabulary: Dict[str, int] = {}
+        self._rows: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._neighbours: Dict[str, List[Tuple[str, float]]] = {}
+        # Products changed since the last full build
+        self._pending_changes = 0
+        self.full_builds = 0
+        self.incremental_updates = 0
+        self.rows_computed = 0
+
+    def neighbours(self, product_id: str) -> List[Tuple[str, float]]:
+        # [(product_id, cosine similarity)] best first, empty for unknown products
+        return self._neighbours.get(product_id, [])
+
+    def update(self, products: Sequence[Product]) -> None:
+        # Bring the index in line with the given catalog (first occurrence of a product_id wins)
+        # The neighbour lists are replaced in one assignment, so concurrent lookups see old or new lists
+        # Only products whose text changed are tokenized again
+        new_texts: Dict[str, Tuple[str, ...]] = {}
+        new_terms: Dict[str, Dict[str, float]] = {}
+        for product in products:
+            product_id = product.product_id
+            if product_id in new_terms:
+                continue
+            text = new_texts[product_id] = product_text(product)
+            if self._texts.get(product_id) == text:
+                new_terms[product_id] = self._terms[product_id]
+            else:
+                new_terms[product_id] = product_terms(product)
+
+        changed = {product_id for product_id, terms in new_terms.items() if self._terms.get(product_id) != terms}
+        removed = self._terms.keys() - new_terms.keys()
+        self._texts = new_texts
+        if not changed and not removed:
+            return
+
+        # Terms whose document frequency moves, and whether each was a matrix column before
+        touched_terms = set()
+        for product_id in changed | removed:
+            touched_terms.update(self._terms.get(product_id, ()))
+        for product_id in changed:
+            touched_terms.update(new_terms[product_id])
+        was_shared = {term: self._document_frequency[term] >= 2 for term in touched_terms}
+
+        for product_id in changed | removed:
+            for term in self._terms.get(product_id, ()):
+                self._document_frequency[term] -= 1
+                holders = self._postings[term]
+                holders.discard(product_id)
+                if not holders:
+                    del self._postings[term]
+        for product_id in changed:
+            for term in new_terms[product_id]:
+                self._document_frequency[term] += 1
+                self._postings.setdefault(term, set()).add(product_id)
+        self._document_frequency = +self._document_frequency
+        self._terms = new_terms
+        self._pending_changes += len(changed) + len(removed)
+
+        ids = list(new_terms)
+        if not self._neighbours or self._pending_changes > FULL_REBUILD_FRACTION * len(ids):
+            self._vocabulary = {}
+            self._rows = {product_id: self._row_vector(product_id, len(ids)) for product_id in ids}
+            self._neighbours = self._score_rows(self._build_matrix(ids), ids, list(range(len(ids))))
+            self._pending_changes = 0
+            self.full_builds += 1
+            return
+
+        # Recompute the changed rows, and the rows holding a term that gained or lost its column
+        recompute = set(changed)
+        for term in touched_terms:
+            if (self._document_frequency[term] >= 2) != was_shared[term]:
+                recompute.update(self._postings.get(term, ()))
+        for product_id in removed:
+            self._rows.pop(product_id, None)
+        for product_id in recompute:
+            self._rows[product_id] = self._row_vector(product_id, len(ids))
+        matrix = self._build_matrix(ids)
+
+        touched = recompute | removed
+        rescore = [
+            row for row, product_id in enumerate(ids)
+            if product_id in recompute or any(other in touched for other, _ in self._neighbours.get(product_id, ()))
+        ]
+        rescored = set(rescore)
+        kept = {product_id: self._neighbours[product_id] for row, product_id in enumerate(ids) if row not in rescored}
+        kept.update(self._score_rows(matrix, ids, rescore))
+
+        # Cosine similarity is symmetric, so a recomputed row also gives its score in every other
+        # product's list; only lists where it beats the current worst entry need touching
+        changed_rows = [row for row, product_id in enumerate(ids) if product_id in recompute]
+        if changed_rows:
+            worst = np.array([
+                lst[-1][1] if len(lst) >= self.size else 0.0
+                for lst in (kept[product_id] for product_id in ids)
+            ])
+            for row, scores in zip(changed_rows, self._similarities(matrix, changed_rows)):
+                scores[row] = 0.0
+                for other in np.flatnonzero(scores > worst).tolist():
+                    if other in rescored:
+                        continue
+                    merged = kept[ids[other]] + [(ids[row], round(float(scores[other]), 4))]
+                    merged.sort(key=lambda item: -item[1])
+                    kept[ids[other]] = merged[:self.size]
+                    worst[other] = kept[ids[other]][-1][1] if len(kept[ids[other]]) >= self.size else 0.0
+
+        self._neighbours = kept
+        self.incremental_updates += 1
+
+    def _row_vector(self, product_id: str, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Unit-length TF-IDF row of one product under the current document frequencies
+        # (column indices over the shared-term vocabulary, weights)
+        self.rows_computed += 1
+        weights = {
+            term: (1.0 + math.log(tf)) * (math.log((1 + count) / (1 + self._document_frequency[term])) + 1.0)
+            for term, tf in self._terms[product_id].items()
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        columns: List[int] = []
+        values: List[float] = []
+        for term, weight in weights.items():
+            if self._document_frequency[term] < 2:
+                continue
+            columns.append(self._vocabulary.setdefault(term, len(self._vocabulary)))
+            values.append(weight / norm)
+        return np.asarray(columns, dtype=np.int64), np.asarray(values, dtype=np.float32)
+
+    def _build_matrix(self, ids: List[str]) -> tuple:
+        # CSR arrays (indptr, indices, data, width) stacking the kept rows of the given products
+        rows = [self._rows[product_id] for product_id in ids]
+        lengths = np.fromiter((len(columns) for columns, _ in rows), dtype=np.int64, count=len(rows))
+        indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        if not rows:
+            return indptr, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), len(self._vocabulary)
+        return (
+            indptr,
+            np.concatenate([columns for columns, _ in rows]),
+            np.concatenate([values for _, values in rows]),
+            len(self._vocabulary),
+        )
+
+    def _dense_rows(self, matrix: tuple, rows) -> np.ndarray:
+        # Dense (len(rows) x vocabulary) float32 copy of the given CSR rows
+        indptr, indices, data, width = matrix
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = indptr[rows]
+        lengths = indptr[rows + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        dense = np.zeros((len(rows), width), dtype=np.float32)
+        dense[np.repeat(np.arange(len(rows)), lengths), indices[offsets]] = data[offsets]
+        return dense
+
+    def _similarities(self, matrix: tuple, rows: List[int]):
+        """
+        Yield the cosine similarity of each given row against every product.
+        Rows are densified in blocks and scored with one matrix product per block (BLAS), which is
+        much faster than sparse arithmetic in NumPy at catalog sizes. Blocks are sized so that no
+        temporary array exceeds MAX_BLOCK_CELLS; the candidate side is densified once if it fits.
+        """
+        width = matrix[3]
+        count = len(matrix[0]) - 1
+        chunk = max(1, MAX_BLOCK_CELLS // max(width, 1))
+        block_size = max(1, MAX_BLOCK_CELLS // max(width, count, 1))
+        candidates = self._dense_rows(matrix, range(count)) if chunk >= count else None
+
+        for begin in range(0, len(rows), block_size):
+            block = self._dense_rows(matrix, rows[begin:begin + block_size])
+            if candidates is not None:
+                scores = block @ candidates.T
+            else:
+                scores = np.hstack([
+                    block @ self._dense_rows(matrix, range(start, min(count, start + chunk))).T
+                    for start in range(0, count, chunk)
+                ])
+            yield from scores
+
+    def _score_rows(self, matrix: tuple, ids: List[str], rows: List[int]) -> Dict[str, List[Tuple[str, float]]]:
+        # Top-N neighbours (positive similarity only, best first) for each given row
+        result = {}
+        for row, scores in zip(rows, self._similarities(matrix, rows)):
+            scores[row] = 0.0
+            k = min(self.size, len(ids) - 1)
+            if k <= 0:
+                result[ids[row]] = []
+                continue
+            candidates = np.argpartition(-scores, k - 1)[:k]
+            candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+            result[ids[row]] = [(ids[other], round(float(scores[other]), 4)) for other in candidates.tolist() if scores[other] > 0]
+        return result
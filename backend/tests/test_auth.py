@@ -1,5 +1,7 @@
 import os
 import json
+import asyncio
+import threading
 import uuid
 import secrets
 import string
@@ -10,6 +12,8 @@ from fastapi.testclient import TestClient
 from backend.main import app
 from backend.services.auth_service import AuthService
 from backend.models.user_model import User
+from backend.services.rate_limit_service import TokenBucketLimiter, default_login_ip_limiter, default_login_email_limiter
+from backend.services.session_service import default_session_store
 
 # TODO: this wipes users.json every test run - will delete real user data if it exists
 # need to move to backend/data/test/ folder so tests dont touch production files
@@ -33,6 +37,10 @@ def prepare_test_env():
         json.dump([], f)
     
     os.environ["USERS_FILE"] = "users.json"
+
+    # Every test starts with full login rate-limit buckets
+    default_login_ip_limiter.reset()
+    default_login_email_limiter.reset()
     
     yield  # Run test here
     
@@ -95,6 +103,11 @@ def _write_multiple_users(*users_data):
         json.dump(all_users, f, indent=2)
     return result
 
+def _auth_headers(user):
+    """Helper: log a test user in (open a session, as POST /auth/login does) and return its Bearer headers."""
+    session_token, _ = default_session_store.create(user["user_id"])
+    return {"Authorization": f"Bearer {session_token}"}
+
 # ============================================================================
 # UNIT TESTS - Testing AuthService with mocked dependencies
 # ============================================================================
@@ -221,6 +234,51 @@ class TestAuthServiceUnit:
         user = self.service.login_user("test@example.com", "WrongPassword")
         assert user is None
     
+    @pytest.mark.unit
+    def test_login_and_register_async_use_password_hasher(self):
+        """UNIT TEST: The async variants hash/verify on the password hasher pool"""
+        password = "TestPass123"
+        user_data = {
+            "user_id": str(uuid.uuid4()),
+            "name": "Test User",
+            "email": "test@example.com",
+            "password_hash": bcrypt.hashpw(password.encode(), bcrypt.gensalt(4)).decode(),
+            "user_token": "token123",
+            "role": "customer"
+        }
+        self.mock_repository.get_all.return_value = [user_data]
+
+        assert asyncio.run(self.service.login_user_async("TEST@example.com", password)).user_id == user_data["user_id"]
+        assert asyncio.run(self.service.login_user_async("test@example.com", "WrongPassword1")) is None
+        assert asyncio.run(self.service.login_user_async("nobody@example.com", password)) is None
+
+        new_user = asyncio.run(self.service.register_user_async("New User", "new@example.com", "Secret123"))
+        assert bcrypt.checkpw(b"Secret123", new_user.password_hash.encode())
+        self.mock_repository.save_all.assert_called_once()
+        with pytest.raises(ValueError, match="Email already exists"):
+            asyncio.run(self.service.register_user_async("Dup", "test@example.com", "Secret123"))
+
+    @pytest.mark.unit
+    def test_password_hasher_rejects_when_queue_full(self):
+        """UNIT TEST: Beyond max_pending calls in flight the hasher fails fast, and frees slots when done"""
+        from backend.services.password_service import PasswordHasher, PasswordHasherBusy
+        hasher = PasswordHasher(max_workers=1, max_pending=2)
+        release = threading.Event()
+        hasher.verify = lambda password, password_hash: release.wait(5)
+
+        async def run():
+            first = asyncio.ensure_future(hasher.verify_async("a", "h"))
+            second = asyncio.ensure_future(hasher.verify_async("b", "h"))
+            await asyncio.sleep(0)
+            with pytest.raises(PasswordHasherBusy):
+                await hasher.verify_async("c", "h")
+            release.set()
+            assert await asyncio.gather(first, second) == [True, True]
+            # Slots are free again
+            return await hasher.verify_async("d", "h")
+
+        assert asyncio.run(run()) is True
+
     @pytest.mark.unit
     def test_login_user_not_found(self):
         """UNIT TEST: Login with non-existent email returns None"""
@@ -298,6 +356,140 @@ class TestAuthServiceUnit:
         user = self.service.get_user_by_token("invalid_token")
         assert user is None
     
+    @pytest.mark.unit
+    def test_malformed_user_record_is_rejected_on_load(self):
+        """UNIT TEST: Stored records are validated when loaded, so a bad email never reaches the indexes"""
+        self.mock_repository.get_all.return_value = [{
+            "user_id": "u1", "name": "Bad", "email": "not-an-email",
+            "password_hash": "x", "user_token": "t" * 28, "role": "customer"
+        }]
+        with pytest.raises(ValueError):
+            self.service.get_user_by_token("t" * 28)
+
+    @pytest.mark.unit
+    def test_user_indexes_built_once_per_change(self):
+        """UNIT TEST: Token/id lookups are answered from the index; a save rebuilds it"""
+        users = [
+            {"user_id": f"id-{i}", "name": f"User {i}", "email": f"user{i}@example.com",
+             "password_hash": "hashed", "user_token": f"token-{i}", "role": "customer"}
+            for i in range(3)
+        ]
+        self.mock_repository.get_all = Mock(side_effect=lambda: [dict(u) for u in users])
+        self.mock_repository.save_all = Mock(side_effect=lambda data: users.__setitem__(slice(None), data))
+
+        assert self.service.get_user_by_token("token-2").user_id == "id-2"
+        assert self.service.get_user_by_id("id-1").user_token == "token-1"
+        assert self.service.get_user_by_token("missing") is None
+        assert self.mock_repository.get_all.call_count == 1
+
+        # Returned users are copies: changing one doesn't change the index
+        self.service.get_user_by_id("id-0").role = "admin"
+        assert self.service.get_user_by_id("id-0").role == "customer"
+
+        self.service.set_user_role("id-0", "admin")
+        assert self.service.get_user_by_token("token-0").role == "admin"
+
+    @pytest.mark.unit
+    def test_email_index_for_login_and_registration(self):
+        """UNIT TEST: Email lookups use the normalized-email index; the file is parsed once"""
+        password = "TestPass123"
+        user_data = {
+            "user_id": "id-1",
+            "name": "Test User",
+            "email": "test@example.com",
+            "password_hash": bcrypt.hashpw(password.encode(), bcrypt.gensalt(4)).decode(),
+            "user_token": "token-1",
+            "role": "customer"
+        }
+        self.mock_repository.get_all.return_value = [user_data]
+
+        assert self.service.get_user_by_email("  Test@Example.COM ").user_id == "id-1"
+        assert self.service.get_user_by_email("other@example.com") is None
+        assert self.service.login_user("TEST@example.com", password).user_id == "id-1"
+        with pytest.raises(ValueError, match="Email already exists"):
+            self.service.register_user("Dup", " TEST@example.com", "Secret123")
+        assert self.mock_repository.get_all.call_count == 1
+
+        new_user = self.service.register_user("New", "New@Example.com", "Secret123")
+        saved = self.mock_repository.save_all.call_args[0][0]
+        assert [u["email"] for u in saved] == ["test@example.com", "new@example.com"]
+        assert new_user.email == "new@example.com"
+
+    @pytest.mark.unit
+    def test_principal_cache_lru_ttl_and_invalidation(self):
+        """UNIT TEST: Principal cache is bounded, expires entries, and drops exactly the changed users"""
+        from backend.services.auth_service import PrincipalCache
+        repository = Mock()
+        repository.get_version.return_value = "v1"
+        cache = PrincipalCache(repository, max_size=2, ttl=60, recheck_interval=0)
+
+        def make_user(i, role="customer"):
+            return User(user_id=f"id-{i}", name=f"User {i}", email=f"u{i}@example.com",
+                        password_hash="hashed", user_token=f"token-{i}", role=role)
+
+        users = [make_user(i) for i in range(3)]
+        assert cache.get("token-0") is None  # first lookup syncs with the file version
+        for user in users:
+            cache.put(user.user_token, user)
+        assert cache.get("token-0") is None  # evicted (least recently used)
+        assert cache.get("token-1").user_id == "id-1"
+
+        # A write that changes user 1's role drops only user 1
+        saved = [u.model_dump() for u in users]
+        saved[1]["role"] = "admin"
+        cache.invalidate_changed(saved, "v2")
+        repository.get_version.return_value = "v2"
+        assert cache.get("token-1") is None
+        assert cache.get("token-2").user_id == "id-2"
+
+        # Token rotation / deletion: the old token disappears from the file
+        cache.invalidate_changed(saved[:2], "v3")
+        repository.get_version.return_value = "v3"
+        assert cache.get("token-2") is None
+
+        # A lookup that raced with an invalidation isn't cached
+        generation = cache.generation
+        cache.clear()
+        cache.put("token-0", users[0], generation)
+        assert cache.get("token-0") is None
+
+        # An edit made outside AuthService clears everything at the next check
+        cache.put("token-0", users[0])
+        repository.get_version.return_value = "edited"
+        assert cache.get("token-0") is None
+
+        # Entries expire after the TTL
+        cache.ttl = 0
+        cache.put("token-0", users[0])
+        assert cache.get("token-0") is None
+
+    @pytest.mark.unit
+    def test_user_repository_version_sees_same_size_rewrite(self, tmp_path):
+        """UNIT TEST: Two same-sized writes in quick succession still change the users.json version"""
+        from backend.repositories.user_repository import UserRepository
+        repository = UserRepository()
+        repository.data_dir = tmp_path
+        repository.save_all([{"user_token": "a" * 28}])
+        first = repository.get_version()
+        repository.save_all([{"user_token": "b" * 28}])
+        assert repository.get_version() != first
+
+    @pytest.mark.unit
+    def test_user_repository_version_is_a_stat(self, tmp_path):
+        """UNIT TEST: The version doesn't read users.json, is stable between writes and sees other instances' writes"""
+        from backend.repositories.user_repository import UserRepository
+        repository = UserRepository()
+        repository.data_dir = tmp_path
+        other = UserRepository()
+        other.data_dir = tmp_path
+        repository.save_all([{"user_token": "a" * 28}])
+
+        with patch("builtins.open", side_effect=AssertionError("users.json read")):
+            first = repository.get_version()
+            assert repository.get_version() == first
+        other.save_all([{"user_token": "b" * 28}])
+        assert repository.get_version() != first
+
     @pytest.mark.unit
     def test_set_user_role_success(self):
         """UNIT TEST: Set user role successfully updates role"""
@@ -419,6 +611,229 @@ class TestAuthServiceUnit:
         assert saved_data_store[0]["role"] == "admin"
 
 
+class TestBulkImportUnit:
+    """UNIT TESTS: Test AuthService.import_users with a mocked repository and hasher"""
+
+    def setup_method(self):
+        """Service with one existing user; hash_many returns fake hashes"""
+        self.mock_repository = Mock()
+        self.mock_repository.get_all.return_value = [{
+            "user_id": "existing", "name": "Existing", "email": "taken@example.com",
+            "password_hash": "x", "user_token": "t" * 28, "role": "customer"
+        }]
+        self.service = AuthService()
+        self.service.repository = self.mock_repository
+        self.service.password_hasher = Mock()
+        self.service.password_hasher.hash_many.side_effect = lambda passwords, processes, **kwargs: [f"hash:{p}" for p in passwords]
+
+    @pytest.mark.unit
+    def test_import_dedupes_and_saves_once(self):
+        """UNIT TEST: Duplicates and bad passwords are skipped, the rest are saved in one write"""
+        result = self.service.import_users([
+            {"name": "A", "email": "a@example.com", "password": "Password1"},
+            {"name": "Taken", "email": "TAKEN@example.com", "password": "Password1"},
+            {"name": "A again", "email": " A@example.com", "password": "Password2"},
+            {"name": "Weak", "email": "weak@example.com", "password": "short"},
+            {"name": "B", "email": "b@example.com", "password": "Password3"},
+        ])
+
+        assert (result["total"], result["imported"], result["skipped"]) == (5, 2, 3)
+        assert {error["email"] for error in result["errors"]} == {"taken@example.com", "a@example.com", "weak@example.com"}
+        assert "users_per_second" in result and "hash_seconds" in result
+        self.service.password_hasher.hash_many.assert_called_once()
+        assert self.service.password_hasher.hash_many.call_args.args[0] == ["Password1", "Password3"]
+
+        self.mock_repository.save_all.assert_called_once()
+        saved = self.mock_repository.save_all.call_args.args[0]
+        assert [u["email"] for u in saved] == ["taken@example.com", "a@example.com", "b@example.com"]
+        assert saved[1]["password_hash"] == "hash:Password1"
+        assert len({u["user_token"] for u in saved}) == 3
+
+    @pytest.mark.unit
+    def test_cancelled_import_keeps_hashed_users(self):
+        """UNIT TEST: Users hashed before cancellation are imported, the rest reported as cancelled"""
+        self.service.password_hasher.hash_many.side_effect = lambda passwords, processes, **kwargs: ["hash"]
+        result = self.service.import_users([
+            {"name": "A", "email": "a@example.com", "password": "Password1"},
+            {"name": "B", "email": "b@example.com", "password": "Password2"},
+        ])
+        assert result["imported"] == 1
+        assert result["errors"] == [{"email": "b@example.com", "error": "Cancelled"}]
+
+    @pytest.mark.unit
+    def test_nothing_to_import_writes_nothing(self):
+        """UNIT TEST: A batch of duplicates doesn't rewrite users.json"""
+        result = self.service.import_users([{"name": "T", "email": "taken@example.com", "password": "Password1"}])
+        assert result["imported"] == 0
+        self.mock_repository.save_all.assert_not_called()
+
+
+class TestUserListingUnit:
+    """UNIT TESTS: Test the paginated, searchable admin user listing with a mocked repository"""
+
+    def setup_method(self):
+        """Service over six users in no particular order"""
+        people = [("dave@example.com", "Zed Dave", "customer"), ("amy@example.com", "Amy Pond", "admin"),
+                  ("carl@example.com", "Amelia Carl", "customer"), ("bob@example.com", "Bob Stone", "customer"),
+                  ("eve@example.com", "Eve Moss", "admin"), ("zoe@example.com", "Zoe Amberly", "customer")]
+        self.mock_repository = Mock()
+        self.mock_repository.get_all.return_value = [
+            {"user_id": email.split("@")[0], "name": name, "email": email, "password_hash": "x",
+             "user_token": email.split("@")[0].ljust(28, "0"), "role": role}
+            for email, name, role in people
+        ]
+        self.service = AuthService()
+        self.service.repository = self.mock_repository
+
+    def _walk(self, limit, **filters):
+        """Helper: follow next_cursor through every page and return the user ids"""
+        ids, cursor = [], None
+        while True:
+            users, cursor = self.service.get_users_page(limit=limit, cursor=cursor, **filters)
+            assert len(users) <= limit
+            ids.extend(u.user_id for u in users)
+            if cursor is None:
+                return ids
+
+    @pytest.mark.unit
+    def test_pages_are_ordered_by_email(self):
+        """UNIT TEST: Pages follow email order with no gaps or repeats"""
+        users, cursor = self.service.get_users_page(limit=2)
+        assert [u.user_id for u in users] == ["amy", "bob"]
+        assert cursor is not None
+        assert self._walk(2) == ["amy", "bob", "carl", "dave", "eve", "zoe"]
+        assert self._walk(6) == ["amy", "bob", "carl", "dave", "eve", "zoe"]
+
+    @pytest.mark.unit
+    def test_role_filter_and_prefix_search(self):
+        """UNIT TEST: Role filter and email/name prefix search, each user listed once"""
+        assert self._walk(1, role="ADMIN") == ["amy", "eve"]
+        # "am" matches Amelia Carl's name and amy's email and name (listed once, under the email)
+        assert self._walk(1, query="Am") == ["carl", "amy"]
+        assert self._walk(5, query="z") == ["dave", "zoe"]
+        assert self._walk(5, query="am", role="customer") == ["carl"]
+        users, cursor = self.service.get_users_page(query="nobody")
+        assert (users, cursor) == ([], None)
+
+    @pytest.mark.unit
+    def test_invalid_role_and_cursor(self):
+        """UNIT TEST: Bad role, bad cursor and a cursor reused with other filters raise ValueError"""
+        with pytest.raises(ValueError, match="Invalid role"):
+            self.service.get_users_page(role="owner")
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            self.service.get_users_page(limit=2, cursor="not-a-cursor")
+        _, cursor = self.service.get_users_page(limit=2)
+        with pytest.raises(ValueError, match="does not match"):
+            self.service.get_users_page(limit=2, cursor=cursor, role="admin")
+
+    @pytest.mark.unit
+    def test_listing_follows_changes(self):
+        """UNIT TEST: A saved role change shows up in the role listing; a cursor survives it"""
+        def save_all(data):
+            self.mock_repository.get_all.return_value = data
+        self.mock_repository.save_all.side_effect = save_all
+        _, cursor = self.service.get_users_page(limit=2)
+        self.service.set_user_role("dave", "admin")
+        assert self._walk(5, role="admin") == ["amy", "dave", "eve"]
+        users, _ = self.service.get_users_page(limit=10, cursor=cursor)
+        assert [u.user_id for u in users] == ["carl", "dave", "eve", "zoe"]
+
+
+class TestSessionStoreUnit:
+    """UNIT TESTS: Test the expiring session store with a controllable clock"""
+
+    def setup_method(self):
+        """Store with a 10s idle TTL, 25s max lifetime and a fake clock"""
+        from backend.services.session_service import SessionStore
+        self.now = 1000.0
+        self.store = SessionStore(ttl=10, max_lifetime=25, sweep_interval=5, clock=lambda: self.now)
+
+    @pytest.mark.unit
+    def test_sliding_expiry_and_max_lifetime(self):
+        """UNIT TEST: Each use extends the session, up to the max lifetime"""
+        token, session = self.store.create("user-1")
+        assert session.expires_at == 1010.0
+
+        self.now = 1008.0
+        assert self.store.get(token).expires_at == 1018.0
+        self.now = 1016.0
+        assert self.store.get(token).expires_at == 1025.0  # capped at created_at + max_lifetime
+        self.now = 1025.0
+        assert self.store.get(token) is None
+        assert len(self.store) == 0
+
+    @pytest.mark.unit
+    def test_revoke_and_sweep(self):
+        """UNIT TEST: Revocation is immediate; idle sessions are evicted by the periodic sweep"""
+        token, _ = self.store.create("user-1")
+        idle, _ = self.store.create("user-2")
+        assert self.store.get("unknown") is None
+
+        assert self.store.revoke(token) is True
+        assert self.store.get(token) is None
+        assert self.store.revoke(token) is False
+
+        self.now = 1011.0
+        self.store.create("user-3")  # any use past the sweep interval evicts expired sessions
+        assert len(self.store) == 1
+        assert self.store.get(idle) is None
+
+    @pytest.mark.unit
+    def test_persisted_sessions_survive_restart(self, tmp_path):
+        """UNIT TEST: With a repository, live sessions (not tokens) are saved and reloaded"""
+        from backend.repositories.session_repository import SessionRepository
+        from backend.services.session_service import SessionStore
+        repository = SessionRepository()
+        repository.data_dir = tmp_path
+        store = SessionStore(ttl=10, repository=repository, clock=lambda: self.now)
+        token, _ = store.create("user-1")
+        expired, _ = store.create("user-2")
+        store.revoke(expired)
+
+        assert token not in (tmp_path / "sessions.json").read_text()
+        restarted = SessionStore(ttl=10, repository=repository, clock=lambda: self.now)
+        assert restarted.get(token).user_id == "user-1"
+        assert restarted.get(expired) is None
+
+
+class TestTokenBucketLimiterUnit:
+    """UNIT TESTS: Test the token-bucket limiter with a controllable clock"""
+
+    def setup_method(self):
+        """Limiter with a burst of 2, one token per 10s and room for 2 keys"""
+        self.now = 0.0
+        self.limiter = TokenBucketLimiter(rate=0.1, burst=2, max_keys=2, clock=lambda: self.now)
+
+    @pytest.mark.unit
+    def test_burst_then_refill(self):
+        """UNIT TEST: A key gets its burst, then waits for the refill; other keys are unaffected"""
+        assert self.limiter.acquire("a") == 0.0
+        assert self.limiter.acquire("a") == 0.0
+        assert self.limiter.acquire("a") == pytest.approx(10.0)
+        assert self.limiter.acquire("b") == 0.0
+
+        self.now = 5.0
+        assert self.limiter.acquire("a") == pytest.approx(5.0)
+        self.now = 10.0
+        assert self.limiter.acquire("a") == 0.0
+        assert self.limiter.acquire("a") > 0
+
+    @pytest.mark.unit
+    def test_least_recently_used_bucket_is_evicted(self):
+        """UNIT TEST: Only max_keys buckets are kept; the least recently used one goes first"""
+        self.limiter.acquire("a")
+        self.limiter.acquire("a")
+        self.limiter.acquire("b")
+        self.limiter.acquire("a")  # "a" is now the most recently used
+        self.limiter.acquire("c")  # evicts "b"
+
+        assert len(self.limiter) == 2
+        assert self.limiter.acquire("a") > 0  # still throttled
+        self.limiter.acquire("d")  # evicts "c"
+        self.limiter.acquire("e")  # evicts "a", which starts over with a full bucket
+        assert self.limiter.acquire("a") == 0.0
+
+
 # ============================================================================
 # INTEGRATION TESTS - Testing full API endpoints with TestClient
 # ============================================================================
@@ -492,16 +907,225 @@ def write_test_user(email: str, plain_password: str, name: str = "Test User"):
 
 @pytest.mark.integration
 def test_login_success():
-    """INTEGRATION TEST: Valid credentials return 200 and user data including token"""
+    """INTEGRATION TEST: Valid credentials return 200 and user data with a session token (not the permanent token)"""
     user, plain = write_test_user("john@example.com", "NewUser@1", "John Doe")
     resp = client.post("/auth/login", json={"email": "john@example.com", "password": plain})
     assert resp.status_code == 200
     body = resp.json()
     assert "user" in body
     assert body["user"]["email"] == "john@example.com"
-    assert "user_token" in body["user"]
-    assert isinstance(body["user"]["user_token"], str)
-    assert len(body["user"]["user_token"]) == 28
+    assert "user_token" not in body["user"]
+    assert isinstance(body["session_token"], str)
+
+@pytest.mark.integration
+def test_login_returns_503_when_hasher_busy():
+    """INTEGRATION TEST: A saturated password hasher answers 503 with Retry-After instead of stalling"""
+    from backend.routers.auth_router import auth_service
+    from backend.services.password_service import PasswordHasherBusy
+    write_test_user("john@example.com", "NewUser@1", "John Doe")
+
+    with patch.object(auth_service.password_hasher, "verify_async", side_effect=PasswordHasherBusy()):
+        resp = client.post("/auth/login", json={"email": "john@example.com", "password": "NewUser@1"})
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
+
+@pytest.mark.integration
+def test_login_throttled_per_email_before_password_check():
+    """INTEGRATION TEST: Repeated attempts on one email get 429 with Retry-After without reaching bcrypt"""
+    from backend.routers.auth_router import auth_service
+    from backend.services.rate_limit_service import LOGIN_EMAIL_BURST
+    write_test_user("john@example.com", "NewUser@1", "John Doe")
+
+    for _ in range(LOGIN_EMAIL_BURST):
+        assert client.post("/auth/login", json={"email": "john@example.com", "password": "wrong"}).status_code == 401
+
+    with patch.object(auth_service.password_hasher, "verify_async") as verify:
+        resp = client.post("/auth/login", json={"email": "JOHN@example.com", "password": "NewUser@1"})
+    assert resp.status_code == 429
+    assert int(resp.headers["retry-after"]) >= 1
+    verify.assert_not_called()
+
+    # Other emails are still allowed
+    assert client.post("/auth/login", json={"email": "jane@example.com", "password": "x"}).status_code == 401
+
+@pytest.mark.integration
+def test_login_throttled_per_ip():
+    """INTEGRATION TEST: One client trying many emails is throttled by the per-IP bucket"""
+    from backend.services.rate_limit_service import LOGIN_IP_BURST
+    statuses = [
+        client.post("/auth/login", json={"email": f"user{i}@example.com", "password": "x"}).status_code
+        for i in range(LOGIN_IP_BURST + 5)
+    ]
+    assert statuses[:LOGIN_IP_BURST] == [401] * LOGIN_IP_BURST
+    assert 429 in statuses[LOGIN_IP_BURST:]
+
+@pytest.mark.integration
+def test_bulk_import_users_job():
+    """INTEGRATION TEST: Admin bulk import runs as a job, hashes in worker processes and users can log in"""
+    from backend.services.job_service import default_job_service
+    admin, _ = _write_test_user("admin@example.com", "AdminPass1", "Admin", role="admin")
+    headers = _auth_headers(admin)
+    body = {"users": [
+        {"name": "New One", "email": "new1@example.com", "password": "Password1"},
+        {"name": "New Two", "email": "new2@example.com", "password": "Password2"},
+        {"name": "Admin Again", "email": "admin@example.com", "password": "Password3"},
+    ]}
+
+    resp = client.post("/auth/users/import", json=body, headers=headers)
+    assert resp.status_code == 202
+    job = default_job_service.wait(resp.json()["job_id"], timeout=60)
+    assert job.status == "succeeded", job.error
+    assert (job.result["imported"], job.result["skipped"]) == (2, 1)
+    assert job.result["users_per_second"] > 0
+    assert job.progress.done == job.progress.total == 2
+
+    login = client.post("/auth/login", json={"email": "new2@example.com", "password": "Password2"})
+    assert login.status_code == 200
+    assert login.json()["user"]["role"] == "customer"
+
+@pytest.mark.integration
+def test_bulk_import_does_not_overwrite_concurrent_role_change():
+    """INTEGRATION TEST: A role change made while an import is saving lands on top of it instead of being lost"""
+    user, _ = _write_test_user("john@example.com", "NewUser@1")
+    importer = AuthService()
+    importer.password_hasher = Mock()
+    importer.password_hasher.hash_many.side_effect = lambda passwords, processes, **kwargs: [f"hash:{p}" for p in passwords]
+    admin_service = AuthService()
+
+    writers = []
+    save_all = importer.repository.save_all
+
+    def save_with_concurrent_write(data):
+        # Another AuthService changes a role after the import read users.json, before it saves
+        writer = threading.Thread(target=admin_service.set_user_role, args=(user["user_id"], "admin"))
+        writer.start()
+        writer.join(timeout=0.5)
+        writers.append(writer)
+        save_all(data)
+
+    importer.repository.save_all = save_with_concurrent_write
+    result = importer.import_users([{"name": "New", "email": "new@example.com", "password": "Password1"}])
+    writers[0].join()
+
+    assert result["imported"] == 1
+    service = AuthService()
+    assert service.get_user_by_id(user["user_id"]).role == "admin"
+    assert service.get_user_by_email("new@example.com") is not None
+
+@pytest.mark.integration
+def test_bulk_import_requires_admin():
+    """INTEGRATION TEST: Customers can't bulk import"""
+    user, _ = _write_test_user("john@example.com", "NewUser@1")
+    resp = client.post("/auth/users/import", json={"users": []}, headers=_auth_headers(user))
+    assert resp.status_code == 403
+
+@pytest.mark.integration
+def test_list_users_paginated_and_searchable():
+    """INTEGRATION TEST: GET /auth/users pages with limit/cursor and filters by role and prefix"""
+    (admin, _), _, _ = _write_multiple_users(
+        ("admin@example.com", "AdminPass1", "Admin", "admin"),
+        ("bob@example.com", "NewUser@1", "Bob Stone", "customer"),
+        ("carol@example.com", "NewUser@2", "Bobbi Carol", "customer"),
+    )
+    headers = _auth_headers(admin)
+
+    # No parameters: the full array, as before
+    assert len(client.get("/auth/users", headers=headers).json()) == 3
+
+    page = client.get("/auth/users", params={"limit": 2}, headers=headers).json()
+    assert [u["email"] for u in page["items"]] == ["admin@example.com", "bob@example.com"]
+    page = client.get("/auth/users", params={"cursor": page["next_cursor"]}, headers=headers).json()
+    assert [u["email"] for u in page["items"]] == ["carol@example.com"]
+    assert page["next_cursor"] is None
+
+    matches = client.get("/auth/users", params={"q": "BOB", "role": "customer"}, headers=headers).json()
+    assert [u["email"] for u in matches] == ["bob@example.com", "carol@example.com"]
+
+    assert client.get("/auth/users", params={"role": "owner"}, headers=headers).status_code == 400
+    assert client.get("/auth/users", params={"cursor": "bogus"}, headers=headers).status_code == 400
+    assert client.get("/auth/users", params={"limit": 0}, headers=headers).status_code == 422
+
+@pytest.mark.integration
+def test_login_session_token_and_logout():
+    """INTEGRATION TEST: Login returns a session token that authenticates until logout"""
+    user, plain = write_test_user("john@example.com", "NewUser@1", "John Doe")
+    body = client.post("/auth/login", json={"email": "john@example.com", "password": plain}).json()
+    session_token = body["session_token"]
+    assert session_token != user["user_token"]
+    assert body["expires_at"]
+
+    headers = {"Authorization": f"Bearer {session_token}"}
+    me = client.get("/auth/me", headers=headers)
+    assert me.status_code == 200
+    assert me.json()["user_id"] == user["user_id"]
+    # Cart/transaction routes accept the session token too
+    assert client.get("/cart/", params={"user_token": session_token}).status_code == 200
+
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    assert client.post("/auth/logout", headers=headers).status_code == 401
+    # The permanent user_token is not a way back in, for the auth dependencies or the cart
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {user['user_token']}"}).status_code == 401
+    from backend.routers.cart_router import cart_service
+    for token in (session_token, user["user_token"]):
+        with pytest.raises(ValueError, match="Invalid user token"):
+            cart_service._get_user_id_from_token(token)
+
+@pytest.mark.integration
+def test_session_principal_cached_and_invalidated(monkeypatch):
+    """INTEGRATION TEST: Session principals come from the cache; a role change or logout applies on the next request"""
+    from backend.services.auth_service import default_principal_cache, _principal_key
+    _write_multiple_users(
+        ("admin@example.com", "AdminPass1", "Admin", "admin"),
+        ("john@example.com", "NewUser@1", "John", "customer"),
+    )
+    admin_token = client.post("/auth/login", json={"email": "admin@example.com", "password": "AdminPass1"}).json()["session_token"]
+    token = client.post("/auth/login", json={"email": "john@example.com", "password": "NewUser@1"}).json()["session_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    me = client.get("/auth/me", headers=headers).json()
+    hits = default_principal_cache.hits
+    assert client.get("/auth/users", headers=headers).status_code == 403
+    assert default_principal_cache.hits == hits + 1
+
+    # Promotion takes effect immediately
+    promoted = client.post(f"/auth/users/{me['user_id']}/promote-admin", headers={"Authorization": f"Bearer {admin_token}"})
+    assert promoted.status_code == 200
+    assert client.get("/auth/users", headers=headers).status_code == 200
+
+    # Logout drops the cached principal along with the session
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert default_principal_cache.get(_principal_key("session", token)) is None
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+@pytest.mark.integration
+def test_permanent_token_accepted_only_with_deprecated_flag(monkeypatch):
+    """INTEGRATION TEST: user_tokens authenticate only while ACCEPT_PERMANENT_TOKENS is on"""
+    from backend.services.auth_service import default_auth_service
+    user, _ = write_test_user("john@example.com", "NewUser@1", "John Doe")
+    headers = {"Authorization": f"Bearer {user['user_token']}"}
+    # Off by default
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+    # The flag is read when the service module is imported, so apply it to the running service as well
+    monkeypatch.setenv("ACCEPT_PERMANENT_TOKENS", "1")
+    monkeypatch.setattr(default_auth_service, "accept_permanent_tokens", True)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    # Turning the fallback off takes effect even for a token the principal cache already holds
+    monkeypatch.setattr(default_auth_service, "accept_permanent_tokens", False)
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+@pytest.mark.integration
+def test_register_starts_session():
+    """INTEGRATION TEST: Register signs the user in with a session token instead of returning user_token"""
+    resp = client.post("/auth/register", json={"name": "Jane", "email": "jane@example.com", "password": "NewUser@1"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert "user_token" not in body["user"]
+    assert body["expires_at"]
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {body['session_token']}"})
+    assert me.status_code == 200
+    assert me.json()["email"] == "jane@example.com"
 
 @pytest.mark.integration
 def test_login_wrong_password():
@@ -550,13 +1174,11 @@ def test_get_user_by_email_success():
 def test_me_endpoint_success():
     """INTEGRATION TEST: GET /me returns logged-in user profile with valid token"""
     user, _ = _write_test_user("meuser@example.com", "MePass#1", "MeUser", "customer")
-    token = user["user_token"]
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = client.get("/auth/me", headers=headers)
+    resp = client.get("/auth/me", headers=_auth_headers(user))
     assert resp.status_code == 200
     body = resp.json()
     assert body["email"] == "meuser@example.com"
-    assert body["user_token"] == token
+    assert body["user_token"] == user["user_token"]
     assert body["role"] == "customer"
 
 @pytest.mark.integration
@@ -578,7 +1200,7 @@ def test_me_endpoint_invalid_token():
 def test_admin_route_allowed_for_admin():
     """INTEGRATION TEST: Admin user can access admin-only route"""
     admin, _ = _write_test_user("admin@example.com", "Admin@Pass1", "Admin User", "admin")
-    headers = {"Authorization": f"Bearer {admin['user_token']}"}
+    headers = _auth_headers(admin)
     resp = client.get("/auth/admin-only", headers=headers)
     assert resp.status_code == 200
     assert resp.json()["message"] == "admin access granted"
@@ -588,7 +1210,7 @@ def test_admin_route_allowed_for_admin():
 def test_admin_route_forbidden_for_customer():
     """INTEGRATION TEST: Non-admin (customer) user cannot access admin-only route"""
     user, _ = _write_test_user("customer@example.com", "Cust@Pass1", "Customer User", "customer")
-    headers = {"Authorization": f"Bearer {user['user_token']}"}
+    headers = _auth_headers(user)
     resp = client.get("/auth/admin-only", headers=headers)
     assert resp.status_code == 403
     assert "admin" in resp.json()["detail"].lower()
@@ -603,7 +1225,7 @@ def test_admin_route_missing_token():
 def test_me_endpoint_admin_user():
     """INTEGRATION TEST: GET /me returns admin role correctly"""
     admin, _ = _write_test_user("adminme@example.com", "Admin@Me1", "Admin Me", "admin")
-    headers = {"Authorization": f"Bearer {admin['user_token']}"}
+    headers = _auth_headers(admin)
     resp = client.get("/auth/me", headers=headers)
     assert resp.status_code == 200
     assert resp.json()["role"] == "admin"
@@ -619,7 +1241,7 @@ def test_promote_user_to_admin_success():
     )
     admin, _ = users[0]
     customer, _ = users[1]
-    admin_headers = {"Authorization": f"Bearer {admin['user_token']}"}
+    admin_headers = _auth_headers(admin)
     
     # Promote customer to admin
     resp = client.post(
@@ -634,11 +1256,34 @@ def test_promote_user_to_admin_success():
     assert resp.json()["user"]["email"] == "customer@example.com"
     
     # Verify the user can now access admin routes
-    customer_token = customer["user_token"]
-    customer_headers = {"Authorization": f"Bearer {customer_token}"}
+    customer_headers = _auth_headers(customer)
     admin_route_resp = client.get("/auth/admin-only", headers=customer_headers)
     assert admin_route_resp.status_code == 200
 
+@pytest.mark.integration
+def test_role_changes_apply_to_cached_principals():
+    """INTEGRATION TEST: Promotions and demotions take effect on the very next request"""
+    users = _write_multiple_users(
+        ("admin@example.com", "Admin@Pass1", "Admin User", "admin"),
+        ("customer@example.com", "Cust@Pass1", "Customer User", "customer")
+    )
+    admin, _ = users[0]
+    customer, _ = users[1]
+    admin_headers = _auth_headers(admin)
+    customer_headers = _auth_headers(customer)
+
+    # Both principals are now cached
+    assert client.get("/auth/admin-only", headers=customer_headers).status_code == 403
+    assert client.get("/auth/admin-only", headers=admin_headers).status_code == 200
+
+    client.post(f"/auth/users/{customer['user_id']}/role", json={"role": "admin"}, headers=admin_headers)
+    assert client.get("/auth/admin-only", headers=customer_headers).status_code == 200
+
+    client.post(f"/auth/users/{customer['user_id']}/role", json={"role": "customer"}, headers=admin_headers)
+    assert client.get("/auth/admin-only", headers=customer_headers).status_code == 403
+    # The admin's own cached principal was untouched and still works
+    assert client.get("/auth/admin-only", headers=admin_headers).status_code == 200
+
 @pytest.mark.integration
 def test_promote_user_to_admin_forbidden_for_customer():
     """INTEGRATION TEST: Customer cannot promote users to admin"""
@@ -649,7 +1294,7 @@ def test_promote_user_to_admin_forbidden_for_customer():
     customer1, _ = users[0]
     customer2, _ = users[1]
     
-    customer1_headers = {"Authorization": f"Bearer {customer1['user_token']}"}
+    customer1_headers = _auth_headers(customer1)
     
     resp = client.post(
         f"/auth/users/{customer2['user_id']}/promote-admin",
@@ -672,7 +1317,7 @@ def test_promote_user_to_admin_missing_token():
 def test_promote_user_to_admin_user_not_found():
     """INTEGRATION TEST: Promoting non-existent user returns 400"""
     admin, _ = _write_test_user("admin@example.com", "Admin@Pass1", "Admin User", "admin")
-    admin_headers = {"Authorization": f"Bearer {admin['user_token']}"}
+    admin_headers = _auth_headers(admin)
     
     fake_user_id = str(uuid.uuid4())
     resp = client.post(
@@ -693,7 +1338,7 @@ def test_promote_already_admin_user():
     admin1, _ = users[0]
     admin2, _ = users[1]
     
-    admin1_headers = {"Authorization": f"Bearer {admin1['user_token']}"}
+    admin1_headers = _auth_headers(admin1)
     
     resp = client.post(
         f"/auth/users/{admin2['user_id']}/promote-admin",
@@ -713,7 +1358,7 @@ def test_assign_role_to_user_success():
     admin, _ = users[0]
     customer, _ = users[1]
     
-    admin_headers = {"Authorization": f"Bearer {admin['user_token']}"}
+    admin_headers = _auth_headers(admin)
     
     # Assign admin role
     resp = client.post(
@@ -746,7 +1391,7 @@ def test_assign_role_to_user_invalid_role():
     admin, _ = users[0]
     customer, _ = users[1]
     
-    admin_headers = {"Authorization": f"Bearer {admin['user_token']}"}
+    admin_headers = _auth_headers(admin)
     
     resp = client.post(
         f"/auth/users/{customer['user_id']}/role",
@@ -15,6 +15,7 @@ from fastapi.testclient import TestClient
 from backend.main import app
 from backend.services.cart_service import CartService
 from backend.models.cart_model import CartItem, CartResponse
+from backend.services.session_service import default_session_store
 
 # TODO: still using backend/data/cart.json and users.json for tests
 # should move to backend/data/test/ so we dont touch production data
@@ -43,6 +44,13 @@ TEST_USER_ZERO_TOKEN = "TESTTOKEN5555555555JJJKKKLLL"
 TEST_USER_TOTAL_ID = "00000000-0000-0000-0000-000000000006"
 TEST_USER_TOTAL_TOKEN = "TESTTOKEN6666666666MMMNNNOOO"
 
+
+def _session_token(user_id: str) -> str:
+    """Helper: open a login session for a test user (what POST /auth/login issues) and return its token."""
+    token, _ = default_session_store.create(user_id)
+    return token
+
+
 # Test product data
 TEST_PRODUCTS = [
     {
@@ -210,12 +218,11 @@ class TestCartServiceUnit:
         """Set up test service with mocked dependencies"""
         self.mock_product_service = Mock()
         self.mock_cart_repo = Mock()
-        self.mock_user_repo = Mock()
+        self.mock_auth_service = Mock()
         self.mock_transaction_repo = Mock()
         
-        self.service = CartService(self.mock_product_service)
+        self.service = CartService(self.mock_product_service, auth_service=self.mock_auth_service)
         self.service.cart_repository = self.mock_cart_repo
-        self.service.user_repository = self.mock_user_repo
         self.service.transaction_repository = self.mock_transaction_repo
     
     @pytest.mark.unit
@@ -242,9 +249,7 @@ class TestCartServiceUnit:
             rating_count=100
         )
         
-        self.mock_user_repo.get_all.return_value = [
-            {"user_id": user_id, "user_token": "token123"}
-        ]
+        self.mock_auth_service.get_user_by_token.return_value = Mock(user_id=user_id)
         self.mock_product_service.get_product_by_id.return_value = mock_product
         self.mock_cart_repo.get_all.return_value = {}
         
@@ -260,6 +265,16 @@ class TestCartServiceUnit:
         self.mock_cart_repo.save_all.assert_called_once()
 
 
+    @pytest.mark.unit
+    def test_get_user_id_from_token_uses_auth_index(self):
+        """UNIT TEST: Tokens are resolved by the auth service, under the same rules as the auth dependencies"""
+        self.mock_auth_service.authenticate.side_effect = lambda token: Mock(user_id="uid-2") if token == "session" else None
+
+        assert self.service._get_user_id_from_token("session") == "uid-2"
+        with pytest.raises(ValueError, match="Invalid user token"):
+            self.service._get_user_id_from_token("bad")
+
+
 # ============================================================================
 # INTEGRATION TESTS - Testing full API endpoints with TestClient
 # ============================================================================
@@ -269,7 +284,7 @@ class TestCartServiceUnit:
 def test_add_to_cart():
     """Test adding a product to the cart"""
     response = client.post("/cart/add", json={
-        "user_token": TEST_USER_TOKEN,
+        "user_token": _session_token(TEST_USER_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 2
     })
@@ -286,13 +301,13 @@ def test_get_cart():
     """Test getting a user's cart"""
     # First add an item
     client.post("/cart/add", json={
-        "user_token": TEST_USER_TOKEN,
+        "user_token": _session_token(TEST_USER_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 1
     })
     
     # Now get the cart (using token as query param)
-    response = client.get(f"/cart/?user_token={TEST_USER_TOKEN}")
+    response = client.get(f"/cart/?user_token={_session_token(TEST_USER_ID)}")
     assert response.status_code == 200
     data = response.json()
     assert data["user_id"] == TEST_USER_ID  # Response still returns user_id (UUID)
@@ -305,7 +320,7 @@ def test_get_cart():
 def test_get_empty_cart():
     """Test getting cart for user with no items"""
     # Use a test user that hasn't added anything yet
-    response = client.get(f"/cart/?user_token={TEST_USER_QTY_TOKEN}")
+    response = client.get(f"/cart/?user_token={_session_token(TEST_USER_QTY_ID)}")
     assert response.status_code == 200
     data = response.json()
     assert data["user_id"] == TEST_USER_QTY_ID
@@ -319,20 +334,20 @@ def test_add_same_item_increases_quantity():
     """Test that adding the same item twice increases quantity"""
     # Add item first time
     client.post("/cart/add", json={
-        "user_token": TEST_USER_QTY_TOKEN,
+        "user_token": _session_token(TEST_USER_QTY_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 2
     })
     
     # Add same item again
     client.post("/cart/add", json={
-        "user_token": TEST_USER_QTY_TOKEN,
+        "user_token": _session_token(TEST_USER_QTY_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 3
     })
     
     # Check cart
-    response = client.get(f"/cart/?user_token={TEST_USER_QTY_TOKEN}")
+    response = client.get(f"/cart/?user_token={_session_token(TEST_USER_QTY_ID)}")
     data = response.json()
     
     # Should only have 1 item with quantity 5 (2+3)
@@ -346,19 +361,19 @@ def test_remove_from_cart():
     """Test removing an item from cart"""
     # Add item
     client.post("/cart/add", json={
-        "user_token": TEST_USER_REMOVE_TOKEN,
+        "user_token": _session_token(TEST_USER_REMOVE_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 1
     })
     
     # Remove item (using token as query param)
-    response = client.delete(f"/cart/remove/{TEST_PRODUCT_ID}?user_token={TEST_USER_REMOVE_TOKEN}")
+    response = client.delete(f"/cart/remove/{TEST_PRODUCT_ID}?user_token={_session_token(TEST_USER_REMOVE_ID)}")
     assert response.status_code == 200
     data = response.json()
     assert data["message"] == "Item removed from cart"
     
     # Cart should be empty now
-    cart_response = client.get(f"/cart/?user_token={TEST_USER_REMOVE_TOKEN}")
+    cart_response = client.get(f"/cart/?user_token={_session_token(TEST_USER_REMOVE_ID)}")
     cart_data = cart_response.json()
     assert len(cart_data["items"]) == 0
 
@@ -369,14 +384,14 @@ def test_update_cart_item():
     """Test updating quantity of an item in cart"""
     # Add item
     client.post("/cart/add", json={
-        "user_token": TEST_USER_UPDATE_TOKEN,
+        "user_token": _session_token(TEST_USER_UPDATE_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 2
     })
     
     # Update quantity to 5
     response = client.put(f"/cart/update/{TEST_PRODUCT_ID}", json={
-        "user_token": TEST_USER_UPDATE_TOKEN,
+        "user_token": _session_token(TEST_USER_UPDATE_ID),
         "quantity": 5
     })
     assert response.status_code == 200
@@ -384,7 +399,7 @@ def test_update_cart_item():
     assert data["quantity"] == 5
     
     # Verify in cart
-    cart_response = client.get(f"/cart/?user_token={TEST_USER_UPDATE_TOKEN}")
+    cart_response = client.get(f"/cart/?user_token={_session_token(TEST_USER_UPDATE_ID)}")
     cart_data = cart_response.json()
     assert cart_data["items"][0]["quantity"] == 5
 
@@ -395,20 +410,20 @@ def test_update_quantity_zero_removes_item():
     """Test that updating quantity to 0 removes the item"""
     # Add item
     client.post("/cart/add", json={
-        "user_token": TEST_USER_ZERO_TOKEN,
+        "user_token": _session_token(TEST_USER_ZERO_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 3
     })
     
     # Update to 0
     response = client.put(f"/cart/update/{TEST_PRODUCT_ID}", json={
-        "user_token": TEST_USER_ZERO_TOKEN,
+        "user_token": _session_token(TEST_USER_ZERO_ID),
         "quantity": 0
     })
     assert response.status_code == 200
     
     # Cart should be empty
-    cart_response = client.get(f"/cart/?user_token={TEST_USER_ZERO_TOKEN}")
+    cart_response = client.get(f"/cart/?user_token={_session_token(TEST_USER_ZERO_ID)}")
     cart_data = cart_response.json()
     assert len(cart_data["items"]) == 0
 
@@ -421,7 +436,7 @@ def test_add_invalid_product():
     # So we just verify the error happens
     try:
         response = client.post("/cart/add", json={
-            "user_token": TEST_USER_TOKEN,
+            "user_token": _session_token(TEST_USER_ID),
             "product_id": "FAKE_PRODUCT_999",
             "quantity": 1
         })
@@ -438,13 +453,13 @@ def test_calculate_total_price():
     """Test that total price is calculated correctly"""
     # Add multiple items
     client.post("/cart/add", json={
-        "user_token": TEST_USER_TOTAL_TOKEN,
+        "user_token": _session_token(TEST_USER_TOTAL_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 2
     })
     
     # Get cart
-    response = client.get(f"/cart/?user_token={TEST_USER_TOTAL_TOKEN}")
+    response = client.get(f"/cart/?user_token={_session_token(TEST_USER_TOTAL_ID)}")
     data = response.json()
     
     # Total should be price * quantity
@@ -6,6 +6,7 @@ import os
 from fastapi.testclient import TestClient
 from backend.main import app
 from backend.services.export_service import ExportService
+from backend.services.session_service import default_session_store
 
 client = TestClient(app)
 
@@ -38,7 +39,9 @@ def admin_headers():
     with open(users_file, 'w') as f:
         json.dump(users, f, indent=2)
     
-    yield {"Authorization": f"Bearer {admin_user['user_token']}"}
+    # Authenticate with a login session, as the frontend does
+    session_token, _ = default_session_store.create(admin_user["user_id"])
+    yield {"Authorization": f"Bearer {session_token}"}
     
     # Cleanup: remove admin user after test
     with open(users_file, 'r') as f:
@@ -71,7 +74,9 @@ def customer_headers():
     with open(users_file, 'w') as f:
         json.dump(users, f, indent=2)
     
-    yield {"Authorization": f"Bearer {customer_user['user_token']}"}
+    # Authenticate with a login session, as the frontend does
+    session_token, _ = default_session_store.create(customer_user["user_id"])
+    yield {"Authorization": f"Bearer {session_token}"}
     
     # Cleanup
     with open(users_file, 'r') as f:
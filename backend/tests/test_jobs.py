@@ -0,0 +1,171 @@
+"""
+Tests for the background job runner and the /admin/jobs endpoints
+
+This file contains:
+- UNIT TESTS: Test JobService scheduling, progress and cancellation in isolation
+- INTEGRATION TESTS: Test the full API endpoints
+"""
+
+import json
+import threading
+import time
+import uuid
+import secrets
+import string
+import bcrypt
+import pytest
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.services.job_service import JobService, default_job_service
+from backend.services.session_service import default_session_store
+
+TEST_DB_PATH_USERS = "backend/data/users.json"
+
+# Test client for integration tests
+client = TestClient(app)
+
+
+# ============================================================================
+# UNIT TESTS - Testing JobService in isolation
+# ============================================================================
+class TestJobServiceUnit:
+    """UNIT TESTS: Test JobService without the API layer"""
+
+    def setup_method(self):
+        """Fresh runner with one worker for each test"""
+        self.service = JobService(max_workers=1, max_finished=3)
+
+    @pytest.mark.unit
+    def test_job_succeeds_with_progress_and_result(self):
+        """UNIT TEST: A job reports progress/partial results while running and keeps its result"""
+        release = threading.Event()
+        reported = threading.Event()
+
+        def work(context, count):
+            context.report(1, count, first="done")
+            reported.set()
+            release.wait(5)
+            context.report(count)
+            return {"items": count}
+
+        job = self.service.submit("demo", work, 3)
+        assert job.status in ("queued", "running")
+        assert reported.wait(5)
+
+        running = self.service.get(job.job_id)
+        assert running.status == "running"
+        assert (running.progress.done, running.progress.total) == (1, 3)
+        assert running.partial_result == {"first": "done"}
+
+        release.set()
+        finished = self.service.wait(job.job_id, timeout=5)
+        assert finished.status == "succeeded"
+        assert (finished.progress.done, finished.progress.total) == (3, 3)
+        assert finished.result == {"items": 3}
+        assert finished.started_at and finished.finished_at
+
+    @pytest.mark.unit
+    def test_failed_job_records_error(self):
+        """UNIT TEST: An exception fails the job with its message"""
+        def work(context):
+            raise RuntimeError("disk full")
+
+        job = self.service.wait(self.service.submit("demo", work).job_id, timeout=5)
+        assert job.status == "failed"
+        assert job.error == "disk full"
+
+    @pytest.mark.unit
+    def test_cancel_running_and_queued_jobs(self):
+        """UNIT TEST: A running job stops at its next check, a queued one never starts"""
+        started = threading.Event()
+        ran = []
+
+        def long_work(context):
+            started.set()
+            done = 0
+            while not context.cancelled:
+                done += 1
+                context.report(done)
+                time.sleep(0.001)
+            return {"done": done}
+
+        def other_work(context):
+            ran.append(True)
+
+        running = self.service.submit("long", long_work)
+        queued = self.service.submit("other", other_work)
+        assert started.wait(5)
+
+        assert self.service.cancel(queued.job_id).status == "cancelled"
+        assert self.service.cancel(running.job_id).cancel_requested
+
+        job = self.service.wait(running.job_id, timeout=5)
+        assert job.status == "cancelled"
+        assert job.result["done"] >= 1
+        assert ran == []
+
+        # Cancelling a finished job changes nothing
+        assert self.service.cancel(running.job_id).status == "cancelled"
+
+    @pytest.mark.unit
+    def test_unknown_job_and_retention(self):
+        """UNIT TEST: Unknown ids raise ValueError, only the newest finished jobs are kept"""
+        with pytest.raises(ValueError, match="not found"):
+            self.service.get("missing")
+        with pytest.raises(ValueError, match="not found"):
+            self.service.cancel("missing")
+
+        ids = [self.service.wait(self.service.submit("demo", lambda context: n).job_id, timeout=5).job_id for n in range(5)]
+        kept = [job.job_id for job in self.service.list_jobs()]
+        assert kept == list(reversed(ids[-3:]))
+        assert self.service.list_jobs(status="failed") == []
+
+
+# ============================================================================
+# INTEGRATION TESTS - Testing the /admin/jobs endpoints
+# ============================================================================
+
+def _create_user(role: str) -> str:
+    """Helper: replace users.json with a single user of the given role and return a session token for it"""
+    user = {
+        "user_id": str(uuid.uuid4()),
+        "name": role.title(),
+        "email": f"{role}@example.com",
+        "password_hash": bcrypt.hashpw(b"Password1", bcrypt.gensalt()).decode(),
+        "user_token": "".join(secrets.choice(string.ascii_letters + string.digits) for _ in range(28)),
+        "role": role
+    }
+    with open(TEST_DB_PATH_USERS, "w", encoding="utf-8") as f:
+        json.dump([user], f, indent=2)
+    token, _ = default_session_store.create(user["user_id"])
+    return token
+
+
+@pytest.mark.integration
+def test_job_endpoints():
+    """INTEGRATION TEST: Poll and cancel a job through the API; admin only"""
+    release = threading.Event()
+
+    def work(context):
+        context.report(1, 2)
+        release.wait(5)
+        return {"ok": True}
+
+    job = default_job_service.submit("demo", work)
+    token = _create_user("customer")
+    assert client.get(f"/admin/jobs/{job.job_id}", headers={"Authorization": f"Bearer {token}"}).status_code == 403
+
+    token = _create_user("admin")
+    response = client.get(f"/admin/jobs/{job.job_id}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["kind"] == "demo"
+    assert any(item["job_id"] == job.job_id for item in client.get("/admin/jobs/", headers={"Authorization": f"Bearer {token}"}).json())
+
+    response = client.post(f"/admin/jobs/{job.job_id}/cancel", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["cancel_requested"] is True
+    release.set()
+    assert default_job_service.wait(job.job_id, timeout=5).status == "cancelled"
+
+    assert client.get("/admin/jobs/does-not-exist", headers={"Authorization": f"Bearer {token}"}).status_code == 404
+    assert client.post("/admin/jobs/does-not-exist/cancel", headers={"Authorization": f"Bearer {token}"}).status_code == 404
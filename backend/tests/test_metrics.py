@@ -18,6 +18,7 @@ from unittest.mock import Mock
 from fastapi.testclient import TestClient
 from backend.main import app
 from backend.services.metrics_service import MetricsService
+from backend.services.session_service import default_session_store
 
 # Test file paths
 TEST_DB_PATH_USERS = "backend/data/users.json"
@@ -312,8 +313,9 @@ class TestMetricsAPIIntegration:
         with open(TEST_DB_PATH_TRANSACTIONS, "w", encoding="utf-8") as f:
             json.dump(transactions_data, f, indent=2)
         
-        self.admin_token = admin_token
-        self.customer_token = customer_token
+        # Log the users in; tests authenticate with their session tokens
+        self.admin_token = default_session_store.create(TEST_ADMIN_USER_ID)[0]
+        self.customer_token = default_session_store.create(TEST_USER_ID_1)[0]
         
         yield
         
@@ -18,6 +18,7 @@ from datetime import datetime, timezone
 from fastapi.testclient import TestClient
 from backend.main import app
 from backend.services.penalty_service import PenaltyService
+from backend.services.session_service import default_session_store
 from backend.models.penalty_model import Penalty
 
 # Test file paths
@@ -220,10 +221,10 @@ class TestPenaltyAPIIntegration:
         with open(TEST_DB_PATH_PENALTIES, "w", encoding="utf-8") as f:
             json.dump([], f, indent=2)
         
-        # Store tokens for use in tests
-        self.admin_token = admin_token
-        self.user1_token = user1_token
-        self.user2_token = user2_token
+        # Log the users in; tests authenticate with their session tokens
+        self.admin_token = default_session_store.create(TEST_ADMIN_USER_ID)[0]
+        self.user1_token = default_session_store.create(TEST_USER_ID_1)[0]
+        self.user2_token = default_session_store.create(TEST_USER_ID_2)[0]
         
         yield
         
@@ -2,17 +2,24 @@
 # It makes testing fast and simple while still validating the full request/response cycle.
 # This is the official FastAPI testing method.
 import os
+import sys
 import json
 import uuid
 import secrets
 import string
+import time
+import asyncio
+import threading
 import bcrypt
 import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock, patch, MagicMock
 from fastapi.testclient import TestClient
 from backend.main import app
 from backend.services.product_service import ProductService
+from backend.services.session_service import default_session_store
 from backend.models.product_model import Product
+from backend.repositories.base_repository import BaseRepository
 
 TEST_DB_PATH_USERS = "backend/data/users.json"
 TEST_DB_PATH_PRODUCTS = "backend/data/products_test.json"
@@ -125,31 +132,35 @@ def _hash(password: str) -> str:
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
 
 
+def _session_token(user_id: str) -> str:
+    """Helper: open a login session for a test user (what POST /auth/login issues) and return its token."""
+    token, _ = default_session_store.create(user_id)
+    return token
+
+
 def _create_admin_user():
-    """Helper: create an admin user and return (token, user_dict)."""
-    admin_token = _gen_token()
+    """Helper: create an admin user and return (session token, user_dict)."""
     admin = {
         "user_id": str(uuid.uuid4()),
         "name": "Admin",
         "email": "admin@example.com",
         "password_hash": _hash("AdminPass1"),
-        "user_token": admin_token,
+        "user_token": _gen_token(),
         "role": "admin"
     }
     with open(TEST_DB_PATH_USERS, "w", encoding="utf-8") as f:
         json.dump([admin], f, indent=2)
-    return admin_token, admin
+    return _session_token(admin["user_id"]), admin
 
 
 def _create_customer_user():
-    """Helper: create a customer user and return (token, user_dict)."""
-    customer_token = _gen_token()
+    """Helper: create a customer user and return (session token, user_dict)."""
     customer = {
         "user_id": str(uuid.uuid4()),
         "name": "Customer",
         "email": "customer@example.com",
         "password_hash": _hash("CustPass1"),
-        "user_token": customer_token,
+        "user_token": _gen_token(),
         "role": "customer"
     }
     # Append to existing users
@@ -161,9 +172,67 @@ def _create_customer_user():
     users.append(customer)
     with open(TEST_DB_PATH_USERS, "w", encoding="utf-8") as f:
         json.dump(users, f, indent=2)
-    return customer_token, customer
-
-
+    return _session_token(customer["user_id"]), customer
+
+
+
+
+class _StubProductPages(BaseHTTPRequestHandler):
+    """Local stand-in for product pages: /page/<id>, /flaky (503 once), /missing (404), /noimage
+    Pages send an ETag and answer a matching If-None-Match with 304"""
+    hits = {}
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.hits[self.path] = cls.hits.get(self.path, 0) + 1
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+            hits = cls.hits[self.path]
+        try:
+            time.sleep(0.02)
+            if self.path == "/missing" or (self.path == "/flaky" and hits == 1):
+                self.send_response(404 if self.path == "/missing" else 503)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+            name = self.path.rsplit("/", 1)[-1]
+            etag = f'"v1-{name}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            image = "" if name == "noimage" else f'<img id="landingImage" src="https://img.example.com/{name}.jpg?size=big">'
+            body = f"<html><body><div id='main'>{image}</div></body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_pages():
+    """Serve _StubProductPages on a free local port; yields the base URL"""
+    _StubProductPages.hits = {}
+    _StubProductPages.max_in_flight = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubProductPages)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
 
 
 # ============================================================================
@@ -178,6 +247,9 @@ class TestProductServiceUnit:
         self.mock_repository = Mock()
         self.service = ProductService()
         self.service.repository = self.mock_repository
+        self.mock_image_cache = Mock()
+        self.mock_image_cache.get_all.return_value = {}
+        self.service.image_scraper.cache_repository = self.mock_image_cache
     
     @pytest.mark.unit
     def test_search_products_success(self):
@@ -237,6 +309,504 @@ class TestProductServiceUnit:
         prices_desc = [p.discounted_price for p in sorted_products_desc]
         assert prices_desc == sorted(prices, reverse=True)
 
+    @pytest.mark.unit
+    def test_fuzzy_search_tolerates_typos(self):
+        """UNIT TEST: Fuzzy search finds products despite misspelled words"""
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+
+        # "Wayona Nylon Braided USB to Lightning Cable" with two typos
+        results = self.service.get_product_by_keyword("lightnig cabel", fuzzy=True)
+        assert [p.product_id for p in results] == ["B07JW9H4J1"]
+
+        # Exact (non-fuzzy) search still finds nothing for the misspelling
+        assert self.service.get_product_by_keyword("lightnig cabel") == []
+
+    @pytest.mark.unit
+    def test_fuzzy_search_ranks_closest_match_first(self):
+        """UNIT TEST: Fuzzy search returns products with fewer typos first"""
+        self.mock_repository.get_all.return_value = [
+            dict(TEST_PRODUCTS[0], product_id="1", product_name="Chargers Cable"),
+            dict(TEST_PRODUCTS[0], product_id="2", product_name="Charger Cable"),
+        ]
+
+        results = self.service.get_product_by_keyword("chargr cable", fuzzy=True)
+        assert [p.product_id for p in results] == ["2", "1"]
+
+    @pytest.mark.unit
+    def test_fuzzy_search_short_words_must_match_exactly(self):
+        """UNIT TEST: Words of 3 characters or fewer are not typo-corrected"""
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+
+        assert self.service.get_product_by_keyword("usc", fuzzy=True) == []
+        assert len(self.service.get_product_by_keyword("usb", fuzzy=True)) == 1
+
+    @pytest.mark.unit
+    def test_sort_products_uses_presorted_catalog_order(self):
+        """UNIT TEST: Sorting catalog products (full list or subset) matches a fresh sort for every option"""
+        from backend.services.product_service import SORT_OPTIONS
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+
+        all_products = self.service.get_all_products()
+        subset = self.service.get_product_by_keyword("i")
+        assert 0 < len(subset) < len(all_products)
+
+        for sort_by, (key, descending) in SORT_OPTIONS.items():
+            for products in (all_products, subset):
+                expected = sorted(products, key=key, reverse=descending)
+                assert self.service.sort_products(products, sort_by) == expected
+
+    @pytest.mark.unit
+    def test_sort_order_rebuilt_after_product_change(self):
+        """UNIT TEST: Presorted orders are rebuilt when the catalog changes"""
+        saved = [dict(p) for p in TEST_PRODUCTS]
+        self.mock_repository.get_all.side_effect = lambda: saved
+        self.mock_repository.save_all.side_effect = lambda data: saved.__setitem__(slice(None), data)
+
+        cheapest = self.service.sort_products(self.service.get_all_products(), "price_asc")[0]
+        assert cheapest.product_id == "B07JW9H4J1"
+
+        self.service.update_product("B08F5N7KJX", discounted_price=1.0)
+        cheapest = self.service.sort_products(self.service.get_all_products(), "price_asc")[0]
+        assert cheapest.product_id == "B08F5N7KJX"
+
+    @pytest.mark.unit
+    def test_products_page_cursor_survives_catalog_change(self):
+        """UNIT TEST: A cursor still resumes correctly after the last returned product is deleted"""
+        saved = [dict(p) for p in TEST_PRODUCTS]
+        self.mock_repository.get_all.side_effect = lambda: saved
+        self.mock_repository.save_all.side_effect = lambda data: saved.__setitem__(slice(None), data)
+
+        first_page, cursor = self.service.get_products_page(limit=2, sort_by="price_asc")
+        assert [p.product_id for p in first_page] == ["B07JW9H4J1", "B08F5N7KJX"]
+
+        # Delete the last product the client saw; the next page must neither skip nor repeat products
+        self.service.delete_product("B08F5N7KJX")
+        second_page, cursor = self.service.get_products_page(limit=2, cursor=cursor, sort_by="price_asc")
+        assert [p.product_id for p in second_page] == ["B08KT5LMRX", "B09NX5K7QP"]
+
+        last_page, cursor = self.service.get_products_page(limit=2, cursor=cursor, sort_by="price_asc")
+        assert [p.product_id for p in last_page] == ["B07QR3N8VX"]
+        assert cursor is None
+
+    @pytest.mark.unit
+    def test_project_products_reuses_precomputed_shape(self):
+        """UNIT TEST: Equivalent ?fields= requests share one precomputed projection of the catalog"""
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+        products = self.service.get_all_products()
+
+        fields = self.service.parse_fields("rating, product_name")
+        assert fields == ("product_id", "product_name", "rating")
+        assert self.service.parse_fields("product_name,rating,product_id") == fields
+
+        first = self.service.project_products(products, fields)
+        second = self.service.project_products(products[:2], fields)
+        assert first[0] == {"product_id": "B07JW9H4J1", "product_name": TEST_PRODUCTS[0]["product_name"], "rating": 4.5}
+        assert second[0] is first[0]
+
+        with pytest.raises(ValueError, match="Unknown field"):
+            self.service.parse_fields("product_name,password")
+
+    @pytest.mark.unit
+    def test_category_index_counts_and_descendants(self):
+        """UNIT TEST: Category nodes count their whole subtree and filters include sub-categories"""
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS + [
+            dict(TEST_PRODUCTS[0], product_id="X1", category="Electronics|Cables|USB"),
+            dict(TEST_PRODUCTS[0], product_id="X2", category="Home&Kitchen|Kitchen"),
+        ]
+
+        tree = self.service.get_category_tree()
+        assert tree["count"] == 7
+        electronics = tree["children"][0]
+        assert (electronics["name"], electronics["count"]) == ("Electronics", 6)
+
+        cables = self.service.get_category_tree("Electronics|Cables")
+        assert cables["count"] == 2
+        assert cables["children"] == [{"name": "USB", "path": "Electronics|Cables|USB", "count": 1, "children": []}]
+
+        ids = [p.product_id for p in self.service.get_products_by_category("electronics|cables")]
+        assert ids == ["B07JW9H4J1", "X1"]
+        assert self.service.get_products_by_category("Garden") == []
+
+        with pytest.raises(ValueError, match="not found"):
+            self.service.get_category_tree("Garden")
+
+    @pytest.mark.unit
+    def test_category_index_merges_case_variants(self):
+        """UNIT TEST: Paths differing only by case are one node (first spelling wins), so no product is dropped"""
+        from backend.services.category_index_service import CategoryIndex
+        index = CategoryIndex(["Electronics|TV", "electronics|Audio", "Electronics|tv"])
+        assert index.positions("Electronics") == [0, 1, 2]
+        assert index.positions("ELECTRONICS|TV") == [0, 2]
+
+        tree = index.find(None).to_dict()
+        assert [(node["name"], node["count"]) for node in tree["children"]] == [("Electronics", 3)]
+        electronics = tree["children"][0]
+        assert [(node["path"], node["count"]) for node in electronics["children"]] == [
+            ("Electronics|TV", 2), ("Electronics|Audio", 1)
+        ]
+
+    @pytest.mark.unit
+    def test_filtered_products_match_python_filter(self):
+        """UNIT TEST: Vectorised range filters give the same products as a plain Python filter"""
+        from backend.models.product_model import ProductFilters
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS + [
+            dict(TEST_PRODUCTS[0], product_id="NO_COUNT", rating_count=None),
+        ]
+
+        filters = ProductFilters(min_price=1000, max_price=100000, min_rating=4.5, min_discount=25)
+        ids = [p.product_id for p in self.service.get_filtered_products(filters=filters)]
+        assert ids == ["B08KT5LMRX", "B09NX5K7QP", "B07QR3N8VX"]
+
+        # Products without a rating_count never pass a rating_count filter
+        ids = [p.product_id for p in self.service.get_filtered_products(filters=ProductFilters(min_rating_count=0))]
+        assert "NO_COUNT" not in ids and len(ids) == len(TEST_PRODUCTS)
+
+        # Category and ranges combine into one mask
+        ids = [p.product_id for p in self.service.get_filtered_products(
+            category="Electronics|Phones", filters=ProductFilters(max_price=1000))]
+        assert ids == []
+
+    @pytest.mark.unit
+    def test_top_products_match_full_sort(self):
+        """UNIT TEST: Top-K selection returns the same products as sorting everything, ties included"""
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+        all_products = self.service.get_all_products()
+
+        for by, sort_by in [("rating", "rating_desc"), ("discount", "discount_desc")]:
+            for k in (1, 2, 3, 10):
+                expected = self.service.sort_products(all_products, sort_by)[:k]
+                assert self.service.get_top_products(by, k) == expected
+
+        # Cached result is reused until the catalog changes
+        assert self.service.get_top_products("rating", 2)[0] is self.service.get_top_products("rating", 2)[0]
+
+        with pytest.raises(ValueError, match="Invalid ranking"):
+            self.service.get_top_products("name", 5)
+
+    @pytest.mark.unit
+    def test_allocate_product_ids_unique(self):
+        """UNIT TEST: Batch id allocation returns distinct ASIN-like ids not already in the catalog"""
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+        existing = {p["product_id"] for p in TEST_PRODUCTS}
+
+        ids = self.service.allocate_product_ids(500)
+        assert len(ids) == 500 and len(set(ids)) == 500
+        assert not existing & set(ids)
+        allowed = set(string.ascii_uppercase + string.digits)
+        assert all(len(i) == 10 and set(i) <= allowed for i in ids)
+        assert self.service.allocate_product_ids(0) == []
+
+    @pytest.mark.unit
+    def test_get_products_by_ids(self):
+        """UNIT TEST: Multi-get returns found products in request order plus the missing ids"""
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+        ids = [TEST_PRODUCTS[2]["product_id"], "NOPE", TEST_PRODUCTS[0]["product_id"], TEST_PRODUCTS[2]["product_id"]]
+
+        products, missing = self.service.get_products_by_ids(ids)
+        assert [p.product_id for p in products] == [ids[0], ids[2]]
+        assert missing == ["NOPE"]
+
+        body = json.loads(self.service.encode_products_batch(ids, ("product_id", "rating")))
+        assert body == {
+            "products": [{"product_id": p.product_id, "rating": p.rating} for p in products],
+            "missing": ["NOPE"]
+        }
+        assert self.mock_repository.get_all.call_count == 1
+
+    @pytest.mark.unit
+    def test_reads_never_see_a_half_installed_catalog(self):
+        """UNIT TEST: Lookups and sorted pages running while another thread saves the catalog stay consistent"""
+        catalog = [dict(TEST_PRODUCTS[0], product_id=f"P{i:05d}", discounted_price=float(i)) for i in range(5000)]
+        self.mock_repository.get_all.return_value = catalog
+        target = catalog[-1]["product_id"]
+        self.service.get_product_by_id(target)
+        failures = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                if self.service.get_product_by_id(target) is None:
+                    failures.append("get_product_by_id")
+                if self.service.get_products_by_ids([target])[1]:
+                    failures.append("get_products_by_ids")
+                page, _ = self.service.get_products_page(limit=3, sort_by="price_desc")
+                if [p.product_id for p in page] != [c["product_id"] for c in catalog[:-4:-1]]:
+                    failures.append("get_products_page")
+
+        # Switch threads very often so the reader lands inside the writer's install step
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            products = self.service.get_all_products()
+            for _ in range(5):
+                self.service._save_catalog(products)
+        finally:
+            done.set()
+            reader.join()
+            sys.setswitchinterval(switch_interval)
+        assert failures == []
+
+    @pytest.mark.unit
+    def test_writes_reuse_cached_catalog(self):
+        """UNIT TEST: Create/update/delete after a save don't re-parse the products file"""
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+        created = self.service.create_product(
+            "Test Cable", "Electronics|Cables", 100.0, 200.0, 50.0,
+            "About", "https://example.com/i.jpg", "https://example.com/p"
+        )
+        assert self.mock_repository.get_all.call_count == 1
+
+        self.service.update_product(created.product_id, rating=4.0)
+        second = self.service.create_product(
+            "Other Cable", "Electronics|Cables", 100.0, 200.0, 50.0,
+            "About", "https://example.com/i.jpg", "https://example.com/p"
+        )
+        self.service.delete_product(created.product_id)
+        assert self.mock_repository.get_all.call_count == 1
+
+        # The last save holds everything, and reads come from the same snapshot
+        saved_ids = [p["product_id"] for p in self.mock_repository.save_all.call_args[0][0]]
+        assert saved_ids == [p["product_id"] for p in TEST_PRODUCTS] + [second.product_id]
+        assert self.service.get_product_by_id(second.product_id) == second
+        assert self.mock_repository.get_all.call_count == 1
+
+    @pytest.mark.unit
+    def test_similar_products_and_incremental_update(self):
+        """UNIT TEST: Similar products share words; changes only rescore what they touch"""
+        from backend.services.similarity_service import SimilarityIndex
+
+        def product(product_id, name, category, about):
+            return {"product_id": product_id, "product_name": name, "category": category,
+                    "discounted_price": 10.0, "actual_price": 20.0, "discount_percentage": 50.0,
+                    "about_product": about, "img_link": "https://example.com/i.jpg",
+                    "product_link": "https://example.com/p", "rating": 4.0, "rating_count": 10}
+
+        catalog = [
+            product("C1", "Braided USB Type C Cable", "Computers|Cables", "Fast charging braided cable"),
+            product("M1", "Wireless Optical Mouse", "Computers|Mice", "Silent wireless mouse"),
+            product("C2", "USB Type C Charging Cable", "Computers|Cables", "Durable charging cable"),
+            product("M2", "Ergonomic Wireless Mouse", "Computers|Mice", "Comfortable wireless mouse"),
+            product("T1", "Smart LED TV", "Home|Televisions", "Full HD television"),
+        ]
+        self.mock_repository.get_all.return_value = catalog
+        self.service.refresh_similarity_index()
+        assert [p.product_id for p in self.service.get_similar_products("C1", k=1)] == ["C2"]
+        assert [p.product_id for p in self.service.get_similar_products("M2", k=1)] == ["M1"]
+        # Products with nothing in common are never listed
+        assert "T1" not in [p.product_id for p in self.service.get_similar_products("C1")]
+        with pytest.raises(ValueError, match="not found"):
+            self.service.get_similar_products("NOPE")
+
+        # Renaming one product and deleting another updates the lists incrementally
+        index = self.service._similarity_index
+        assert (index.full_builds, index.incremental_updates) == (1, 0)
+        catalog = catalog[:4] + [product("T1", "Wireless Mouse Pad", "Computers|Mice", "Mouse pad")]
+        catalog = [p for p in catalog if p["product_id"] != "M1"] + [product("C3", "Braided Cable", "Computers|Cables", "Braided")]
+        self.mock_repository.get_all.return_value = catalog
+        self.service._save_count += 1
+        with patch("backend.services.similarity_service.FULL_REBUILD_FRACTION", 1.0):
+            self.service.refresh_similarity_index()
+        similar = [p.product_id for p in self.service.get_similar_products("M2")]
+        assert similar[0] == "T1" and "M1" not in similar
+        assert (index.full_builds, index.incremental_updates) == (1, 1)
+
+        # Same neighbour sets as a full rebuild
+        fresh = SimilarityIndex()
+        fresh.update(self.service.get_all_products())
+        for p in catalog:
+            assert {i for i, _ in index.neighbours(p["product_id"])} == {i for i, _ in fresh.neighbours(p["product_id"])}
+
+    @pytest.mark.unit
+    def test_similarity_index_refreshes_in_background(self):
+        """UNIT TEST: Requests never build the index; a catalog change is picked up by a worker thread"""
+        from backend.services.similarity_service import SimilarityIndexNotReady
+        self.mock_repository.get_all.return_value = TEST_PRODUCTS
+
+        with patch.object(self.service, "schedule_similarity_refresh") as schedule:
+            with pytest.raises(SimilarityIndexNotReady):
+                self.service.get_similar_products(TEST_PRODUCTS[0]["product_id"])
+        schedule.assert_called_once()
+
+        self.service.refresh_similarity_index()
+        index = self.service._similarity_index
+        computed = index.rows_computed
+
+        # An edit publishes the new catalog at once; the lists follow without the request waiting
+        with patch.object(index, "update", wraps=index.update) as update:
+            self.service.update_product(TEST_PRODUCTS[0]["product_id"],
+                                        product_name=TEST_PRODUCTS[0]["product_name"] + " Electronics")
+            for _ in range(200):
+                if self.service.get_similarity_version() == self.service._snapshot.version:
+                    break
+                time.sleep(0.01)
+        assert self.service.get_similarity_version() == self.service._snapshot.version
+        assert update.call_count == 1
+        # Only the edited product's row was recomputed
+        assert index.rows_computed - computed == 1
+
+    @pytest.mark.unit
+    def test_fetch_image_urls_against_stub_server(self, stub_pages):
+        """UNIT TEST: Bulk image fetch retries 503s, reports failures and stays within the concurrency bound"""
+        links = [f"{stub_pages}/page/P{i}" for i in range(6)]
+        links += [links[0], f"{stub_pages}/flaky", f"{stub_pages}/missing", f"{stub_pages}/noimage"]
+
+        results = asyncio.run(self.service.image_scraper.fetch_image_urls(links, concurrency=2, host_rate=1000, backoff=0.01))
+
+        assert results[f"{stub_pages}/page/P3"] == ("https://img.example.com/P3.jpg", None, "fetched")
+        assert results[f"{stub_pages}/flaky"] == ("https://img.example.com/flaky.jpg", None, "fetched")
+        assert results[f"{stub_pages}/missing"] == (None, "HTTP 404", None)
+        assert results[f"{stub_pages}/noimage"][0] is None
+        assert _StubProductPages.hits["/flaky"] == 2
+        assert _StubProductPages.hits["/page/P0"] == 1  # duplicate link fetched once
+        assert _StubProductPages.max_in_flight <= 2
+
+    @pytest.mark.unit
+    def test_fetch_all_images_single_write(self, stub_pages):
+        """UNIT TEST: fetch_all_images updates every img_link it resolved with one save"""
+        products = [dict(p, product_link=f"{stub_pages}/page/{p['product_id']}") for p in TEST_PRODUCTS]
+        products[1]["product_link"] = f"{stub_pages}/missing"
+        products[2]["img_link"] = f"https://img.example.com/{products[2]['product_id']}.jpg"
+        self.mock_repository.get_all.return_value = products
+
+        result = self.service.fetch_all_images(host_rate=1000, backoff=0.01)
+
+        assert (result["total"], result["updated"], result["unchanged"], result["failed"]) == (5, 3, 1, 1)
+        assert result["cache_hits"] == 0
+        assert result["errors"][0]["product_id"] == products[1]["product_id"]
+        self.mock_repository.save_all.assert_called_once()
+        saved = {p["product_id"]: p["img_link"] for p in self.mock_repository.save_all.call_args[0][0]}
+        assert saved[products[0]["product_id"]] == f"https://img.example.com/{products[0]['product_id']}.jpg"
+        assert saved[products[1]["product_id"]] == products[1]["img_link"]
+
+    @pytest.mark.unit
+    def test_fetch_all_images_reports_missing_product_link(self, stub_pages):
+        """UNIT TEST: Products without a product_link are reported as such and not fetched"""
+        products = [dict(p, product_link=f"{stub_pages}/page/{p['product_id']}") for p in TEST_PRODUCTS]
+        products[1]["product_link"] = ""
+        products[3]["product_link"] = "   "
+        self.mock_repository.get_all.return_value = products
+
+        requested = []
+        fetch_image_urls = self.service.image_scraper.fetch_image_urls
+
+        async def recording_fetch(links, **options):
+            links = list(links)
+            requested.extend(links)
+            return await fetch_image_urls(links, **options)
+
+        with patch.object(self.service.image_scraper, "fetch_image_urls", recording_fetch):
+            result = self.service.fetch_all_images(host_rate=1000, backoff=0.01)
+
+        assert (result["total"], result["updated"], result["failed"]) == (5, 3, 2)
+        assert {(e["product_id"], e["error"]) for e in result["errors"]} == {
+            (products[1]["product_id"], "Missing product link"),
+            (products[3]["product_id"], "Missing product link"),
+        }
+        assert requested == [products[i]["product_link"] for i in (0, 2, 4)]
+
+    @pytest.mark.unit
+    def test_image_cache_skips_fresh_and_revalidates_stale(self, stub_pages):
+        """UNIT TEST: Fresh cache entries need no request; stale ones are revalidated with If-None-Match"""
+        scraper = self.service.image_scraper
+        links = [f"{stub_pages}/page/P1", f"{stub_pages}/page/P2"]
+
+        asyncio.run(scraper.fetch_image_urls(links, host_rate=1000))
+        self.mock_image_cache.save_all.assert_called_once()
+        cache = self.mock_image_cache.save_all.call_args[0][0]
+        assert cache[links[0]]["image_url"] == "https://img.example.com/P1.jpg"
+        assert cache[links[0]]["etag"] == '"v1-P1"'
+
+        # Fresh: answered from the cache, no request at all
+        self.mock_image_cache.get_all.return_value = cache
+        results = asyncio.run(scraper.fetch_image_urls(links, host_rate=1000))
+        assert results[links[1]] == ("https://img.example.com/P2.jpg", None, "cache")
+        assert _StubProductPages.hits["/page/P2"] == 1
+
+        # Stale: conditional request, 304 keeps the cached URL
+        results = asyncio.run(scraper.fetch_image_urls(links, host_rate=1000, max_age=0))
+        assert results[links[1]] == ("https://img.example.com/P2.jpg", None, "not_modified")
+        assert _StubProductPages.hits["/page/P2"] == 2
+
+        # fetch_all_images reports the cache hits
+        self.mock_repository.get_all.return_value = [dict(TEST_PRODUCTS[0], product_link=links[0])]
+        result = self.service.fetch_all_images(host_rate=1000)
+        assert (result["cache_hits"], result["not_modified"], result["updated"]) == (1, 0, 1)
+
+    @pytest.mark.unit
+    def test_fetch_image_urls_progress_and_stop(self, stub_pages):
+        """UNIT TEST: Progress is reported per page; after should_stop no new requests start"""
+        scraper = self.service.image_scraper
+        links = [f"{stub_pages}/page/S{i}" for i in range(6)] + [f"{stub_pages}/missing"]
+        reports = []
+
+        results = asyncio.run(scraper.fetch_image_urls(links, concurrency=1, host_rate=1000, retries=0,
+                                                       progress=lambda *args: reports.append(args)))
+        assert reports[0] == (0, 7, 0) and reports[-1] == (7, 7, 1)
+        assert results[links[-1]][1] == "HTTP 404"
+
+        # Stop after two pages: the rest are reported as cancelled, the resolved ones still cached
+        self.mock_image_cache.get_all.return_value = {}
+        self.mock_image_cache.save_all.reset_mock()
+        reports.clear()
+        results = asyncio.run(scraper.fetch_image_urls(links, concurrency=1, host_rate=1000,
+                                                       progress=lambda *args: reports.append(args),
+                                                       should_stop=lambda: len(reports) > 2))
+        assert [results[link][1] for link in links].count("Cancelled") == 5
+        assert reports[-1][0] == 2
+        assert len(self.mock_image_cache.save_all.call_args[0][0]) == 2
+
+    @pytest.mark.unit
+    def test_host_rate_limiter_spaces_requests(self):
+        """UNIT TEST: The per-host limiter spaces request starts, other hosts aren't delayed"""
+        from backend.services.img_scraper_service import HostRateLimiter
+
+        async def run():
+            limiter = HostRateLimiter(rate=50)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await asyncio.gather(*(limiter.wait("a.example") for _ in range(5)))
+            slow = loop.time() - start
+            start = loop.time()
+            await limiter.wait("b.example")
+            return slow, loop.time() - start
+
+        slow, other_host = asyncio.run(run())
+        assert slow >= 0.07
+        assert other_host < 0.02
+
+    @pytest.mark.unit
+    def test_landing_image_found_before_end_of_page(self):
+        """UNIT TEST: The streaming finder stops at the real landingImage, ignoring markup inside scripts"""
+        from backend.services.img_scraper_service import LandingImageFinder
+
+        page = ('<html><head><script>var x = \'<img id="landingImage" src="fake.jpg">\';</script></head><body>'
+                + '<div><img src="/icon.png"></div>' * 50
+                + '<img id="landingImage" src="https://m.media-amazon.com/images/I/abc._SX300_.jpg?x=1">'
+                + '<div class="review">' + 'text ' * 1000 + '</div></body></html>')
+        finder = LandingImageFinder()
+        consumed = 0
+        for start in range(0, len(page), 100):
+            consumed += 100
+            if finder.feed(page[start:start + 100]):
+                break
+        assert finder.image_url == "https://m.media-amazon.com/images/I/abc._SX300_.jpg?x=1"
+        assert consumed < len(page) / 2
+
+        # Full-page fallback still finds images outside a landingImage (lxml + img/div strainer)
+        html = '<div id="main-image-container"><span><img data-src="https://a.example/i.jpg?q=1"></span></div>'
+        assert self.service.image_scraper._extract_image_url(html) == "https://a.example/i.jpg"
+
+    @pytest.mark.unit
+    def test_bounded_edit_distance(self):
+        """UNIT TEST: Edit distance counts transpositions once and gives up past the limit"""
+        from backend.services.fuzzy_search_service import bounded_edit_distance
+
+        assert bounded_edit_distance("cabel", "cable", 1) == 1
+        assert bounded_edit_distance("chargr", "charger", 2) == 1
+        assert bounded_edit_distance("laptop", "tablet", 2) is None
+
 
 # ============================================================================
 # INTEGRATION TESTS - Testing full API endpoints with TestClient
@@ -275,6 +845,22 @@ def test_get_product_by_id_not_found():
     assert "not found" in response.json()["detail"].lower()
 
 
+@pytest.mark.integration
+def test_get_products_batch():
+    """INTEGRATION TEST: POST /products/batch returns found products and missing ids"""
+    ids = [TEST_PRODUCTS[1]["product_id"], "INVALID_ID_12345", TEST_PRODUCTS[0]["product_id"]]
+    response = client.post("/products/batch?fields=product_id,product_name", json={"product_ids": ids})
+    assert response.status_code == 200
+    body = response.json()
+    assert [p["product_id"] for p in body["products"]] == [ids[0], ids[2]]
+    assert set(body["products"][0]) == {"product_id", "product_name"}
+    assert body["missing"] == ["INVALID_ID_12345"]
+
+    assert client.post("/products/batch", json={"product_ids": []}).json() == {"products": [], "missing": []}
+    assert client.post("/products/batch", json={"product_ids": ["X"] * 1001}).status_code == 400
+    assert client.post("/products/batch", json={}).status_code == 422
+
+
 @pytest.mark.integration
 def test_search_products_with_results():
     """ GET /products/search/{keyword} filters by keyword"""
@@ -297,6 +883,247 @@ def test_search_products_no_results():
     assert len(products) == 0
 
 
+@pytest.mark.integration
+def test_search_products_fuzzy():
+    """GET /products/search/{keyword}?fuzzy=true tolerates typos"""
+    response = client.get("/products/search/samsng smrt tv?fuzzy=true")
+    assert response.status_code == 200
+    products = response.json()
+    assert [p["product_id"] for p in products] == ["B08KT5LMRX"]
+
+    # Without fuzzy mode the misspelled search finds nothing
+    response = client.get("/products/search/samsng smrt tv")
+    assert response.json() == []
+
+
+def _collect_pages(url):
+    """Follow next_cursor until the last page and return all items"""
+    items = []
+    separator = "&" if "?" in url else "?"
+    response = client.get(f"{url}{separator}limit=2")
+    while True:
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        items.extend(page["items"])
+        if page["next_cursor"] is None:
+            return items
+        response = client.get(f"{url}{separator}limit=2&cursor={page['next_cursor']}")
+
+
+@pytest.mark.integration
+def test_paginated_listing_matches_full_listing():
+    """GET /products/?limit=&cursor= pages through the same products in the same order"""
+    for sort in ["", "name_asc", "price_desc", "rating_asc", "discount_desc"]:
+        url = f"/products/?sort={sort}" if sort else "/products/"
+        assert _collect_pages(url) == client.get(url).json()
+
+
+@pytest.mark.integration
+def test_paginated_search():
+    """GET /products/search/{keyword}?limit= paginates search results"""
+    url = "/products/search/o?sort=price_asc"
+    expected = client.get(url).json()
+    assert len(expected) > 2
+    assert _collect_pages(url) == expected
+
+
+@pytest.mark.integration
+def test_pagination_rejects_bad_cursor():
+    """Invalid cursors, or cursors from another sort order, return 400"""
+    response = client.get("/products/?limit=2&cursor=not-a-cursor")
+    assert response.status_code == 400
+
+    cursor = client.get("/products/?limit=2&sort=price_asc").json()["next_cursor"]
+    response = client.get(f"/products/?limit=2&sort=name_asc&cursor={cursor}")
+    assert response.status_code == 400
+
+    response = client.get("/products/?limit=0")
+    assert response.status_code == 422
+
+
+@pytest.mark.integration
+def test_product_fields_projection():
+    """?fields= returns only the requested fields on listing, search and single product"""
+    response = client.get("/products/?fields=product_name,discounted_price")
+    assert response.status_code == 200
+    for product in response.json():
+        assert set(product) == {"product_id", "product_name", "discounted_price"}
+
+    response = client.get("/products/search/laptop?fields=card&limit=1")
+    item = response.json()["items"][0]
+    assert "about_product" not in item and "product_link" not in item
+    assert item["img_link"] == "https://example.com/laptop.jpg"
+
+    response = client.get("/products/B07JW9H4J1?fields=rating")
+    assert response.json() == {"product_id": "B07JW9H4J1", "rating": 4.5}
+
+    response = client.get("/products/?fields=secret")
+    assert response.status_code == 400
+
+
+@pytest.mark.integration
+def test_category_tree_and_filter():
+    """GET /products/categories returns counts and ?category= filters by subtree"""
+    response = client.get("/products/categories?depth=1")
+    assert response.status_code == 200
+    tree = response.json()
+    assert tree["count"] == len(TEST_PRODUCTS)
+    assert tree["children"][0]["name"] == "Electronics"
+    assert tree["children"][0]["children"] == []
+
+    response = client.get("/products/categories?path=Nope")
+    assert response.status_code == 404
+
+    response = client.get("/products/?category=Electronics|Phones")
+    assert [p["product_id"] for p in response.json()] == ["B07QR3N8VX"]
+
+    response = client.get("/products/?category=Electronics&sort=price_desc&limit=2")
+    page = response.json()
+    assert [p["product_id"] for p in page["items"]] == ["B07QR3N8VX", "B09NX5K7QP"]
+    assert page["next_cursor"] is not None
+
+
+@pytest.mark.integration
+def test_range_filters_on_listing():
+    """GET /products/?min_price=&max_price=&min_rating=&min_discount= filters products"""
+    response = client.get("/products/?min_price=1000&max_price=50000&sort=price_asc")
+    assert response.status_code == 200
+    assert [p["product_id"] for p in response.json()] == ["B08F5N7KJX", "B08KT5LMRX"]
+
+    response = client.get("/products/?min_rating=4.6&min_discount=30&limit=5")
+    assert [p["product_id"] for p in response.json()["items"]] == ["B08KT5LMRX"]
+
+    response = client.get("/products/?min_rating=7")
+    assert response.status_code == 422
+
+
+@pytest.mark.integration
+def test_top_products_endpoint():
+    """GET /products/top?by=&k= returns the k best products"""
+    response = client.get("/products/top?by=rating&k=2")
+    assert response.status_code == 200
+    assert [p["product_id"] for p in response.json()] == ["B08KT5LMRX", "B07QR3N8VX"]
+
+    # Two products share the biggest discount (50%); ties keep catalog order
+    response = client.get("/products/top?by=discount&k=2&fields=discount_percentage")
+    assert response.json() == [
+        {"product_id": "B07JW9H4J1", "discount_percentage": 50.0},
+        {"product_id": "B08F5N7KJX", "discount_percentage": 50.0},
+    ]
+
+    assert client.get("/products/top?by=price").status_code == 400
+
+
+@pytest.mark.integration
+def test_similar_products_endpoint():
+    """GET /products/{id}/similar returns precomputed neighbours, 404 for unknown products"""
+    from backend.routers.product_router import product_service
+    product_service.refresh_similarity_index()
+    response = client.get("/products/B07JW9H4J1/similar?k=3&fields=product_name")
+    assert response.status_code == 200
+    similar = response.json()
+    assert 0 < len(similar) <= 3
+    assert all(set(p) == {"product_id", "product_name"} for p in similar)
+    assert "B07JW9H4J1" not in [p["product_id"] for p in similar]
+
+    assert client.get("/products/NOPE/similar").status_code == 404
+    assert client.get("/products/B07JW9H4J1/similar?k=0").status_code == 422
+
+    # Before the first background build the endpoint asks the client to retry instead of building inline
+    with patch.object(product_service, "_similarity_version", None), \
+            patch.object(product_service, "schedule_similarity_refresh") as schedule:
+        response = client.get("/products/B07JW9H4J1/similar")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    schedule.assert_called_once()
+
+
+@pytest.mark.integration
+def test_fetch_images_all_runs_as_job(stub_pages):
+    """POST /products/fetch-images-all answers 202 with a job id; the job updates the catalog"""
+    from backend.routers.product_router import product_service
+    from backend.services.job_service import default_job_service
+
+    products = [dict(p, product_link=f"{stub_pages}/page/{p['product_id']}") for p in TEST_PRODUCTS]
+    with open(TEST_DB_PATH_PRODUCTS, "w", encoding="utf-8") as f:
+        json.dump(products, f, indent=2)
+    token, _ = _create_admin_user()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    image_cache = Mock()
+    image_cache.get_all.return_value = {}
+    with patch.object(product_service.image_scraper, "cache_repository", image_cache):
+        response = client.post("/products/fetch-images-all", headers=headers)
+        assert response.status_code == 202
+        accepted = response.json()
+        assert accepted["status_url"] == f"/admin/jobs/{accepted['job_id']}"
+        default_job_service.wait(accepted["job_id"], timeout=30)
+
+    job = client.get(accepted["status_url"], headers=headers).json()
+    assert job["status"] == "succeeded"
+    assert job["progress"] == {"done": len(products), "total": len(products)}
+    assert (job["result"]["total"], job["result"]["updated"], job["result"]["failed"]) == (len(products), len(products), 0)
+    product = client.get(f"/products/{products[0]['product_id']}").json()
+    assert product["img_link"] == f"https://img.example.com/{products[0]['product_id']}.jpg"
+
+
+@pytest.mark.integration
+def test_product_etag_conditional_get():
+    """GET /products/{id} sends a strong ETag and answers If-None-Match with 304"""
+    response = client.get("/products/B07JW9H4J1")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith('"')
+
+    response = client.get("/products/B07JW9H4J1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    # Different representations get different ETags
+    other = client.get("/products/B07JW9H4J1?fields=rating").headers["etag"]
+    assert other != etag
+
+    # A matching If-None-Match is answered without loading the catalog at all
+    from backend.routers import product_router
+    with patch.object(product_router.product_service, "_get_catalog", side_effect=AssertionError("catalog loaded")):
+        response = client.get("/products/B07JW9H4J1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.integration
+def test_if_none_match_star_only_for_existing_representations():
+    """If-None-Match: * is a 304 only when the request would have succeeded"""
+    star = {"If-None-Match": "*"}
+    response = client.get("/products/B07JW9H4J1", headers=star)
+    assert response.status_code == 304
+    assert response.headers["etag"] == client.get("/products/B07JW9H4J1").headers["etag"]
+
+    assert client.get("/products/NOPE", headers=star).status_code == 404
+    assert client.get("/products/?fields=bogus", headers=star).status_code == 400
+
+
+@pytest.mark.integration
+def test_listing_etag_changes_when_catalog_changes():
+    """Listing ETags are tied to the catalog version, so updates invalidate them"""
+    token, _ = _create_admin_user()
+    response = client.get("/products/?sort=price_asc")
+    etag = response.headers["etag"]
+    assert client.get("/products/?sort=price_asc", headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(
+        "/products/B08F5N7KJX",
+        json={"discounted_price": 1.0},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+
+    response = client.get("/products/?sort=price_asc", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["product_id"] == "B08F5N7KJX"
+
+
 @pytest.mark.integration
 def test_sort_products_by_price_asc():
     """ GET /products/?sort=price_asc sorts ascending"""
@@ -941,6 +1768,62 @@ def test_delete_all_products():
     assert len(products_after) == 0
 
 
+@pytest.mark.integration
+def test_bulk_products_applies_rows_and_saves_once():
+    """POST /products/bulk upserts and deletes many products with one write and per-row results"""
+    token, _ = _create_admin_user()
+    new_product = {
+        "product_name": "Bulk Keyboard",
+        "category": "Electronics|Accessories",
+        "discounted_price": 999.0,
+        "actual_price": 1999.0,
+        "discount_percentage": 50.0,
+        "about_product": "Mechanical keyboard",
+        "img_link": "https://example.com/keyboard.jpg",
+        "product_link": "https://example.com/keyboard",
+    }
+    operations = [
+        {"op": "upsert", "product_id": "B07JW9H4J1", "product": {"discounted_price": 249.0}},
+        {"op": "upsert", "product": new_product},
+        {"op": "upsert", "product_id": "NEWBULK001", "product": new_product},
+        {"op": "delete", "product_id": "B08F5N7KJX"},
+        {"op": "delete", "product_id": "MISSING123"},
+        {"op": "upsert", "product_id": "B09NX5K7QP", "product": {"rating": 9}},
+        {"op": "upsert", "product": {"product_name": "Incomplete"}},
+        {"op": "archive", "product_id": "B09NX5K7QP"},
+    ]
+
+    with patch("backend.repositories.base_repository.BaseRepository.save_all",
+               autospec=True, side_effect=BaseRepository.save_all) as save_all:
+        response = client.post("/products/bulk", json=operations, headers={"Authorization": f"Bearer {token}"})
+    assert save_all.call_count == 1
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["total"], result["created"], result["updated"], result["deleted"], result["failed"]) == (8, 2, 1, 1, 4)
+    statuses = [row["status"] for row in result["results"]]
+    assert statuses == ["updated", "created", "created", "deleted", "error", "error", "error", "error"]
+    assert "rating must be between 0 and 5" in result["results"][5]["error"]
+    assert "Invalid op" in result["results"][7]["error"]
+
+    generated_id = result["results"][1]["product_id"]
+    with open(TEST_DB_PATH_PRODUCTS, "r", encoding="utf-8") as f:
+        saved = {p["product_id"]: p for p in json.load(f)}
+    assert saved["B07JW9H4J1"]["discounted_price"] == 249.0
+    assert saved[generated_id]["product_name"] == "Bulk Keyboard"
+    assert "NEWBULK001" in saved
+    assert "B08F5N7KJX" not in saved
+    assert saved["B09NX5K7QP"]["rating"] == 4.6
+
+
+@pytest.mark.integration
+def test_bulk_products_forbidden_for_customer():
+    """POST /products/bulk requires an admin"""
+    token, _ = _create_customer_user()
+    response = client.post("/products/bulk", json=[], headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+
 @pytest.mark.integration
 def test_delete_does_not_affect_other_products():
     """INTEGRATION TEST: Deleting one product doesn't affect others"""
@@ -6,6 +6,7 @@ from pathlib import Path
 from fastapi.testclient import TestClient
 from backend.main import app
 from backend.services.refund_service import RefundService
+from backend.services.session_service import default_session_store
 
 client = TestClient(app)
 
@@ -20,6 +21,12 @@ TEST_ADMIN_TOKEN = "TESTADMINTOKEN12345678901234"
 TEST_TRANSACTION_ID = "test-transaction-id-001"
 
 
+def _session_token(user_id: str) -> str:
+    """Helper: open a login session for a test user (what POST /auth/login issues) and return its token."""
+    token, _ = default_session_store.create(user_id)
+    return token
+
+
 def setup_function():
     """Setup test users, transactions, and clear refunds"""
     users_file = Path("backend/data/users.json")
@@ -229,7 +236,7 @@ def test_customer_create_refund_request():
     """Test customer can create refund request via API"""
     response = client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "Product is defective"
@@ -249,7 +256,7 @@ def test_customer_cannot_create_duplicate_refund():
     # Create first refund
     client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "First request"
@@ -259,7 +266,7 @@ def test_customer_cannot_create_duplicate_refund():
     # Try duplicate
     response = client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "Second request"
@@ -275,7 +282,7 @@ def test_customer_cannot_refund_nonexistent_transaction():
     """Test customer cannot create refund for transaction that doesn't exist"""
     response = client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": "fake-transaction-id",
             "message": "This won't work"
@@ -305,7 +312,7 @@ def test_admin_view_all_refunds():
     # Create a refund first
     client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "Need refund"
@@ -315,7 +322,7 @@ def test_admin_view_all_refunds():
     # Admin views all
     response = client.get(
         "/refunds/all",
-        headers={"Authorization": f"Bearer {TEST_ADMIN_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_ADMIN_ID)}"}
     )
     
     assert response.status_code == 200
@@ -329,7 +336,7 @@ def test_customer_cannot_view_all_refunds():
     """Test customer cannot view all refund requests (admin only)"""
     response = client.get(
         "/refunds/all",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"}
     )
     
     assert response.status_code == 403
@@ -341,7 +348,7 @@ def test_customer_view_own_refunds():
     # Create a refund
     client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "I want my money back"
@@ -351,7 +358,7 @@ def test_customer_view_own_refunds():
     # View own refunds
     response = client.get(
         "/refunds/my-requests",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"}
     )
     
     assert response.status_code == 200
@@ -366,7 +373,7 @@ def test_admin_approve_refund():
     # Create refund
     create_response = client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "Approve this please"
@@ -377,7 +384,7 @@ def test_admin_approve_refund():
     # Admin approves
     response = client.put(
         f"/refunds/{refund_id}/approve",
-        headers={"Authorization": f"Bearer {TEST_ADMIN_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_ADMIN_ID)}"}
     )
     
     assert response.status_code == 200
@@ -392,7 +399,7 @@ def test_admin_deny_refund():
     # Create refund
     create_response = client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "Deny this"
@@ -403,7 +410,7 @@ def test_admin_deny_refund():
     # Admin denies
     response = client.put(
         f"/refunds/{refund_id}/deny",
-        headers={"Authorization": f"Bearer {TEST_ADMIN_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_ADMIN_ID)}"}
     )
     
     assert response.status_code == 200
@@ -418,7 +425,7 @@ def test_customer_cannot_approve_refund():
     # Create refund
     create_response = client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "Customer shouldn't approve"
@@ -429,7 +436,7 @@ def test_customer_cannot_approve_refund():
     # Customer tries to approve
     response = client.put(
         f"/refunds/{refund_id}/approve",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"}
     )
     
     assert response.status_code == 403
@@ -441,7 +448,7 @@ def test_cannot_approve_already_processed_refund():
     # Create and approve refund
     create_response = client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "First approval"
@@ -451,13 +458,13 @@ def test_cannot_approve_already_processed_refund():
     
     client.put(
         f"/refunds/{refund_id}/approve",
-        headers={"Authorization": f"Bearer {TEST_ADMIN_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_ADMIN_ID)}"}
     )
     
     # Try to approve again
     response = client.put(
         f"/refunds/{refund_id}/approve",
-        headers={"Authorization": f"Bearer {TEST_ADMIN_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_ADMIN_ID)}"}
     )
     
     assert response.status_code == 400
@@ -470,7 +477,7 @@ def test_transaction_status_updated_on_approval():
     # Create and approve refund
     create_response = client.post(
         "/refunds",
-        headers={"Authorization": f"Bearer {TEST_CUSTOMER_TOKEN}"},
+        headers={"Authorization": f"Bearer {_session_token(TEST_CUSTOMER_ID)}"},
         json={
             "transaction_id": TEST_TRANSACTION_ID,
             "message": "Check transaction status"
@@ -480,7 +487,7 @@ def test_transaction_status_updated_on_approval():
     
     client.put(
         f"/refunds/{refund_id}/approve",
-        headers={"Authorization": f"Bearer {TEST_ADMIN_TOKEN}"}
+        headers={"Authorization": f"Bearer {_session_token(TEST_ADMIN_ID)}"}
     )
     
     # Check transaction status
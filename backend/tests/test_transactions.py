@@ -9,6 +9,7 @@ from fastapi.testclient import TestClient
 from backend.main import app
 from backend.services.transaction_service import TransactionService
 from backend.models.transaction_model import Transaction
+from backend.services.session_service import default_session_store
 
 client = TestClient(app)
 
@@ -24,6 +25,13 @@ TEST_USER_MULTI_TOKEN = "TESTTOKENMULTI1234567890ABCD"
 
 TEST_PRODUCT_ID = "B07JW9H4J1"  # A real product from products_test.json
 
+
+def _session_token(user_id: str) -> str:
+    """Helper: open a login session for a test user (what POST /auth/login issues) and return its token."""
+    token, _ = default_session_store.create(user_id)
+    return token
+
+
 # Test products to populate products_test.json
 TEST_PRODUCTS = [
     {
@@ -270,6 +278,65 @@ class TestTransactionServiceUnit:
         assert transactions == []
 
 
+class TestCoPurchaseIndexUnit:
+    """UNIT TESTS: Test the co-purchase index with a mocked transaction repository"""
+
+    def setup_method(self):
+        from backend.services.co_purchase_service import CoPurchaseIndex
+        self.mock_repository = Mock()
+        self.mock_repository.get_version.return_value = "v1"
+        self.mock_repository.iter_transactions.return_value = [
+            ("u1", {"items": [{"product_id": "A"}, {"product_id": "B"}, {"product_id": "C"}]}),
+            ("u1", {"items": [{"product_id": "A"}, {"product_id": "B"}, {"product_id": "B"}]}),
+            ("u2", {"items": [{"product_id": "A"}, {"product_id": "D"}]}),
+            ("u2", {"items": "malformed"}),
+        ]
+        self.index = CoPurchaseIndex(self.mock_repository)
+
+    @pytest.mark.unit
+    def test_rebuild_counts_pairs_once_per_order(self):
+        """UNIT TEST: Full rebuild counts each pair once per order, most frequent first"""
+        assert self.index.bought_together("A") == [("B", 2), ("C", 1), ("D", 1)]
+        assert self.index.bought_together("B", k=1) == [("A", 2)]
+        assert self.index.bought_together("unknown") == []
+        assert self.index.rebuilds == 1
+
+    @pytest.mark.unit
+    def test_record_order_is_incremental(self):
+        """UNIT TEST: Checkouts update the counts without a rebuild; outside changes trigger one"""
+        self.index.bought_together("A")
+        self.mock_repository.get_version.return_value = "v2"
+        self.index.record_order(["D", "A", "A"], "v1", "v2")
+        assert self.index.bought_together("A") == [("B", 2), ("D", 2), ("C", 1)]
+        assert self.index.rebuilds == 1
+
+        # Index wasn't current before the write: ignore the order, rebuild from the file instead
+        self.index.record_order(["C", "D"], "stale", "v3")
+        self.mock_repository.get_version.return_value = "v3"
+        self.index.bought_together("A")
+        assert self.index.rebuilds == 2
+
+    @pytest.mark.unit
+    def test_iter_transactions_streams_file(self, tmp_path):
+        """UNIT TEST: The streaming reader yields the same transactions as json.load, chunk by chunk"""
+        from backend.repositories.transaction_repository import TransactionRepository
+        data = {
+            "u1": [{"transaction_id": "t1", "items": [{"product_id": "A", "note": "{[\\\"]},"}]}],
+            "u2": [],
+            "u3": [{"transaction_id": "t2", "items": []}, {"transaction_id": "t3", "items": []}],
+        }
+        repository = TransactionRepository()
+        repository.data_dir = tmp_path
+        (tmp_path / "transactions.json").write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+        with patch("backend.repositories.transaction_repository.STREAM_CHUNK_SIZE", 7):
+            streamed = list(repository.iter_transactions())
+        assert streamed == [(user_id, t) for user_id, ts in data.items() for t in ts]
+
+        (tmp_path / "transactions.json").write_text("{}", encoding="utf-8")
+        assert list(repository.iter_transactions()) == []
+
+
 # ============================================================================
 # INTEGRATION TESTS - Testing full API endpoints with TestClient
 # ============================================================================
@@ -278,7 +345,7 @@ class TestTransactionServiceUnit:
 @pytest.mark.integration
 def test_checkout_empty_cart():
     """Test that checking out with an empty cart fails"""
-    response = client.post(f"/cart/checkout?user_token={TEST_USER_EMPTY_TOKEN}")
+    response = client.post(f"/cart/checkout?user_token={_session_token(TEST_USER_EMPTY_ID)}")
     
     assert response.status_code == 400
     assert "cart is empty" in response.json()["detail"].lower()
@@ -290,13 +357,13 @@ def test_checkout_success():
     """Test successful checkout creates transaction and clears cart"""
     # First, add item to cart
     client.post("/cart/add", json={
-        "user_token": TEST_USER_CHECKOUT_TOKEN,
+        "user_token": _session_token(TEST_USER_CHECKOUT_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 2
     })
     
     # Now checkout
-    response = client.post(f"/cart/checkout?user_token={TEST_USER_CHECKOUT_TOKEN}")
+    response = client.post(f"/cart/checkout?user_token={_session_token(TEST_USER_CHECKOUT_ID)}")
     
     assert response.status_code == 200
     data = response.json()
@@ -319,7 +386,7 @@ def test_checkout_success():
     assert transaction["status"] == "completed"
     
     # Verify cart is now empty
-    cart_response = client.get(f"/cart/?user_token={TEST_USER_CHECKOUT_TOKEN}")
+    cart_response = client.get(f"/cart/?user_token={_session_token(TEST_USER_CHECKOUT_ID)}")
     cart_data = cart_response.json()
     assert len(cart_data["items"]) == 0
 
@@ -328,7 +395,7 @@ def test_checkout_success():
 @pytest.mark.integration
 def test_get_transactions_empty():
     """Test getting transactions for user with no transactions returns empty list"""
-    response = client.get(f"/transactions/?user_token={TEST_USER_EMPTY_TOKEN}")
+    response = client.get(f"/transactions/?user_token={_session_token(TEST_USER_EMPTY_ID)}")
     
     assert response.status_code == 200
     data = response.json()
@@ -343,14 +410,14 @@ def test_get_user_transactions():
     # Add item and checkout twice to create 2 transactions
     for i in range(2):
         client.post("/cart/add", json={
-            "user_token": TEST_USER_MULTI_TOKEN,
+            "user_token": _session_token(TEST_USER_MULTI_ID),
             "product_id": TEST_PRODUCT_ID,
             "quantity": i + 1
         })
-        client.post(f"/cart/checkout?user_token={TEST_USER_MULTI_TOKEN}")
+        client.post(f"/cart/checkout?user_token={_session_token(TEST_USER_MULTI_ID)}")
     
     # Get all transactions
-    response = client.get(f"/transactions/?user_token={TEST_USER_MULTI_TOKEN}")
+    response = client.get(f"/transactions/?user_token={_session_token(TEST_USER_MULTI_ID)}")
     
     assert response.status_code == 200
     data = response.json()
@@ -369,16 +436,16 @@ def test_get_transaction_by_id():
     """Test getting a specific transaction by its ID"""
     # Add item and checkout
     client.post("/cart/add", json={
-        "user_token": TEST_USER_CHECKOUT_TOKEN,
+        "user_token": _session_token(TEST_USER_CHECKOUT_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 3
     })
     
-    checkout_response = client.post(f"/cart/checkout?user_token={TEST_USER_CHECKOUT_TOKEN}")
+    checkout_response = client.post(f"/cart/checkout?user_token={_session_token(TEST_USER_CHECKOUT_ID)}")
     transaction_id = checkout_response.json()["transaction"]["transaction_id"]
     
     # Get specific transaction
-    response = client.get(f"/transactions/{transaction_id}?user_token={TEST_USER_CHECKOUT_TOKEN}")
+    response = client.get(f"/transactions/{transaction_id}?user_token={_session_token(TEST_USER_CHECKOUT_ID)}")
     
     assert response.status_code == 200
     data = response.json()
@@ -393,7 +460,7 @@ def test_get_nonexistent_transaction():
     """Test that requesting a non-existent transaction returns 404"""
     fake_transaction_id = "00000000-0000-0000-0000-999999999999"
     
-    response = client.get(f"/transactions/{fake_transaction_id}?user_token={TEST_USER_EMPTY_TOKEN}")
+    response = client.get(f"/transactions/{fake_transaction_id}?user_token={_session_token(TEST_USER_EMPTY_ID)}")
     
     assert response.status_code == 404
     assert "not found" in response.json()["detail"].lower()
@@ -405,16 +472,16 @@ def test_unauthorized_transaction_access():
     """Test that a user cannot view another user's transaction"""
     # User 1 creates a transaction
     client.post("/cart/add", json={
-        "user_token": TEST_USER_CHECKOUT_TOKEN,
+        "user_token": _session_token(TEST_USER_CHECKOUT_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 1
     })
     
-    checkout_response = client.post(f"/cart/checkout?user_token={TEST_USER_CHECKOUT_TOKEN}")
+    checkout_response = client.post(f"/cart/checkout?user_token={_session_token(TEST_USER_CHECKOUT_ID)}")
     transaction_id = checkout_response.json()["transaction"]["transaction_id"]
     
     # User 2 tries to view User 1's transaction
-    response = client.get(f"/transactions/{transaction_id}?user_token={TEST_USER_EMPTY_TOKEN}")
+    response = client.get(f"/transactions/{transaction_id}?user_token={_session_token(TEST_USER_EMPTY_ID)}")
     
     assert response.status_code == 403
     assert "access denied" in response.json()["detail"].lower()
@@ -426,7 +493,7 @@ def test_checkout_multiple_items():
     """Test checkout with multiple different products"""
     # Add two different products
     client.post("/cart/add", json={
-        "user_token": TEST_USER_MULTI_TOKEN,
+        "user_token": _session_token(TEST_USER_MULTI_ID),
         "product_id": TEST_PRODUCT_ID,
         "quantity": 2
     })
@@ -434,9 +501,35 @@ def test_checkout_multiple_items():
     # You can add another product if you have another product ID
     # For now, just verify checkout works with one product
     
-    response = client.post(f"/cart/checkout?user_token={TEST_USER_MULTI_TOKEN}")
+    response = client.post(f"/cart/checkout?user_token={_session_token(TEST_USER_MULTI_ID)}")
     
     assert response.status_code == 200
     transaction = response.json()["transaction"]
     assert len(transaction["items"]) >= 1
-    assert transaction["total_price"] > 0
\ No newline at end of file
+    assert transaction["total_price"] > 0
+
+# Test 9: Checkout feeds the "frequently bought together" index
+@pytest.mark.integration
+def test_bought_together_updated_on_checkout():
+    """Test that products checked out together show up in each other's bought-together list"""
+    from backend.services.co_purchase_service import default_co_purchase_index
+
+    response = client.get(f"/products/{TEST_PRODUCT_ID}/bought-together")
+    assert response.status_code == 200
+    rebuilds = default_co_purchase_index.rebuilds
+
+    for product_id in (TEST_PRODUCT_ID, "B08KT5LMRX"):
+        client.post("/cart/add", json={
+            "user_token": _session_token(TEST_USER_MULTI_ID),
+            "product_id": product_id,
+            "quantity": 1
+        })
+    assert client.post(f"/cart/checkout?user_token={_session_token(TEST_USER_MULTI_ID)}").status_code == 200
+
+    response = client.get("/products/B08KT5LMRX/bought-together?fields=product_name")
+    assert response.status_code == 200
+    assert TEST_PRODUCT_ID in [p["product_id"] for p in response.json()]
+    # Counted incrementally, no rebuild from history
+    assert default_co_purchase_index.rebuilds == rebuilds
+
+    assert client.get("/products/NOPE/bought-together").status_code == 404
@@ -12,6 +12,12 @@ export default function AdminManageUsersPage() {
   const { user, isAdmin, loading } = useAuth();
   const [users, setUsers] = useState<User[]>([]);
   const [loadingData, setLoadingData] = useState(true);
+  const [search, setSearch] = useState('');
+  const [roleFilter, setRoleFilter] = useState('');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  // Filters the loaded pages were fetched with; the cursor only continues those
+  const [appliedFilters, setAppliedFilters] = useState({ q: '', role: '' });
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (!loading) {
@@ -24,14 +30,17 @@ export default function AdminManageUsersPage() {
       }
     }
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [user, isAdmin, loading]);
+  }, [user, isAdmin, loading, roleFilter]);
 
+  // First page of users matching the search box and role filter
   const fetchUsers = async () => {
     setLoadingData(true);
     try {
-      const usersData = await authAPI.getAllUsers();
-      console.log('Fetched users:', usersData);
-      setUsers(usersData);
+      const filters = { q: search.trim(), role: roleFilter };
+      const page = await authAPI.getUsersPage(filters);
+      setUsers(page.items);
+      setNextCursor(page.next_cursor);
+      setAppliedFilters(filters);
     } catch (error: any) {
       console.error('Failed to fetch users:', error);
       if (error.response?.status === 403) {
@@ -45,6 +54,22 @@ export default function AdminManageUsersPage() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      // The search box may have been edited since; keep paging the list that is on screen
+      const page = await authAPI.getUsersPage({ ...appliedFilters, cursor: nextCursor });
+      setUsers((current) => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error: any) {
+      console.error('Failed to fetch more users:', error);
+      alert(`Failed to fetch users: ${error.response?.data?.detail || error.message}`);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleToggleRole = async (userId: string, userName: string, currentRole: string) => {
     // Prevent admin from demoting themselves
     if (userId === user?.user_id && currentRole === 'admin') {
@@ -62,7 +87,7 @@ export default function AdminManageUsersPage() {
     try {
       await authAPI.setUserRole(userId, newRole);
       alert(`${userName} has been ${newRole === 'admin' ? 'promoted to admin' : 'demoted to customer'}!`);
-      fetchUsers(); // Refresh
+      setUsers((current) => current.map((u) => (u.user_id === userId ? { ...u, role: newRole } : u)));
     } catch (error: any) {
       console.error('Failed to change role:', error);
       alert(error.response?.data?.detail || 'Failed to change user role');
@@ -88,6 +113,30 @@ export default function AdminManageUsersPage() {
           <p className="text-gray-600">Toggle user roles between customer and admin</p>
         </div>
 
+        <form
+          className="mb-6 flex gap-3"
+          onSubmit={(e) => {
+            e.preventDefault();
+            fetchUsers();
+          }}
+        >
+          <input
+            type="text"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            placeholder="Search by email or name prefix"
+            className="input flex-1"
+          />
+          <select value={roleFilter} onChange={(e) => setRoleFilter(e.target.value)} className="input w-40">
+            <option value="">All roles</option>
+            <option value="customer">Customers</option>
+            <option value="admin">Admins</option>
+          </select>
+          <button type="submit" className="btn-primary">
+            Search
+          </button>
+        </form>
+
         {users.length === 0 ? (
           <div className="text-center py-12">
             <p className="text-gray-600">No user accounts found</p>
@@ -138,6 +187,14 @@ export default function AdminManageUsersPage() {
                 </div>
               ))}
             </div>
+
+            {nextCursor && (
+              <div className="mt-6 text-center">
+                <button onClick={loadMore} disabled={loadingMore} className="btn-secondary">
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </>
         )}
       </div>
@@ -35,17 +35,24 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
 
   const login = async (email: string, password: string) => {
     const response = await authAPI.login(email, password);
-    localStorage.setItem('token', response.user.user_token);
+    // Expiring session token, sent as the Bearer token until logout or expiry
+    localStorage.setItem('token', response.session_token);
     setUser(response.user);
   };
 
   const register = async (name: string, email: string, password: string) => {
     const response = await authAPI.register(name, email, password);
-    localStorage.setItem('token', response.user.user_token);
+    // Registering signs the user in with a session, as login does
+    localStorage.setItem('token', response.session_token);
     setUser(response.user);
   };
 
   const logout = () => {
+    // End the session on the server too; the local token is dropped either way
+    const token = localStorage.getItem('token');
+    if (token) {
+      authAPI.logout(token).catch(() => {});
+    }
     localStorage.removeItem('token');
     setUser(null);
   };
@@ -30,6 +30,10 @@ export const authAPI = {
     const response = await api.post('/auth/login', { email, password });
     return response.data;
   },
+  logout: async (token: string) => {
+    const response = await api.post('/auth/logout', null, { headers: { Authorization: `Bearer ${token}` } });
+    return response.data;
+  },
   getMe: async () => {
     const response = await api.get('/auth/me');
     return response.data;
@@ -38,6 +42,17 @@ export const authAPI = {
     const response = await api.get('/auth/users');
     return response.data;
   },
+  getUsersPage: async (params: { limit?: number; cursor?: string | null; role?: string; q?: string }) => {
+    const response = await api.get('/auth/users', {
+      params: {
+        limit: params.limit ?? 50,
+        cursor: params.cursor || undefined,
+        role: params.role || undefined,
+        q: params.q || undefined,
+      },
+    });
+    return response.data as { items: User[]; next_cursor: string | null };
+  },
   promoteToAdmin: async (user_id: string) => {
     const response = await api.post(`/auth/users/${user_id}/promote-admin`);
     return response.data;